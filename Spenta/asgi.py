@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Spenta.settings')
+# Route the Interakt-bound OTP views to their async versions (see settings.ASYNC_OTP_VIEWS)
+os.environ.setdefault('SPENTA_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
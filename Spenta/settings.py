@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -39,7 +40,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'customer_enquiry.middleware.CacheGenerationMiddleware',  # drop stale local cache entries edited elsewhere
+    'customer_enquiry.middleware.EnquirySessionMiddleware',  # DB sessions for staff, cache sessions for the public form
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -123,6 +125,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Debug settings
 DEBUG = True  # Keep True for development, set to False in production
 
+# True while running `manage.py test`
+TESTING = sys.argv[1:2] == ['test']
+
 # Logging configuration
 LOGGING = {
     'version': 1,
@@ -143,7 +148,7 @@ LOGGING = {
         },
     },
     'loggers': {
-        'customer_enquiry.views': {
+        'customer_enquiry': {
             'handlers': ['console', 'file'],
             'level': 'DEBUG',
             'propagate': True,
@@ -196,23 +201,127 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = 'Spenta CRM <projects@spentacorporation.com>'  # Must match EMAIL_HOST_USER for Gmail
 
-# Cache configuration (file-based — persists across server restarts)
+# Cache configuration. 'default' keeps hot, read-mostly keys in a per-worker
+# LRU (customer_enquiry/cache_backends.py) in front of the shared SQLite cache,
+# which every worker on the host sees and which persists across restarts.
+# Local TTLs are in seconds, per key prefix.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
-        'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
+        'BACKEND': 'customer_enquiry.cache_backends.TieredCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_KEY_PREFIXES': {
+                'ref:': 300,              # project registry, partner & staff directories
+                'otp_count_': 5,          # OTP rate-limit counters
+                'pwd_reset_count_': 5,    # password-reset rate-limit counters
+            },
+        },
+    },
+    'shared': {
+        'BACKEND': 'customer_enquiry.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'django_cache', 'shared.sqlite3'),
         'TIMEOUT': 3600,  # 1 hour default
-    }
+        'OPTIONS': {'MAX_ENTRIES': 100000, 'PURGE_INTERVAL': 60},
+    },
+    # Public enquiry sessions — kept apart so rate-limit keys can't cull them
+    'sessions': {
+        'BACKEND': 'customer_enquiry.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'django_cache', 'sessions.sqlite3'),
+        'TIMEOUT': 86400,
+        'OPTIONS': {'MAX_ENTRIES': 200000, 'PURGE_INTERVAL': 300},
+    },
 }
 
+# Read-only snapshot of projects, channel partners and the staff directory,
+# mmap-ed by every worker (customer_enquiry/snapshot.py). Rewritten whenever
+# one of them changes; `manage.py publish_snapshot` builds it after a deploy.
+# Set to None to read reference data from the cache only.
+REFERENCE_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'django_cache', 'reference.snapshot')
+
+# Sessions: staff use the database (SESSION_ENGINE default). The public QR/OTP
+# flow below gets a cache-backed session under its own cookie, so OTP sends,
+# verifies and submits don't write django_session rows. Signed cookies aren't
+# an option — the OTP itself lives in the session. See customer_enquiry/middleware.py.
+PUBLIC_SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+PUBLIC_SESSION_COOKIE_NAME = 'enquiry_sessionid'
+SESSION_CACHE_ALIAS = 'sessions'  # only PUBLIC_SESSION_ENGINE reads this
+PUBLIC_SESSION_URL_NAMES = [
+    f'customer_enquiry:{name}' for name in (
+        'verification', 'customer_verification', 'user_login',
+        'altavista_verification', 'ornata_verification', 'medius_verification',
+        'stardeous_verification', 'anthea_verification',
+        'customer_form', 'altavista_form', 'ornata_form', 'medius_form',
+        'stardeous_form', 'anthea_form',
+        'send_otp', 'verify_otp', 'get_project_data',
+        'save_step', 'submit', 'thank_you',
+    )
+]
+
 # OTP Rate Limiting
 OTP_MAX_PER_PHONE = 3   # Max OTP requests per phone number per hour
 OTP_MAX_PER_IP = 5      # Max OTP requests per IP per hour
 OTP_BLOCK_DURATION = 3600  # Block duration in seconds (1 hour)
+OTP_TTL = 600              # Seconds an issued OTP stays valid (see customer_enquiry/otp.py)
+OTP_MAX_ATTEMPTS = 5       # Wrong guesses allowed per issued OTP
+
+# Seconds a save-step/submit response is kept for replay to a retried
+# idempotency key (customer_enquiry/idempotency.py)
+IDEMPOTENCY_TTL = 3600
+
+# Seconds an autosaved enquiry draft lives in the cache before it is dropped
+# (customer_enquiry/drafts.py). Only Save or submit write a Customer row.
+DRAFT_TTL = 3 * 24 * 3600
+
+# Pages loaded before drafts existed post no draft_token: Save promotes
+# straight to a Customer row and the page posts its customer_id back. That
+# path is honoured until this date (ISO), by when every such page is long closed.
+LEGACY_CUSTOMER_ID_UNTIL = '2026-11-19'
+
+# Incomplete Customer rows untouched this many days are stale drafts: hidden
+# from the dashboard/exports by default and removed by `manage.py purge_stale_drafts`
+STALE_DRAFT_DAYS = 30
+
+# Leads classified lost with no activity for this many days are moved to the
+# archive tables by `manage.py archive_leads` (customer_enquiry/archive.py)
+ARCHIVE_LOST_AFTER_DAYS = 180
+
+# Background lead exports (customer_enquiry/exports.py, `manage.py run_export_jobs`).
+# Finished files live in EXPORT_ROOT and are reused by identical exports for
+# EXPORT_RESULT_TTL seconds, as long as none of the exported data has changed.
+EXPORT_ROOT = os.path.join(BASE_DIR, 'exports')
+EXPORT_RESULT_TTL = 24 * 3600
+EXPORT_CHUNK_SIZE = 1000   # Customers read (and progress saved) per chunk
+EXPORT_WATERMARK_LAG = 10  # Seconds incremental exports stay behind "now", for in-flight transactions
+
+# Rows the Import Leads page accepts in one upload (the import runs while the
+# browser waits); larger files go through `manage.py import_leads`.
+IMPORT_WEB_MAX_ROWS = 20000
+
+# Seconds a computed lead funnel (customer_enquiry/analytics.py) stays cached.
+# Keys include a data version, so edits show up at once regardless.
+ANALYTICS_CACHE_TTL = 24 * 3600
 
 # Interakt WhatsApp API
 INTERAKT_API_KEY = os.environ.get('INTERAKT_API_KEY', '')
 
+# Serve the OTP / password-reset URLs from customer_enquiry/async_views.py.
+# Spenta/asgi.py switches this on; WSGI workers keep the sync views.
+ASYNC_OTP_VIEWS = os.environ.get('SPENTA_ASYNC_VIEWS') == '1'
+
+# Query budgets — max queries per request for the heavy views (see customer_enquiry/query_budget.py)
+QUERY_BUDGET_ENABLED = DEBUG or TESTING
+QUERY_BUDGET_RAISE = TESTING            # Raise in tests, log a warning in development
+QUERY_BUDGET_REPEAT_THRESHOLD = 10      # Same query shape this many times = likely N+1
+QUERY_BUDGETS = {
+    'dashboard': 15,
+    'export_leads': 12,
+    'sourcing_manager_dashboard': 15,
+    'closing_manager_dashboard': 15,
+    'edit_customer': 20,
+    'audit_trail': 12,
+}
+
 # Password reset settings
 PASSWORD_RESET_TIMEOUT = 3600  # 1 hour
 
@@ -7,6 +7,7 @@ from datetime import datetime
 
 from .models import Customer, CustomerSource, ChannelPartner, Referral, InternalSalesAssessment
 from .models import BookingApplication, BookingApplicant, BookingChannelPartner, Project, UserProfile
+from .models import ArchivedLead
 
 # Inline Admin Classes
 class CustomerSourceInline(admin.TabularInline):
@@ -326,4 +327,28 @@ class ProjectAdmin(admin.ModelAdmin):
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'whatsapp_number')
-    search_fields = ('user__username', 'user__email', 'whatsapp_number')
\ No newline at end of file
+    search_fields = ('user__username', 'user__email', 'whatsapp_number')
+
+
+@admin.register(ArchivedLead)
+class ArchivedLeadAdmin(admin.ModelAdmin):
+    """Look up leads moved to cold storage by `archive_leads`; restore them in bulk"""
+    list_display = ('form_number', 'full_name', 'phone_number', 'lead_classification', 'last_activity_at', 'archived_at')
+    list_filter = ('lead_classification', 'archived_at')
+    search_fields = ('form_number', 'full_name', 'phone_number', 'email')
+    date_hierarchy = 'archived_at'
+    exclude = ('payload',)
+    readonly_fields = ('customer_id', 'form_number', 'full_name', 'phone_number', 'email',
+                       'lead_classification', 'last_activity_at', 'archived_at')
+    actions = ['restore_leads']
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Restore selected leads to the dashboard")
+    def restore_leads(self, request, queryset):
+        from . import archive
+        restored = sum(1 for customer_id in queryset.values_list('customer_id', flat=True)
+                       if archive.restore(customer_id) is not None)
+        self.message_user(request, f"{restored} lead(s) restored.")
@@ -0,0 +1,218 @@
+"""
+Lead funnel analytics: enquiry → assessment → booking.
+
+funnel() answers the analytics page and its JSON endpoint. It counts
+submitted enquiries, how many reached an internal sales assessment and a
+booking, the conversion rates between the stages and the median days from
+enquiry to each, overall and broken down by project, lead source, channel
+partner, sourcing/closing manager and week.
+
+The leads are pulled as columns in three queries (customers with their
+one-to-one relations, first booking per customer, lead sources) and
+aggregated with pandas group-bys — no Python loop per lead. Results are
+cached under the filters plus the lead data version (versioning.py) and the
+'staff' invalidation generation, so any change to those is a new key and
+nothing has to be invalidated. Malformed filters raise FilterRejected (a 400 from the API).
+pandas is imported inside the functions that need it.
+"""
+from datetime import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import invalidation, singleflight
+from .exports import data_version
+from .models import BookingApplication, Customer, CustomerSource
+from .reference_data import active_project_names
+from .views import get_project_name_from_form_number
+
+CACHE_KEY = 'analytics:funnel:{digest}'
+
+FILTER_FIELDS = ('date_from', 'date_to', 'property')
+
+# Breakdowns, in page order: (key, heading)
+DIMENSIONS = [
+    ('project', 'Project'),
+    ('source', 'Lead Source'),
+    ('channel_partner', 'Channel Partner'),
+    ('sourcing_manager', 'Sourcing Manager'),
+    ('closing_manager', 'Closing Manager'),
+    ('week', 'Week'),
+]
+
+NONE_LABEL = '(none)'
+
+
+class FilterRejected(Exception):
+    """A funnel filter value that can't be used (e.g. a malformed date)."""
+
+
+def funnel_filters(params):
+    """The non-empty filters in `params`, dates normalised to YYYY-MM-DD. Raises FilterRejected."""
+    filters = {field: params.get(field, '').strip() for field in FILTER_FIELDS if params.get(field, '').strip()}
+    for field in ('date_from', 'date_to'):
+        if field in filters:
+            try:
+                parsed = parse_date(filters[field])
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                raise FilterRejected(f"{field} must be a date in YYYY-MM-DD format.")
+            filters[field] = parsed.isoformat()
+    return filters
+
+
+def funnel(params):
+    """
+    The funnel for the filters in `params` (GET QueryDict or dict), from the
+    cache when the data hasn't changed. Raises FilterRejected for bad filters.
+    """
+    filters = funnel_filters(params)
+    # Manager names come from User; signals.py moves the 'staff' generation when they change
+    staff_generation = invalidation.current(['staff'])['staff']
+    digest = hashlib.sha256(
+        f"{json.dumps(filters, sort_keys=True)}|{data_version()}|{staff_generation}".encode()
+    ).hexdigest()
+    return singleflight.get_or_set(CACHE_KEY.format(digest=digest), lambda: compute_funnel(filters),
+                                   settings.ANALYTICS_CACHE_TTL)
+
+
+def _manager_name(frame, prefix):
+    """Full name of the manager columns `prefix`_first/_last, falling back to the username."""
+    full_name = (frame[f'{prefix}_first'].fillna('') + ' ' + frame[f'{prefix}_last'].fillna('')).str.strip()
+    return full_name.where(full_name != '', frame[f'{prefix}_username']).fillna(NONE_LABEL)
+
+
+def funnel_customers(filters):
+    """The submitted enquiries the funnel covers."""
+    customers = Customer.objects.filter(is_complete=True)
+    if filters.get('date_from'):
+        customers = customers.filter(created_at__date__gte=filters['date_from'])
+    if filters.get('date_to'):
+        customers = customers.filter(created_at__date__lte=filters['date_to'])
+    if filters.get('property'):
+        customers = customers.filter(form_number__startswith=filters['property'])
+    return customers.order_by()
+
+
+def lead_frame(customers):
+    """One row per enquiry with its funnel timestamps and breakdown columns."""
+    import pandas as pd
+
+    columns = {
+        'id': 'id',
+        'form_number': 'form_number',
+        'created_at': 'created_at',
+        'channel_partner': 'channel_partner__partner_name',
+        'assessed_at': 'sales_assessment__created_at',
+        'sourcing_first': 'assignment__sourcing_manager__first_name',
+        'sourcing_last': 'assignment__sourcing_manager__last_name',
+        'sourcing_username': 'assignment__sourcing_manager__username',
+        'closing_first': 'assignment__closing_manager__first_name',
+        'closing_last': 'assignment__closing_manager__last_name',
+        'closing_username': 'assignment__closing_manager__username',
+    }
+    leads = pd.DataFrame.from_records(
+        customers.values_list(*columns.values()), columns=list(columns)
+    )
+    bookings = pd.DataFrame.from_records(
+        BookingApplication.objects.filter(customer__in=customers).order_by()
+        .values('customer_id').annotate(booked_at=Min('created_at')).values_list('customer_id', 'booked_at'),
+        columns=['id', 'booked_at'],
+    )
+    leads = leads.merge(bookings, on='id', how='left')
+
+    for column in ('created_at', 'assessed_at', 'booked_at'):
+        leads[column] = pd.to_datetime(leads[column], utc=True)
+    leads['days_to_assessment'] = (leads['assessed_at'] - leads['created_at']).dt.total_seconds() / 86400
+    leads['days_to_booking'] = (leads['booked_at'] - leads['created_at']).dt.total_seconds() / 86400
+
+    # Project names depend only on the form-number prefix: look each prefix up once
+    prefixes = leads['form_number'].str.replace(r'\d+$', '', regex=True).str.upper()
+    project_names = active_project_names()
+    names = {
+        prefix: get_project_name_from_form_number(form_number, project_names) or 'Unknown Property'
+        for prefix, form_number in leads['form_number'].groupby(prefixes).first().items()
+    }
+    leads['project'] = prefixes.map(names)
+
+    leads['channel_partner'] = leads['channel_partner'].replace('', None).fillna(NONE_LABEL)
+    leads['sourcing_manager'] = _manager_name(leads, 'sourcing')
+    leads['closing_manager'] = _manager_name(leads, 'closing')
+    local_created = leads['created_at'].dt.tz_convert(timezone.get_current_timezone()).dt.tz_localize(None)
+    leads['week'] = local_created.dt.to_period('W-SUN').dt.start_time.dt.strftime('%Y-%m-%d')
+    return leads
+
+
+def source_frame(leads, customers):
+    """The leads exploded to one row per (lead, source); leads without a source count under NONE_LABEL."""
+    import pandas as pd
+
+    labels = dict(CustomerSource._meta.get_field('source_type').flatchoices)
+    sources = pd.DataFrame.from_records(
+        CustomerSource.objects.filter(customer__in=customers).order_by()
+        .values_list('customer_id', 'source_type').distinct(),
+        columns=['id', 'source'],
+    )
+    sources['source'] = sources['source'].map(labels).fillna(sources['source'])
+    by_source = leads.merge(sources, on='id', how='left')
+    by_source['source'] = by_source['source'].fillna(NONE_LABEL)
+    return by_source
+
+
+def summarise(frame, by):
+    """Funnel counts, rates and medians per value of column `by`, as a DataFrame."""
+    summary = frame.groupby(by, sort=False).agg(
+        enquiries=('id', 'size'),
+        assessed=('assessed_at', 'count'),
+        booked=('booked_at', 'count'),
+        median_days_to_assessment=('days_to_assessment', 'median'),
+        median_days_to_booking=('days_to_booking', 'median'),
+    )
+    summary['assessment_rate'] = summary['assessed'] / summary['enquiries']
+    summary['booking_rate'] = summary['booked'] / summary['enquiries']
+    summary['assessment_to_booking_rate'] = summary['booked'] / summary['assessed'].where(summary['assessed'] > 0)
+    return summary
+
+
+def _records(summary):
+    """DataFrame rows as JSON-ready dicts (NaN -> None, rates and medians rounded)."""
+    summary = summary.round({
+        'assessment_rate': 4, 'booking_rate': 4, 'assessment_to_booking_rate': 4,
+        'median_days_to_assessment': 1, 'median_days_to_booking': 1,
+    }).astype(object)
+    summary = summary.where(summary.notna(), None)
+    return [
+        {'key': key, **{column: (int(value) if column in ('enquiries', 'assessed', 'booked') else value)
+                        for column, value in row.items()}}
+        for key, row in summary.iterrows()
+    ]
+
+
+def compute_funnel(filters):
+    customers = funnel_customers(filters)
+    leads = lead_frame(customers)
+    result = {
+        'generated_at': datetime.now(timezone.get_current_timezone()).isoformat(timespec='seconds'),
+        'filters': filters,
+        'totals': None,
+        'breakdowns': {},
+    }
+    if leads.empty:
+        return result
+
+    leads['all'] = 'All enquiries'
+    result['totals'] = _records(summarise(leads, 'all'))[0]
+    frames = {'source': source_frame(leads, customers)}
+    for dimension, _ in DIMENSIONS:
+        summary = summarise(frames.get(dimension, leads), dimension)
+        if dimension == 'week':
+            summary = summary.sort_index()
+        else:
+            summary = summary.sort_values('enquiries', ascending=False, kind='stable')
+        result['breakdowns'][dimension] = _records(summary)
+    return result
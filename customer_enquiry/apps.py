@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CustomerEnquiryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'customer_enquiry'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,148 @@
+"""
+Cold storage for lost leads.
+
+`manage.py archive_leads` moves leads that were classified lost and have had
+no activity for settings.ARCHIVE_LOST_AFTER_DAYS out of the hot tables: the
+Customer and its child rows are serialized into one ArchivedLead row and
+deleted, so the dashboards, exports and their indexes only carry the working
+set. Booked leads are never archived.
+
+Archived leads stay findable by form number, name or phone in the admin
+(ArchivedLead). Opening one — any staff page that loads a customer through
+get_customer_or_404() — restores it under its original id first, so old links
+and bookmarks keep working ("restore on touch").
+"""
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import serializers
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from . import versioning
+from .models import ArchivedLead, AuditLog, Customer
+
+# Child rows that travel with an archived Customer
+ARCHIVED_RELATIONS = [
+    'sources', 'channel_partner', 'referral', 'additional_channel_partners',
+    'revisits', 'sales_assessment', 'assignment',
+]
+
+
+def collect(customers, relations):
+    """The customers followed by their related rows (parents first, as loaddata needs)."""
+    children = []
+    for customer in customers:
+        for relation in relations:
+            related = getattr(customer, relation, None)
+            if related is None:
+                continue
+            if hasattr(related, 'all'):
+                children.extend(related.all())
+            else:
+                children.append(related)
+    return list(customers) + children
+
+
+def archivable(days=None):
+    """Lost, unbooked leads with no customer, assessment or revisit activity in `days`."""
+    if days is None:
+        days = settings.ARCHIVE_LOST_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    return Customer.objects.filter(
+        sales_assessment__lead_classification='lost',
+        sales_assessment__updated_at__lt=cutoff,
+        updated_at__lt=cutoff,
+        booking_applications__isnull=True,
+    ).exclude(revisits__created_at__gte=cutoff).order_by()
+
+
+def _last_activity(customer):
+    moments = [customer.updated_at, customer.sales_assessment.updated_at]
+    moments.extend(revisit.created_at for revisit in customer.revisits.all())
+    return max(moments)
+
+
+def archive_batch(ids):
+    """Move the given customers into ArchivedLead in one transaction. Returns how many moved."""
+    with transaction.atomic():
+        customers = list(
+            Customer.objects.filter(pk__in=ids)
+            .select_related('sales_assessment', 'channel_partner', 'referral', 'assignment')
+            .prefetch_related('sources', 'additional_channel_partners', 'revisits')
+        )
+        ArchivedLead.objects.bulk_create([
+            ArchivedLead(
+                customer_id=customer.id,
+                form_number=customer.form_number,
+                full_name=customer.get_full_name(),
+                phone_number=customer.phone_number or '',
+                email=customer.email,
+                lead_classification=customer.sales_assessment.lead_classification,
+                last_activity_at=_last_activity(customer),
+                payload=serializers.serialize('json', collect([customer], ARCHIVED_RELATIONS)),
+            )
+            for customer in customers
+        ])
+        Customer.objects.filter(pk__in=[customer.id for customer in customers]).delete()
+        AuditLog.objects.create(
+            action='archive',
+            model_name='Customer',
+            object_repr=f"{len(customers)} lost lead(s)",
+            changes=json.dumps({'form_numbers': [customer.form_number for customer in customers]}),
+        )
+        versioning.bump()
+    return len(customers)
+
+
+def restore(customer_id):
+    """
+    Put an archived lead back under its original id. Returns the Customer,
+    or None if it isn't archived. Safe to race: only one request moves it back.
+    """
+    archived = ArchivedLead.objects.filter(customer_id=customer_id).first()
+    if archived is None:
+        return None
+    try:
+        with transaction.atomic():
+            # Whoever deletes the archive row does the restore
+            if not ArchivedLead.objects.filter(pk=archived.pk).delete()[0]:
+                return Customer.objects.filter(pk=customer_id).first()
+            user_ids = set(User.objects.values_list('id', flat=True))
+            for deserialized in serializers.deserialize('json', archived.payload):
+                obj = deserialized.object
+                # Staff accounts removed since archiving become "unassigned" (their FKs are SET_NULL)
+                for field in obj._meta.concrete_fields:
+                    if field.is_relation and field.related_model is User and getattr(obj, field.attname) not in user_ids:
+                        setattr(obj, field.attname, None)
+                deserialized.save()
+            # Count the restore as activity, or the next archive run would take it straight back
+            Customer.objects.filter(pk=customer_id).update(updated_at=timezone.now())
+            versioning.bump()
+    except IntegrityError:
+        pass  # restored concurrently
+    return Customer.objects.filter(pk=customer_id).first()
+
+
+def get_customer_or_404(request, pk):
+    """get_object_or_404(Customer, pk=pk), restoring the lead from the archive if it was archived."""
+    customer = Customer.objects.filter(pk=pk).first()
+    if customer is not None:
+        return customer
+    customer = restore(pk)
+    if customer is None:
+        raise Http404("No Customer matches the given query.")
+
+    from .views import log_action
+    log_action(request.user if request.user.is_authenticated else None, 'restore', 'Customer',
+               customer.id, str(customer), request=request)
+    return customer
+
+
+def form_number_in_use(form_number):
+    """True if a live or archived lead already has this form number."""
+    return (Customer.objects.filter(form_number=form_number).exists()
+            or ArchivedLead.objects.filter(form_number=form_number).exists())
@@ -0,0 +1,222 @@
+"""
+Async versions of the views that spend their time waiting on Interakt.
+
+Under ASGI (Spenta/asgi.py) urls.py routes the OTP and password-reset URLs
+here instead of to views.py, so a worker can hold many WhatsApp sends in
+flight on one event loop rather than tying up a thread per request. They
+behave exactly like their sync counterparts — same rate limits, session keys,
+templates and JSON — but use the async cache, session and ORM APIs and the
+pooled async Interakt client. WSGI deployments keep using views.py.
+"""
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import interakt
+from . import otp as otp_store
+from . import ratelimit
+from .models import UserProfile
+from .views import ENQUIRY_OTP_ERRORS, PROPERTY_FORM_URLS, RESET_OTP_ERRORS, get_client_ip, log_action
+
+logger = logging.getLogger(__name__)
+
+# Context processors may touch request.user (a DB hit), so templates render off the loop
+arender = sync_to_async(render)
+alog_action = sync_to_async(log_action)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def send_otp_view(request):
+    """
+    Generate OTP on backend and send via Interakt WhatsApp API with rate limiting
+    """
+    try:
+        data = json.loads(request.body)
+        phone_number = data.get('phone_number')
+
+        if not phone_number or len(phone_number) != 10 or not phone_number.isdigit():
+            return JsonResponse({'success': False, 'message': 'Invalid phone number format'})
+
+        client_ip = get_client_ip(request)
+
+        # --- Rate limit by phone number ---
+        phone_cache_key = f'otp_count_phone_{phone_number}'
+        phone_count = await ratelimit.acount(phone_cache_key)
+
+        if phone_count >= settings.OTP_MAX_PER_PHONE:
+            logger.warning(f"OTP rate limit hit for phone {phone_number}")
+            return JsonResponse({
+                'success': False,
+                'message': 'Too many OTP requests for this number. Please try again after 1 hour.'
+            })
+
+        # --- Rate limit by IP address ---
+        ip_cache_key = f'otp_count_ip_{client_ip}'
+        ip_count = await ratelimit.acount(ip_cache_key)
+
+        if ip_count >= settings.OTP_MAX_PER_IP:
+            logger.warning(f"OTP rate limit hit for IP {client_ip}")
+            return JsonResponse({
+                'success': False,
+                'message': 'Too many requests from your network. Please try again after 1 hour.'
+            })
+
+        # Generate OTP on backend (secure) — only its hash is stored
+        otp = await otp_store.aissue('enquiry', phone_number)
+
+        # Send via Interakt WhatsApp API — the loop serves other requests meanwhile
+        response = await interakt.asend_template(
+            interakt.otp_template_payload(phone_number, otp, 'otp_verification')
+        )
+
+        if response.status_code in (200, 201):
+            # Increment counters only on successful send
+            await ratelimit.ahit(phone_cache_key, settings.OTP_BLOCK_DURATION)
+            await ratelimit.ahit(ip_cache_key, settings.OTP_BLOCK_DURATION)
+
+            logger.info(f"OTP sent via WhatsApp for phone {phone_number} (attempt {phone_count + 1})")
+            return JsonResponse({'success': True, 'message': 'OTP sent to your WhatsApp number'})
+        else:
+            await otp_store.adiscard('enquiry', phone_number)
+            logger.error(f"Interakt API error: {response.status_code} - {response.text}")
+            return JsonResponse({'success': False, 'message': 'Failed to send OTP. Please try again.'})
+
+    except Exception as e:
+        logger.error(f"Error sending OTP: {str(e)}")
+        return JsonResponse({'success': False, 'message': 'Failed to send OTP. Please try again.'})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def verify_otp_view(request):
+    """
+    Verify OTP entered by user against the OTP store
+    """
+    try:
+        data = json.loads(request.body)
+        phone_number = data.get('phone_number')
+        entered_otp = data.get('otp')
+        property_code = data.get('property_code')
+
+        if not all([phone_number, entered_otp, property_code]):
+            return JsonResponse({'success': False, 'message': 'All fields are required.'})
+
+        # One keyed lookup; expiry, attempt limit and single use are handled by the store
+        otp_result = await otp_store.averify('enquiry', phone_number, entered_otp)
+        if otp_result != otp_store.VERIFIED:
+            return JsonResponse({'success': False, 'message': ENQUIRY_OTP_ERRORS[otp_result]})
+
+        # Mark user as authenticated
+        await request.session.aset('user_authenticated', True)
+        await request.session.aset('user_phone', phone_number)
+
+        redirect_url = PROPERTY_FORM_URLS.get(property_code, '/customer-form/')
+        return JsonResponse({'success': True, 'redirect_url': redirect_url})
+
+    except Exception as e:
+        logger.error(f"Error verifying OTP: {str(e)}")
+        return JsonResponse({'success': False, 'message': 'Verification failed. Please try again.'})
+
+
+async def password_reset_request(request):
+    """
+    Step 1: User enters username — OTP is sent to their registered WhatsApp number
+    """
+    if request.method == 'POST':
+        username = request.POST.get('username', '').strip()
+
+        if not username:
+            messages.error(request, 'Please enter your username.')
+            return await arender(request, 'password_reset_form.html')
+
+        # --- Rate limit by username ---
+        username_cache_key = f'pwd_reset_count_user_{username}'
+        username_count = await ratelimit.acount(username_cache_key)
+        if username_count >= settings.OTP_MAX_PER_PHONE:
+            messages.error(request, 'Too many password reset attempts for this account. Please try again after 1 hour.')
+            return await arender(request, 'password_reset_form.html')
+
+        # --- Rate limit by IP ---
+        client_ip = get_client_ip(request)
+        ip_cache_key = f'pwd_reset_count_ip_{client_ip}'
+        ip_count = await ratelimit.acount(ip_cache_key)
+        if ip_count >= settings.OTP_MAX_PER_IP:
+            messages.error(request, 'Too many password reset attempts from your network. Please try again after 1 hour.')
+            return await arender(request, 'password_reset_form.html')
+
+        try:
+            user = await User.objects.aget(username=username)
+        except User.DoesNotExist:
+            # Still increment counters to prevent username enumeration
+            await ratelimit.ahit(username_cache_key, settings.OTP_BLOCK_DURATION)
+            await ratelimit.ahit(ip_cache_key, settings.OTP_BLOCK_DURATION)
+            messages.error(request, 'No account found with this username.')
+            return await arender(request, 'password_reset_form.html')
+
+        try:
+            profile = await UserProfile.objects.aget(user=user)
+        except UserProfile.DoesNotExist:
+            messages.error(request, 'No WhatsApp number registered for this account. Please contact your administrator.')
+            return await arender(request, 'password_reset_form.html')
+
+        # Generate OTP — only its hash is stored
+        otp = await otp_store.aissue('password_reset', username)
+
+        # Send via Interakt WhatsApp API
+        try:
+            response = await interakt.asend_template(
+                interakt.otp_template_payload(profile.whatsapp_number, otp, 'password_reset_otp')
+            )
+
+            if response.status_code in (200, 201):
+                # Increment rate limit counters on successful send
+                await ratelimit.ahit(username_cache_key, settings.OTP_BLOCK_DURATION)
+                await ratelimit.ahit(ip_cache_key, settings.OTP_BLOCK_DURATION)
+                await request.session.aset('reset_username', username)
+                messages.success(request, 'OTP sent to your registered WhatsApp number.')
+                await alog_action(user, 'password_reset', 'User', user.id,
+                                  f'Password reset OTP sent for {username}', request=request)
+                return redirect('customer_enquiry:password_reset_verify')
+            else:
+                await otp_store.adiscard('password_reset', username)
+                logger.error(f"Interakt error: {response.status_code} - {response.text}")
+                messages.error(request, 'Failed to send OTP. Please try again.')
+
+        except Exception as e:
+            logger.error(f"OTP send error: {str(e)}")
+            messages.error(request, 'Failed to send OTP. Please try again.')
+
+    return await arender(request, 'password_reset_form.html')
+
+
+async def password_reset_verify(request):
+    """
+    Step 2: User enters the OTP received on WhatsApp
+    """
+    if request.method == 'POST':
+        entered_otp = request.POST.get('otp', '').strip()
+        username = await request.session.aget('reset_username')
+        otp_result = await otp_store.averify('password_reset', username, entered_otp) if username else otp_store.MISSING
+
+        if otp_result == otp_store.INVALID:
+            messages.error(request, 'Invalid OTP. Please try again.')
+            return await arender(request, 'password_reset_verify.html')
+
+        if otp_result != otp_store.VERIFIED:
+            messages.error(request, RESET_OTP_ERRORS[otp_result])
+            return redirect('customer_enquiry:password_reset')
+
+        # OTP correct — mark as verified
+        await request.session.aset('reset_otp_verified', True)
+        return redirect('customer_enquiry:password_reset_new')
+
+    return await arender(request, 'password_reset_verify.html')
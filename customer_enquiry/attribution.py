@@ -0,0 +1,204 @@
+"""
+Channel partner attribution and the partner leaderboard.
+
+Leads name their channel partner in three places — ChannelPartner (at
+enquiry), AdditionalChannelPartner and BookingChannelPartner — as free text
+with no link to the ChannelPartnerMaster directory. PartnerAttribution holds
+one row per such mention with the mobile and RERA number normalised and
+resolved to a master partner (RERA first: it is unique per partner; then
+mobile). PartnerStats keeps each partner's counters, so the leaderboard reads
+one small table instead of joining four.
+
+Both are derived from the lead tables and kept current by the same outbox as
+LeadSummary: lead_summary.sync() passes the changed customers to refresh(),
+which re-resolves their mentions and recomputes the counters of every partner
+they touched (before and after). Directory edits re-resolve the mentions that
+match the edited partner (partner_changed(), from signals.py).
+`manage.py rebuild_lead_summary` rebuilds everything.
+"""
+import re
+
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+
+from .models import (
+    AdditionalChannelPartner, BookingApplication, BookingChannelPartner, ChannelPartner,
+    ChannelPartnerMaster, Customer, InternalSalesAssessment, PartnerAttribution, PartnerStats,
+)
+
+# Customers re-resolved per query (keeps IN lists well under SQLite's variable limit)
+BATCH = 500
+
+LEADERBOARD_SORTS = {
+    'enquiries': ['-enquiries', '-booked'],
+    'assessed': ['-assessed', '-enquiries'],
+    'booked': ['-booked', '-enquiries'],
+    'claims': ['-additional_claims', '-enquiries'],
+}
+
+_NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+
+
+def normalize_mobile(value):
+    """The last 10 digits ('+91 98000-00001' -> '9800000001'), or '' if there are fewer."""
+    digits = ''.join(ch for ch in value or '' if ch.isdigit())
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def normalize_rera(value):
+    """Upper-case letters and digits only ('a5 1800-000 152' -> 'A51800000152')."""
+    return _NON_ALNUM_RE.sub('', (value or '').upper())
+
+
+def directory():
+    """(rera -> partner id, mobile -> partner id) over the whole directory; active partners win ties."""
+    by_rera, by_mobile = {}, {}
+    for pk, mobile, rera in ChannelPartnerMaster.objects.order_by('is_active', 'pk').values_list(
+            'pk', 'mobile_number', 'rera_number'):
+        if normalize_rera(rera):
+            by_rera[normalize_rera(rera)] = pk
+        if normalize_mobile(mobile):
+            by_mobile[normalize_mobile(mobile)] = pk
+    return by_rera, by_mobile
+
+
+def resolve(mobile, rera, partners):
+    """(partner id, matched_by) for normalised identifiers, or (None, '')."""
+    by_rera, by_mobile = partners
+    if rera and rera in by_rera:
+        return by_rera[rera], 'rera'
+    if mobile and mobile in by_mobile:
+        return by_mobile[mobile], 'mobile'
+    return None, ''
+
+
+def mentions_for(customer_ids, partners):
+    """Unsaved PartnerAttribution rows for every partner mention on these customers."""
+    sources = [
+        ('enquiry', ChannelPartner.objects.filter(customer_id__in=customer_ids)
+         .values_list('pk', 'customer_id', 'mobile_number', 'rera_number')),
+        ('additional', AdditionalChannelPartner.objects.filter(customer_id__in=customer_ids)
+         .values_list('pk', 'customer_id', 'mobile_number', 'rera_number')),
+        ('booking', BookingChannelPartner.objects.filter(booking_application__customer_id__in=customer_ids)
+         .values_list('pk', 'booking_application__customer_id', 'mobile', 'maharera_registration')),
+    ]
+    rows = []
+    for kind, mentions in sources:
+        for source_id, customer_id, mobile, rera in mentions:
+            mobile, rera = normalize_mobile(mobile), normalize_rera(rera)
+            partner_id, matched_by = resolve(mobile, rera, partners)
+            rows.append(PartnerAttribution(
+                kind=kind, source_id=source_id, customer_id=customer_id, mobile=mobile, rera=rera[:50],
+                partner_id=partner_id, matched_by=matched_by,
+            ))
+    return rows
+
+
+def refresh(customer_ids):
+    """Re-resolve the partner mentions of these customers and update the counters they affect."""
+    ids = sorted(set(customer_ids))
+    partners = directory()
+    touched = set()
+    for start in range(0, len(ids), BATCH):
+        chunk = ids[start:start + BATCH]
+        current = PartnerAttribution.objects.filter(customer_id__in=chunk)
+        touched.update(current.exclude(partner=None).values_list('partner_id', flat=True))
+        current.delete()
+        rows = mentions_for(chunk, partners)
+        PartnerAttribution.objects.bulk_create(rows)
+        touched.update(row.partner_id for row in rows if row.partner_id)
+    recompute_stats(touched)
+
+
+def recompute_stats(partner_ids):
+    """Recount PartnerStats for these partners from PartnerAttribution (one grouped query per batch)."""
+    partner_ids = sorted(set(partner_ids))
+    for start in range(0, len(partner_ids), BATCH):
+        chunk = ChannelPartnerMaster.objects.filter(pk__in=partner_ids[start:start + BATCH]).values_list('pk', flat=True)
+        stats = {pk: PartnerStats(partner_id=pk) for pk in chunk}
+        if not stats:
+            continue
+        enquiry = Q(kind='enquiry')
+        counts = (
+            PartnerAttribution.objects.filter(partner_id__in=list(stats)).order_by()
+            .values('partner_id')
+            .annotate(
+                enquiries=Count('customer_id', filter=enquiry, distinct=True),
+                assessed=Count('customer_id', distinct=True, filter=enquiry & Q(Exists(
+                    InternalSalesAssessment.objects.filter(customer_id=OuterRef('customer_id'))))),
+                booked=Count('customer_id', distinct=True, filter=enquiry & Q(Exists(
+                    BookingApplication.objects.filter(customer_id=OuterRef('customer_id'))))),
+                additional_claims=Count('customer_id', filter=Q(kind='additional'), distinct=True),
+                booking_forms=Count('source_id', filter=Q(kind='booking')),
+                last_enquiry_at=Max(Subquery(Customer.objects.filter(pk=OuterRef('customer_id')).values('created_at')),
+                                    filter=enquiry),
+            )
+        )
+        for row in counts:
+            stat = stats[row.pop('partner_id')]
+            for field, value in row.items():
+                setattr(stat, field, value)
+        PartnerStats.objects.bulk_create(
+            stats.values(), update_conflicts=True, unique_fields=['partner'],
+            update_fields=['enquiries', 'assessed', 'booked', 'additional_claims', 'booking_forms',
+                           'last_enquiry_at', 'updated_at'],
+        )
+
+
+def partner_changed(partner_id, mobile, rera):
+    """
+    A directory partner was added, edited or removed: re-resolve the mentions
+    that are attributed to it or carry its mobile/RERA number.
+    """
+    mobile, rera = normalize_mobile(mobile), normalize_rera(rera)
+    match = Q(partner_id=partner_id)
+    if mobile:
+        match |= Q(mobile=mobile)
+    if rera:
+        match |= Q(rera=rera)
+    partners = directory()
+    touched = {partner_id}
+    changed = []
+    for row in PartnerAttribution.objects.filter(match):
+        resolved = resolve(row.mobile, row.rera, partners)
+        touched.update(pk for pk in (row.partner_id, resolved[0]) if pk)
+        if (row.partner_id, row.matched_by) != resolved:
+            row.partner_id, row.matched_by = resolved
+            changed.append(row)
+    PartnerAttribution.objects.bulk_update(changed, ['partner', 'matched_by'], batch_size=BATCH)
+    recompute_stats(touched)
+
+
+def rebuild(progress=None):
+    """Re-resolve every partner mention and recount every partner. Returns the number of mentions."""
+    PartnerAttribution.objects.all().delete()
+    partners = directory()
+    written = 0
+    last_pk = 0
+    while True:
+        ids = list(Customer.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:BATCH])
+        if not ids:
+            break
+        rows = mentions_for(ids, partners)
+        PartnerAttribution.objects.bulk_create(rows)
+        written += len(rows)
+        last_pk = ids[-1]
+        if progress:
+            progress(written)
+    PartnerStats.objects.all().delete()
+    recompute_stats(ChannelPartnerMaster.objects.values_list('pk', flat=True))
+    return written
+
+
+def leaderboard(sort='enquiries'):
+    """PartnerStats rows with their partner, best first by `sort` (a LEADERBOARD_SORTS key)."""
+    return (PartnerStats.objects.select_related('partner')
+            .filter(Q(enquiries__gt=0) | Q(additional_claims__gt=0) | Q(booking_forms__gt=0))
+            .order_by(*LEADERBOARD_SORTS.get(sort, LEADERBOARD_SORTS['enquiries'])))
+
+
+def unmatched():
+    """Mentions whose partner isn't in the directory, per kind, with the most frequent mobiles."""
+    rows = PartnerAttribution.objects.filter(partner=None).order_by()
+    by_kind = dict(rows.values_list('kind').annotate(n=Count('pk')))
+    top = list(rows.exclude(mobile='').values('mobile').annotate(mentions=Count('pk')).order_by('-mentions')[:10])
+    return {'by_kind': by_kind, 'total': sum(by_kind.values()), 'top_mobiles': top}
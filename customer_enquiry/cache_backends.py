@@ -0,0 +1,459 @@
+"""
+Cache backends.
+
+TieredCache puts a small in-process LRU in front of another configured cache
+(the "shared" tier, e.g. the file cache every worker can see). Only keys
+matching LOCAL_KEY_PREFIXES are held locally — hot, read-mostly data such as
+the project registry or partner directory — each prefix with its own local
+TTL, so a worker never serves a local copy older than that. Every other key
+goes straight to the shared tier.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'customer_enquiry.cache_backends.TieredCache',
+            'OPTIONS': {
+                'SHARED': 'shared',                 # alias of the backing cache
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_KEY_PREFIXES': {'ref:': 300, 'otp_count_': 5},
+            },
+        },
+        'shared': {...},
+    }
+
+Writes and deletes go to both tiers. Other workers' local copies age out
+after their TTL; invalidate_local() drops this worker's copy early. stats()
+reports hits per tier, misses, evictions and expirations for monitoring.
+
+Django builds a cache backend instance per thread, so the local tier isn't
+kept on the instance: every TieredCache configured the same way in a process
+uses one _LocalTier, and LOCAL_MAX_ENTRIES and stats() are per worker
+process whatever its thread count.
+
+SQLiteCache is a multi-process cache in one WAL-mode SQLite file, meant as
+the shared tier when there's no cache server.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class _LocalTier:
+    """The in-process LRU of one TieredCache configuration, shared by all threads of the process."""
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = dict.fromkeys(('local_hits', 'shared_hits', 'misses', 'evictions', 'expirations'), 0)
+        # Namespace generations these entries are synced to (invalidation.py) — same scope as the entries
+        self.generations = {}
+
+
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+def _local_tier(config):
+    with _local_tiers_lock:
+        return _local_tiers.setdefault(config, _LocalTier())
+
+
+# (pid, database path) of every SQLiteCache purge thread started — one per file per process
+_purgers = set()
+_purgers_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', 'shared')
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        # Longest prefix first, so 'ref:staff:' can override 'ref:'
+        self._local_ttls = sorted(options.get('LOCAL_KEY_PREFIXES', {}).items(), key=lambda item: -len(item[0]))
+        # Identically configured instances (one per thread) address the same keys, so they share a tier
+        tier = _local_tier((location, self.key_prefix, self._shared_alias, repr(sorted(options.items()))))
+        self._local = tier.entries
+        self._lock = tier.lock
+        self._stats = tier.stats
+        self.local_generations = tier.generations
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # ── local tier ───────────────────────────────────────────────────────────
+
+    def _local_ttl(self, key):
+        for prefix, ttl in self._local_ttls:
+            if key.startswith(prefix):
+                return ttl
+        return None
+
+    def _local_get(self, local_key):
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry is None:
+                return _MISSING
+            expires_at, pickled = entry
+            if expires_at <= time.monotonic():
+                del self._local[local_key]
+                self._stats['expirations'] += 1
+                return _MISSING
+            self._local.move_to_end(local_key)
+            self._stats['local_hits'] += 1
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout, version):
+        ttl = self._local_ttl(key)
+        if ttl is None:
+            return
+        local_key = self.make_and_validate_key(key, version=version)
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            self._local_delete(local_key)
+            return
+        # Pickled like LocMemCache, so callers can't mutate the cached copy
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[local_key] = (time.monotonic() + ttl, pickled)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _local_delete(self, local_key):
+        with self._lock:
+            self._local.pop(local_key, None)
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self._stats[stat] += n
+
+    def invalidate_local(self, key=None, version=None):
+        """Drop this worker's local copy of `key` (or of everything) without touching the shared tier."""
+        if key is None:
+            with self._lock:
+                self._local.clear()
+        else:
+            self._local_delete(self.make_and_validate_key(key, version=version))
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, local_entries=len(self._local), local_max_entries=self._local_max_entries)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['local_hit_rate'] = round(stats['local_hits'] / lookups, 4) if lookups else None
+        return stats
+
+    # ── cache API ────────────────────────────────────────────────────────────
+
+    def get(self, key, default=None, version=None):
+        local = self._local_ttl(key) is not None
+        if local:
+            value = self._local_get(self.make_and_validate_key(key, version=version))
+            if value is not _MISSING:
+                return value
+
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('misses')
+            return default
+        self._count('shared_hits')
+        if local:
+            self._local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._local_set(key, value, timeout, version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._local_set(key, value, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self._local_delete(self.make_and_validate_key(key, version=version))
+        return self.shared.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        if self._local_ttl(key) is not None:
+            if self._local_get(self.make_and_validate_key(key, version=version)) is not _MISSING:
+                return True
+        return self.shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._local_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        remote = []
+        for key in keys:
+            value = _MISSING
+            if self._local_ttl(key) is not None:
+                value = self._local_get(self.make_and_validate_key(key, version=version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            self._count('shared_hits', len(fetched))
+            self._count('misses', len(remote) - len(fetched))
+            for key, value in fetched.items():
+                self._local_set(key, value, DEFAULT_TIMEOUT, version)
+            found.update(fetched)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._local_set(key, value, timeout, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._local_delete(self.make_and_validate_key(key, version=version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.invalidate_local()
+        self.shared.clear()
+
+
+class SQLiteCache(BaseCache):
+    """
+    Shared cache in a single SQLite file (LOCATION), usable by every worker on
+    the host without a cache server.
+
+    - WAL mode, so readers never block the writer and vice versa.
+    - `expires` is indexed; expired rows are ignored on read and deleted in
+      batches by a background thread every OPTIONS['PURGE_INTERVAL'] seconds,
+      which also culls the soonest-to-expire rows past MAX_ENTRIES.
+    - Integers are stored as SQLite integers, so incr() is one atomic UPDATE;
+      add() is one conditional upsert. Everything else is pickled.
+    - get_many()/set_many()/delete_many() are one statement per call.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+    # Stay under SQLITE_MAX_VARIABLE_NUMBER on old builds
+    max_params = 900
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = os.path.abspath(location)
+        self._purge_interval = options.get('PURGE_INTERVAL', 60)
+        self._busy_timeout = options.get('BUSY_TIMEOUT', 5)
+        self._local = threading.local()
+
+    # ── connection ───────────────────────────────────────────────────────────
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value, expires REAL) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._start_purger()
+        return conn
+
+    def _start_purger(self):
+        # One daemon thread per file per process (instances are per thread); a forked worker starts its own
+        if not self._purge_interval:
+            return
+        with _purgers_lock:
+            purger = (os.getpid(), self._path)
+            if purger not in _purgers:
+                _purgers.add(purger)
+                threading.Thread(target=self._purge_loop, name='sqlite-cache-purge', daemon=True).start()
+
+    def _purge_loop(self):
+        while True:
+            time.sleep(self._purge_interval)
+            try:
+                self.purge()
+            except sqlite3.Error:
+                pass  # busy or locked — try again next round
+
+    # ── encoding ─────────────────────────────────────────────────────────────
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return sqlite3.Binary(pickle.dumps(value, self.pickle_protocol))
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _expiry(self, timeout):
+        return self.get_backend_timeout(timeout)  # absolute time.time(), or None for "never"
+
+    # ── cache API ────────────────────────────────────────────────────────────
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+        return default if row is None else self._decode(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._connection().execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+            (key, self._encode(value), self._expiry(timeout)),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Inserts, or overwrites only an expired row — rowcount says which happened
+        cursor = self._connection().execute(
+            'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            (key, self._encode(value), self._expiry(timeout), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        db_key = self.make_and_validate_key(key, version=version)
+        conn = self._connection()
+        # fetchall() so the statement completes (and commits) before we return
+        rows = conn.execute(
+            "UPDATE cache SET value = value + ? WHERE key = ? AND typeof(value) = 'integer' "
+            'AND (expires IS NULL OR expires > ?) RETURNING value',
+            (delta, db_key, time.time()),
+        ).fetchall()
+        if rows:
+            return rows[0][0]
+
+        # Missing, expired, or a pickled (non-int) value: fall back to read-modify-write under a lock
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (db_key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            new_value = self._decode(row[0]) + delta
+            conn.execute('UPDATE cache SET value = ? WHERE key = ?', (self._encode(new_value), db_key))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return new_value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self._expiry(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        found = {}
+        db_keys = list(key_map)
+        for start in range(0, len(db_keys), self.max_params):
+            chunk = db_keys[start:start + self.max_params]
+            rows = self._connection().execute(
+                'SELECT key, value FROM cache WHERE key IN (%s) AND (expires IS NULL OR expires > ?)'
+                % ', '.join('?' * len(chunk)),
+                (*chunk, time.time()),
+            )
+            for db_key, value in rows:
+                found[key_map[db_key]] = self._decode(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        rows = [(self.make_and_validate_key(key, version=version), self._encode(value), expires)
+                for key, value in data.items()]
+        per_statement = self.max_params // 3
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            self._connection().execute(
+                'INSERT INTO cache (key, value, expires) VALUES %s '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires'
+                % ', '.join(['(?, ?, ?)'] * len(chunk)),
+                [param for row in chunk for param in row],
+            )
+        return []
+
+    def delete_many(self, keys, version=None):
+        db_keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        for start in range(0, len(db_keys), self.max_params):
+            chunk = db_keys[start:start + self.max_params]
+            self._connection().execute(
+                'DELETE FROM cache WHERE key IN (%s)' % ', '.join('?' * len(chunk)), chunk
+            )
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def purge(self, batch_size=1000):
+        """Delete expired rows, then cull past MAX_ENTRIES. Returns the number of rows removed."""
+        conn = self._connection()
+        removed = 0
+        while True:
+            deleted = conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache WHERE expires <= ? LIMIT ?)',
+                (time.time(), batch_size),
+            ).rowcount
+            removed += deleted
+            if deleted < batch_size:
+                break
+
+        count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count > self._max_entries:
+            # Same rule as Django's backends: drop 1/CULL_FREQUENCY, soonest-to-expire first
+            cull = count // self._cull_frequency if self._cull_frequency else count
+            removed += conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)',
+                (cull,),
+            ).rowcount
+        return removed
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests — nothing to do per request
+        pass
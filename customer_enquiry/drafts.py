@@ -0,0 +1,85 @@
+"""
+Cache-staged drafts of the multi-step enquiry form.
+
+Autosaves from save_step_view land here rather than in Customer: one cache
+entry per draft token holding the fields entered so far. A Customer row is
+only written when the visitor presses Save (the draft is "promoted") or
+submits the form. Abandoned drafts simply expire after settings.DRAFT_TTL,
+so they never reach the dashboards or exports.
+
+A draft is a dict:
+
+    {'step': 2, 'property_code': 'ALT-12345', 'fields': {...}, 'customer_id': None}
+
+customer_id is set once the draft has been promoted, so later saves and the
+final submit update that row instead of creating another. Promoted ids are
+also kept in the visitor's session; a customer_id posted by the page is only
+adopted if it is one of them.
+"""
+import secrets
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+DRAFT_KEY = 'draft:{token}'
+SESSION_CUSTOMERS_KEY = 'draft_customer_ids'
+TOKEN_BYTES = 16
+
+
+def new_token():
+    return secrets.token_urlsafe(TOKEN_BYTES)
+
+
+def new_draft():
+    return {'step': 0, 'property_code': '', 'fields': {}, 'customer_id': None}
+
+
+def get(token):
+    """The draft stored under `token`, or None if it expired or never existed."""
+    if not token:
+        return None
+    return cache.get(DRAFT_KEY.format(token=token))
+
+
+def save(token, draft):
+    cache.set(DRAFT_KEY.format(token=token), draft, settings.DRAFT_TTL)
+
+
+def discard(token):
+    if token:
+        cache.delete(DRAFT_KEY.format(token=token))
+
+
+def bind_customer(session, customer_id):
+    """Remember that this session promoted `customer_id`, so its page may post the id back."""
+    ids = session.get(SESSION_CUSTOMERS_KEY, [])
+    if customer_id not in ids:
+        session[SESSION_CUSTOMERS_KEY] = ids + [customer_id]
+
+
+def legacy_page(data):
+    """
+    True for a post from a page loaded before drafts existed (it sends no
+    draft_token), until settings.LEGACY_CUSTOMER_ID_UNTIL.
+    """
+    return ('draft_token' not in data
+            and timezone.localdate() <= date.fromisoformat(settings.LEGACY_CUSTOMER_ID_UNTIL))
+
+
+def posted_customer_id(data, session):
+    """
+    The customer_id the page posted, if this session promoted that row — None
+    otherwise, or if it came from an older page after the legacy cutoff.
+    Raises ValueError if it isn't an integer.
+    """
+    raw = data.get('customer_id', '').strip()
+    if not raw:
+        return None
+    if not raw.isdigit():
+        raise ValueError('customer_id must be a whole number')
+    if 'draft_token' not in data and not legacy_page(data):
+        return None
+    customer_id = int(raw)
+    return customer_id if customer_id in session.get(SESSION_CUSTOMERS_KEY, []) else None
@@ -0,0 +1,668 @@
+"""
+Lead export builders and background export jobs.
+
+Kept out of views.py so URL resolution and every non-export request never pay
+for pandas/openpyxl — they are imported inside the functions that need them.
+
+Exports run outside the request: POST /export-leads/ records an ExportJob
+(enqueue()), `manage.py run_export_jobs` builds the file in chunks and keeps
+the job's progress up to date (run_job()), and the dashboard polls the job
+and downloads the file when it is done.
+
+Files are stored under settings.EXPORT_ROOT, named by result_key(): a hash of
+the filters plus data_version() (versioning.py). An identical export requested again before
+anything it covers has changed — and within EXPORT_RESULT_TTL — reuses the
+finished file instead of queueing new work.
+
+Incremental exports (``incremental=1``, optionally ``feed=<name>``) only
+cover customers created or updated since the previous incremental export of
+the same user or named feed. The window is (watermark, now - lag], read with
+a range scan on the updated_at index; the ExportWatermark moves to the end
+of the window in the same transaction that marks the job done. The lag
+(EXPORT_WATERMARK_LAG) leaves rows whose transaction may not have committed
+yet to the next export rather than skipping them for good.
+
+Workbooks are streamed with openpyxl's write-only mode, so memory stays flat
+however many leads are exported. ``sheets=all`` adds one sheet per related
+table (assessments, bookings, applicants, partners), each read with a single
+query keyed by the filtered customer ids and linked to the leads sheet by
+Form Number.
+
+``format=parquet`` and ``format=ndjson`` are for analytics consumers: one
+flat row per lead (ANALYTICS_COLUMNS, choice fields as their stored codes)
+read in values_list chunks, with no model instances. Parquet dictionary-
+encodes the choice columns and carries each one's code -> label map in the
+field metadata; NDJSON is gzip-compressed JSON Lines. pyarrow is only needed
+for Parquet.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+import gzip
+import hashlib
+import importlib.util
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (AdditionalChannelPartner, BookingApplicant, BookingApplication,
+                     BookingChannelPartner, ChannelPartner, Customer, CustomerSource,
+                     ExportJob, ExportWatermark, InternalSalesAssessment)
+from . import versioning
+from .reference_data import active_project_names
+from .views import filter_leads, get_project_name_from_form_number
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# format=... -> (file extension, download content type)
+FORMATS = {
+    'xlsx': ('.xlsx', XLSX_CONTENT_TYPE),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'ndjson': ('.ndjson.gz', 'application/gzip'),
+}
+
+# Dashboard parameters filter_leads() reads, plus export options; everything else in the POST is ignored
+FILTER_FIELDS = ('search', 'property', 'date_from', 'date_to', 'assessment', 'booking',
+                 'form_numbers', 'drafts')
+OPTION_FIELDS = ('sheets', 'format')
+
+LEADS_SHEET = 'Leads Export'
+
+# Extra sheets of a sheets=all export: (title, model, path from the model to its Customer)
+RELATED_SHEETS = [
+    ('Assessments', InternalSalesAssessment, 'customer'),
+    ('Bookings', BookingApplication, 'customer'),
+    ('Applicants', BookingApplicant, 'booking_application__customer'),
+    ('Booking Partners', BookingChannelPartner, 'booking_application__customer'),
+    ('Channel Partners', ChannelPartner, 'customer'),
+    ('Additional Partners', AdditionalChannelPartner, 'customer'),
+]
+
+# Rows looked at to size each sheet's columns (write-only sheets can't be resized afterwards)
+WIDTH_SAMPLE_ROWS = 200
+
+# Columns of the Parquet/NDJSON exports: (name, values_list path or None if derived, kind)
+ANALYTICS_COLUMNS = [
+    ('id', 'id', 'int'),
+    ('form_number', 'form_number', 'string'),
+    ('property', None, 'choice'),
+    ('first_name', 'first_name', 'string'),
+    ('middle_name', 'middle_name', 'string'),
+    ('last_name', 'last_name', 'string'),
+    ('email', 'email', 'string'),
+    ('phone_number', 'phone_number', 'string'),
+    ('sex', 'sex', 'choice'),
+    ('marital_status', 'marital_status', 'choice'),
+    ('date_of_birth', 'date_of_birth', 'date'),
+    ('city', 'city', 'string'),
+    ('locality', 'locality', 'string'),
+    ('pincode', 'pincode', 'string'),
+    ('residential_address', 'residential_address', 'string'),
+    ('nationality', 'nationality', 'choice'),
+    ('employment_type', 'employment_type', 'choice'),
+    ('company_name', 'company_name', 'string'),
+    ('designation', 'designation', 'string'),
+    ('industry', 'industry', 'string'),
+    ('configuration', 'configuration', 'choice'),
+    ('budget', 'budget', 'choice'),
+    ('construction_status', 'construction_status', 'choice'),
+    ('purpose_of_buying', 'purpose_of_buying', 'choice'),
+    ('lead_sources', None, 'choice_list'),
+    ('channel_partner_name', 'channel_partner__partner_name', 'string'),
+    ('source_details', 'source_details', 'string'),
+    ('has_assessment', 'sales_assessment__id', 'bool'),
+    ('lead_classification', 'sales_assessment__lead_classification', 'choice'),
+    ('has_booking', None, 'bool'),
+    ('is_complete', 'is_complete', 'bool'),
+    ('created_at', 'created_at', 'timestamp'),
+    ('updated_at', 'updated_at', 'timestamp'),
+]
+
+# Leads per Parquet row group (several values_list chunks are buffered into one)
+PARQUET_ROW_GROUP_ROWS = 50000
+
+FEED_NAME_RE = re.compile(r'^[-\w]{1,50}$')
+
+
+class ExportRejected(Exception):
+    """An export request that can't be queued; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def filtered_customers(params, customers=None):
+    """Customers selected by an export's filters and incremental window."""
+    if customers is None:
+        customers = Customer.objects.all()
+    # Incremental window, set by enqueue() — never taken from the request
+    if params.get('updated_after'):
+        customers = customers.filter(updated_at__gt=parse_datetime(params['updated_after']))
+    if params.get('updated_before'):
+        customers = customers.filter(updated_at__lte=parse_datetime(params['updated_before']))
+    return filter_leads(customers, params)
+
+
+def export_queryset(params):
+    """Filtered customers for an export, with everything lead_rows() touches preloaded."""
+    customers = Customer.objects.select_related('sales_assessment', 'channel_partner').prefetch_related(
+        'sources', 'booking_applications'
+    ).order_by('-created_at')
+    return filtered_customers(params, customers)
+
+
+def lead_rows(customers):
+    """Yield one flat dict per customer, in the column order of the Excel export."""
+    project_names = active_project_names()
+    for customer in customers:
+        # Get property name from the cached prefix map (no query per row)
+        property_name = get_project_name_from_form_number(customer.form_number, project_names)
+        if not property_name:
+            property_name = 'Unknown Property'
+
+        # Get sources
+        sources = ', '.join([source.get_source_type_display() for source in customer.sources.all()])
+
+        # Get channel partner information
+        channel_partner_name = ''
+        try:
+            if hasattr(customer, 'channel_partner') and customer.channel_partner:
+                channel_partner_name = customer.channel_partner.partner_name
+        except (ChannelPartner.DoesNotExist, AttributeError):
+            channel_partner_name = ''
+
+        # Assessment status
+        assessment_status = 'Completed' if hasattr(customer, 'sales_assessment') and customer.sales_assessment else 'Pending'
+
+        # Booking status
+        booking_status = 'Completed' if customer.booking_applications.all() else 'Pending'
+
+        yield {
+            'Form Number': customer.form_number,
+            'Property': property_name,
+            'First Name': customer.first_name,
+            'Middle Name': customer.middle_name or '',
+            'Last Name': customer.last_name,
+            'Email': customer.email,
+            'Phone Number': customer.phone_number or 'Not Provided',
+            'Date of Birth': customer.date_of_birth.strftime('%Y-%m-%d') if customer.date_of_birth else '',
+            'City': customer.city,
+            'Locality': customer.locality,
+            'Pincode': customer.pincode,
+            'Residential Address': customer.residential_address,
+            'Nationality': customer.get_nationality_display(),
+            'Employment Type': customer.get_employment_type_display(),
+            'Company Name': customer.company_name or '',
+            'Designation': customer.designation or '',
+            'Industry': customer.industry or '',
+            'Configuration': customer.configuration,
+            'Budget': customer.budget,
+            'Construction Status': customer.get_construction_status_display(),
+            'Purpose of Buying': customer.get_purpose_of_buying_display(),
+            'Lead Sources': sources,
+            'Channel Partner Name': channel_partner_name or 'Not Applicable',
+            'Source Details': customer.source_details or '',
+            'Assessment Status': assessment_status,
+            'Booking Status': booking_status,
+            'Created Date': customer.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+
+
+def related_sheet(model, customer_path, customer_ids, chunk_size, heartbeat):
+    """
+    (headers, rows) for one related table: a single query for every row whose
+    customer is in `customer_ids` (a subquery), Form Number first. Choice
+    fields are written as their labels; the customer foreign key is replaced
+    by the Form Number, other foreign keys keep their ids.
+    """
+    fields = [field for field in model._meta.concrete_fields if field.name != 'customer']
+    headers = ['Form Number']
+    for field in fields:
+        if field.primary_key:
+            headers.append('ID')
+        elif field.is_relation:
+            headers.append(f'{field.verbose_name.title()} ID')
+        else:
+            headers.append(field.verbose_name.title())
+    labels = [dict(field.flatchoices) if field.choices else None for field in fields]
+
+    queryset = model.objects.filter(**{f'{customer_path}__in': customer_ids}).order_by(
+        f'{customer_path}__form_number', 'pk'
+    ).values_list(f'{customer_path}__form_number', *[field.attname for field in fields])
+
+    def rows():
+        for count, values in enumerate(queryset.iterator(chunk_size=chunk_size), 1):
+            if count % chunk_size == 0:
+                heartbeat()
+            yield [values[0]] + [
+                choices.get(value, value) if choices else value
+                for choices, value in zip(labels, values[1:])
+            ]
+    return headers, rows()
+
+
+def _cell_value(value):
+    """What openpyxl can store: naive local datetimes, strings without control characters."""
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def write_workbook(path, sheets):
+    """
+    Stream `sheets` — (title, headers, rows) — into an .xlsx file at `path`.
+    Rows are lists in header order, or dicts when `headers` is None (the keys
+    of the first row become the header). Only WIDTH_SAMPLE_ROWS rows per sheet
+    are held in memory, to size its columns.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    for title, headers, rows in sheets:
+        sheet = workbook.create_sheet(title)
+        rows = iter(rows)
+        sample = list(itertools.islice(rows, WIDTH_SAMPLE_ROWS))
+        if headers is None:
+            headers = list(sample[0]) if sample else []
+            sample = [list(row.values()) for row in sample]
+            rows = (list(row.values()) for row in rows)
+
+        # Size columns to the header and the sampled values, as the old export did for every row
+        for index, header in enumerate(headers):
+            longest = max([len(str(header))] + [len(str(row[index])) for row in sample])
+            sheet.column_dimensions[get_column_letter(index + 1)].width = min(longest + 2, 50)
+
+        if headers:
+            header_cells = []
+            for header in headers:
+                cell = WriteOnlyCell(sheet, value=header)
+                cell.font = bold
+                header_cells.append(cell)
+            sheet.append(header_cells)
+        for row in itertools.chain(sample, rows):
+            sheet.append([_cell_value(value) for value in row])
+    workbook.save(path)
+
+
+def analytics_chunks(params, chunk_size):
+    """
+    Yield the filtered leads as columns — {name: [values]} in ANALYTICS_COLUMNS
+    order — `chunk_size` leads at a time. Each chunk is one slice of a single
+    values_list query plus one query each for its lead sources and bookings.
+    """
+    names = [name for name, path, _ in ANALYTICS_COLUMNS if path]
+    rows = filtered_customers(params).order_by('-created_at').values_list(
+        *[path for _, path, _ in ANALYTICS_COLUMNS if path]
+    ).iterator(chunk_size=chunk_size)
+    project_names = active_project_names()
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        columns = dict(zip(names, map(list, zip(*chunk))))
+        ids = columns['id']
+
+        sources = defaultdict(list)
+        for customer_id, source_type in CustomerSource.objects.filter(customer_id__in=ids).order_by(
+                'pk').values_list('customer_id', 'source_type'):
+            sources[customer_id].append(source_type)
+        booked = set(BookingApplication.objects.filter(customer_id__in=ids).values_list('customer_id', flat=True))
+
+        columns['property'] = [get_project_name_from_form_number(form_number, project_names) or 'Unknown Property'
+                               for form_number in columns['form_number']]
+        columns['lead_sources'] = [sources.get(customer_id, []) for customer_id in ids]
+        columns['has_assessment'] = [assessment_id is not None for assessment_id in columns['has_assessment']]
+        columns['has_booking'] = [customer_id in booked for customer_id in ids]
+        yield {name: columns[name] for name, _, _ in ANALYTICS_COLUMNS}
+
+
+def _choice_labels(name):
+    """Code -> label map of a choice column, for the Parquet field metadata."""
+    if name == 'property':
+        return None
+    if name == 'lead_sources':
+        field = CustomerSource._meta.get_field('source_type')
+    elif name == 'lead_classification':
+        field = InternalSalesAssessment._meta.get_field('lead_classification')
+    else:
+        field = Customer._meta.get_field(name)
+    return {str(code): str(label) for code, label in field.flatchoices}
+
+
+def analytics_schema():
+    import pyarrow as pa
+
+    choice = pa.dictionary(pa.int32(), pa.string())
+    types = {
+        'int': pa.int64(),
+        'string': pa.string(),
+        'choice': choice,
+        'choice_list': pa.list_(choice),
+        'bool': pa.bool_(),
+        'date': pa.date32(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+    }
+    fields = []
+    for name, _, kind in ANALYTICS_COLUMNS:
+        labels = _choice_labels(name) if kind.startswith('choice') else None
+        metadata = {'choices': json.dumps(labels)} if labels else None
+        fields.append(pa.field(name, types[kind], metadata=metadata))
+    return pa.schema(fields)
+
+
+def write_parquet(path, chunks, progress):
+    """Write analytics_chunks() to a Parquet file, PARQUET_ROW_GROUP_ROWS leads per row group."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = analytics_schema()
+    written = 0
+    pending = []
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for columns in chunks:
+            pending.append(pa.RecordBatch.from_pydict(columns, schema=schema))
+            written += len(columns['id'])
+            if sum(batch.num_rows for batch in pending) >= PARQUET_ROW_GROUP_ROWS:
+                writer.write_table(pa.Table.from_batches(pending, schema=schema))
+                pending = []
+            progress(written)
+        if pending:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema))
+    return written
+
+
+def _json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def write_ndjson(path, chunks, progress):
+    """Write analytics_chunks() as gzip-compressed JSON Lines, one lead per line."""
+    written = 0
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        for columns in chunks:
+            names = list(columns)
+            for values in zip(*columns.values()):
+                f.write(json.dumps(dict(zip(names, values)), default=_json_value, ensure_ascii=False))
+                f.write('\n')
+            written += len(columns['id'])
+            progress(written)
+    return written
+
+
+def build_export(path, params, chunk_size, progress):
+    """
+    Write the export described by `params` to `path`, in its format. Calls
+    progress(leads_so_far) after each chunk; returns the number of leads.
+    """
+    export_format = params.get('format', 'xlsx')
+    if export_format == 'parquet':
+        return write_parquet(path, analytics_chunks(params, chunk_size), progress)
+    if export_format == 'ndjson':
+        return write_ndjson(path, analytics_chunks(params, chunk_size), progress)
+
+    customers = export_queryset(params)
+    processed = 0
+
+    def leads():
+        nonlocal processed
+        for row in lead_rows(customers.iterator(chunk_size=chunk_size)):
+            processed += 1
+            if processed % chunk_size == 0:
+                progress(processed)
+            yield row
+
+    sheets = [(LEADS_SHEET, None, leads())]
+    if params.get('sheets') == 'all':
+        customer_ids = filtered_customers(params).values('pk')
+        for title, model, customer_path in RELATED_SHEETS:
+            headers, rows = related_sheet(model, customer_path, customer_ids, chunk_size,
+                                          lambda: progress(processed))
+            sheets.append((title, headers, rows))
+    write_workbook(path, sheets)
+    return processed
+
+
+def export_params(params):
+    """The non-empty filter and option fields of a GET/POST QueryDict, as a plain dict."""
+    return {field: params.get(field, '').strip()
+            for field in FILTER_FIELDS + OPTION_FIELDS if params.get(field, '').strip()}
+
+
+def export_filename(params):
+    property_filter = params.get('property', '')
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # Manager dashboards export just the leads they list (form_numbers)
+    if property_filter:
+        property_suffix = f'_{property_filter}'
+    else:
+        property_suffix = '_Assigned' if params.get('form_numbers') else '_All'
+    if params.get('updated_before'):
+        property_suffix += '_new'
+    if params.get('sheets') == 'all':
+        property_suffix += '_full'
+    extension, _ = FORMATS[params.get('format', 'xlsx')]
+    return f'leads_export{property_suffix}_{timestamp}{extension}'
+
+
+def content_type(job):
+    extension, content_type = FORMATS[json.loads(job.params).get('format', 'xlsx')]
+    return content_type
+
+
+def data_version():
+    """
+    Version of everything an export reads: one cache get (see versioning.py).
+    Any insert, edit or delete moves it, so it never matches a file built
+    from older data.
+    """
+    return versioning.current()
+
+
+def result_key(params, version=None):
+    """Cache key for the finished file of an export with these filters."""
+    if version is None:
+        version = data_version()
+    return hashlib.sha256(f"{json.dumps(params, sort_keys=True)}|{version}".encode()).hexdigest()
+
+
+def result_path(key):
+    return os.path.join(settings.EXPORT_ROOT, key)
+
+
+def has_fresh_result(key):
+    """True if the file for `key` exists and is younger than EXPORT_RESULT_TTL."""
+    try:
+        return time.time() - os.path.getmtime(result_path(key)) < settings.EXPORT_RESULT_TTL
+    except OSError:
+        return False
+
+
+def watermark_key(user, filters, feed=''):
+    """
+    ExportWatermark key for a named feed, or for the user's own incremental
+    exports of this filter set — new Altavista leads and new leads overall are
+    separate "since last time"s.
+    """
+    if feed:
+        return f'feed:{feed}'
+    if not filters:
+        return f'user:{user.pk}'
+    return f"user:{user.pk}:{hashlib.sha256(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:16]}"
+
+
+def advance_watermark(key, since, until):
+    """
+    Move watermark `key` from `since` (None if it never existed) to `until`.
+    Compare-and-set: returns False, changing nothing, if another export moved it first.
+    """
+    if since is None:
+        try:
+            with transaction.atomic():
+                ExportWatermark.objects.create(key=key, exported_until=until)
+            return True
+        except IntegrityError:
+            return False
+    return bool(ExportWatermark.objects.filter(key=key, exported_until=since).update(
+        exported_until=until, updated_at=timezone.now()))
+
+
+def _incremental_window(user, params, filters):
+    """Add the (watermark, now - lag] window to `filters`; returns the watermark key."""
+    feed = params.get('feed', '').strip()
+    if feed and not FEED_NAME_RE.match(feed):
+        raise ExportRejected('Feed names may only contain letters, digits, "-" and "_" (50 at most).')
+    key = watermark_key(user, filters, feed)
+
+    pending = ExportJob.objects.filter(watermark_key=key, status__in=('queued', 'running')).first()
+    if pending is not None and pending.user_id != user.pk:
+        raise ExportRejected('An export of this feed is already in progress.', status=409)
+
+    since = ExportWatermark.objects.filter(key=key).values_list('exported_until', flat=True).first()
+    until = timezone.now() - timedelta(seconds=settings.EXPORT_WATERMARK_LAG)
+    if since is not None:
+        filters['updated_after'] = since.isoformat()
+        until = max(until, since)
+    filters['updated_before'] = until.isoformat()
+    return key, pending
+
+
+def enqueue(user, params):
+    """
+    Record an export of `params` for `user`. Comes back already done when an
+    identical export (same filters, same data) has a fresh file; otherwise
+    queued for run_export_jobs. Raises ExportRejected for a request that
+    can't be queued.
+    """
+    filters = export_params(params)
+    export_format = filters.get('format', 'xlsx')
+    if export_format not in FORMATS:
+        raise ExportRejected(f'Unknown export format "{export_format}" (use {", ".join(FORMATS)}).')
+    if export_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise ExportRejected('Parquet exports need pyarrow installed on the server.', status=501)
+    watermark = ''
+    if params.get('incremental') in ('1', 'true', 'on'):
+        watermark, pending = _incremental_window(user, params, filters)
+        if pending is not None:
+            # Already on its way — a second job would export the same window again
+            return pending
+    key = result_key(filters)
+    job = ExportJob(user=user, params=json.dumps(filters), result_key=key,
+                    filename=export_filename(filters), watermark_key=watermark)
+    if has_fresh_result(key):
+        previous = ExportJob.objects.filter(result_key=key, status='done').first()
+        if previous is not None:
+            now = timezone.now()
+            job.status = 'done'
+            job.total_rows = job.processed_rows = previous.total_rows
+            job.started_at = job.finished_at = now
+    job.save()
+    return job
+
+
+def job_status(job):
+    """The JSON the dashboard polls for."""
+    status = {
+        'success': job.status != 'failed',
+        'job_id': job.id,
+        'status': job.status,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'percent': job.percent,
+        'status_url': reverse('customer_enquiry:export_job_status', args=[job.id]),
+    }
+    if job.status == 'done':
+        status['download_url'] = reverse('customer_enquiry:export_job_download', args=[job.id])
+    if job.status == 'failed':
+        status['error'] = job.error or 'Export failed'
+    return status
+
+
+def _write_result(key, write):
+    """
+    Have `write(path)` write the file next to its final name, then rename it
+    in, so readers never see half a file.
+    """
+    os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.EXPORT_ROOT, prefix='.export-', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, result_path(key))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def run_job(job, chunk_size=None):
+    """
+    Build the file for a claimed (running) job, reading customers `chunk_size`
+    at a time and saving progress after each chunk. Returns the lead count.
+    """
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    jobs = ExportJob.objects.filter(pk=job.pk)
+    params = json.loads(job.params)
+    jobs.update(total_rows=export_queryset(params).count(), updated_at=timezone.now())
+
+    def progress(processed):
+        jobs.update(processed_rows=processed, updated_at=timezone.now())
+
+    processed = 0
+
+    def write(path):
+        nonlocal processed
+        processed = build_export(path, params, chunk_size, progress)
+
+    _write_result(job.result_key, write)
+    finish_job(job, processed)
+    return processed
+
+
+def finish_job(job, rows):
+    """Mark a job done and, for an incremental export, move its watermark past the exported window."""
+    with transaction.atomic():
+        if job.watermark_key:
+            params = json.loads(job.params)
+            since = parse_datetime(params['updated_after']) if params.get('updated_after') else None
+            advance_watermark(job.watermark_key, since, parse_datetime(params['updated_before']))
+        now = timezone.now()
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='done', total_rows=rows, processed_rows=rows, finished_at=now, updated_at=now)
+
+
+def purge_results():
+    """Delete finished files older than EXPORT_RESULT_TTL. Returns how many were removed."""
+    removed = 0
+    cutoff = time.time() - settings.EXPORT_RESULT_TTL
+    try:
+        entries = list(os.scandir(settings.EXPORT_ROOT))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            try:
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+    return removed
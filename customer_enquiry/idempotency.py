@@ -0,0 +1,129 @@
+"""
+Idempotency keys for the public enquiry POSTs.
+
+A double-tap or a mobile network that drops the response makes the browser
+send the same form again; without a guard every retry creates another
+Customer with a new form number. The enquiry form sends a client-generated
+key with each save/submit (``Idempotency-Key`` header, or an
+``idempotency_key`` field) and keeps it for retries until the server answers.
+
+Decorate a view with ``@idempotent('submit')``. The first request with a key
+runs the view; its response (anything but a 5xx) is kept in the cache for
+settings.IDEMPOTENCY_TTL seconds and replayed for every repeat of that key,
+with ``Idempotent-Replayed: true``, without running the view again. Requests
+without a key behave as before.
+
+A repeat that arrives while the first is still running waits briefly for its
+response, then gets a 409. Reusing a key for a different payload gets a 422.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+RESPONSE_KEY = 'idem:{scope}:{digest}'
+LOCK_KEY = 'idem-lock:{scope}:{digest}'
+HEADER = 'Idempotency-Key'
+FIELD = 'idempotency_key'
+MAX_KEY_LENGTH = 255
+
+# Response headers worth replaying (Location for the non-AJAX redirect)
+REPLAYED_HEADERS = ('Content-Type', 'Location')
+
+# Fields that change between otherwise identical retries
+IGNORED_FIELDS = {'csrfmiddlewaretoken', FIELD}
+
+LOCK_TIMEOUT = 60
+WAIT_SECONDS = 5
+POLL_INTERVAL = 0.1
+
+
+def request_key(request):
+    return (request.headers.get(HEADER) or request.POST.get(FIELD, '')).strip()
+
+
+def fingerprint(request):
+    """Hash of the submitted fields, to spot a key reused for a different payload."""
+    digest = hashlib.sha256(request.path.encode())
+    for name in sorted(request.POST):
+        if name in IGNORED_FIELDS:
+            continue
+        for value in request.POST.getlist(name):
+            digest.update(f'\0{name}={value}'.encode())
+    return digest.hexdigest()
+
+
+def _error(request, message, status):
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.headers.get(HEADER):
+        return JsonResponse({'success': False, 'error': message}, status=status)
+    return HttpResponse(message, status=status)
+
+
+def _replay(request, stored):
+    response = HttpResponse(stored['content'], status=stored['status'])
+    for header, value in stored['headers'].items():
+        response[header] = value
+    response['Idempotent-Replayed'] = 'true'
+    # Put back what the original request left in the session (e.g. for the thank-you page)
+    for name, value in stored['session'].items():
+        request.session[name] = value
+    return response
+
+
+def idempotent(scope, session_keys=()):
+    """
+    Decorator: replay the stored response for a repeated idempotency key.
+    `session_keys` are session entries the view sets that a replay restores.
+    """
+    def decorator(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key = request_key(request)
+            if request.method != 'POST' or not key:
+                return view_func(request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return _error(request, 'Invalid idempotency key', 400)
+
+            digest = hashlib.sha256(key.encode()).hexdigest()
+            response_key = RESPONSE_KEY.format(scope=scope, digest=digest)
+            lock_key = LOCK_KEY.format(scope=scope, digest=digest)
+            payload = fingerprint(request)
+
+            stored = cache.get(response_key)
+            if stored is None and not cache.add(lock_key, payload, LOCK_TIMEOUT):
+                # The first attempt is still running — give it a moment to finish
+                deadline = time.monotonic() + WAIT_SECONDS
+                while stored is None and time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    stored = cache.get(response_key)
+                if stored is None:
+                    return _error(request, 'This request is already being processed', 409)
+            elif stored is None:
+                # Finished between our get() and add()?
+                stored = cache.get(response_key)
+                if stored is not None:
+                    cache.delete(lock_key)
+
+            if stored is not None:
+                if stored['fingerprint'] != payload:
+                    return _error(request, 'Idempotency key was already used for a different request', 422)
+                return _replay(request, stored)
+
+            try:
+                response = view_func(request, *args, **kwargs)
+                if response.status_code < 500 and not getattr(response, 'streaming', False):
+                    cache.set(response_key, {
+                        'fingerprint': payload,
+                        'status': response.status_code,
+                        'content': response.content,
+                        'headers': {h: response[h] for h in REPLAYED_HEADERS if response.has_header(h)},
+                        'session': {name: request.session[name] for name in session_keys if name in request.session},
+                    }, settings.IDEMPOTENCY_TTL)
+                return response
+            finally:
+                cache.delete(lock_key)
+        return wrapper
+    return decorator
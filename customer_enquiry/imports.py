@@ -0,0 +1,530 @@
+"""
+Bulk lead import from XLSX/CSV — the admin page (import-leads/) and
+`manage.py import_leads`.
+
+Leads from exhibitions, portals and ad campaigns arrive as spreadsheets.
+import_leads() streams the rows (openpyxl read-only mode for .xlsx, csv for
+.csv), so the file is never loaded whole, and handles them in chunks:
+
+  * each row is validated against the Customer fields and choice lists
+    (codes or their labels, any case); bad rows are reported by row number
+    and skipped,
+  * duplicates — the same phone number or email earlier in the file, on a
+    live lead or on an archived one — are reported and skipped; the lookup
+    is one query per table per chunk, served by the phone and lower(email)
+    indexes,
+  * form numbers are handed out in blocks by FormNumberAllocator, which reads
+    the prefix's used numbers once,
+  * each chunk's customers, their CustomerSource rows and their LeadSummary
+    rows are written in one transaction, each table with a single
+    executemany() of pre-built tuples — bulk_create()'s per-object model and
+    field preparation cost several times the SQL itself on a 50k-row file.
+    Column defaults and timestamps are worked out once per chunk. These
+    writes skip the model signals, so each chunk bumps the data version
+    (versioning.py) itself.
+
+The admin page handles files up to settings.IMPORT_WEB_MAX_ROWS rows while
+the browser waits; larger files are rejected with a pointer to the command.
+
+Chunks commit as they go, so an interrupted import can simply be run again:
+the rows already imported come back as duplicates.
+"""
+import csv
+import io
+import json
+import os
+import random
+import time
+from datetime import date, datetime
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import AutoField, CharField, Q, TextField
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import lead_summary, versioning
+from .models import ArchivedLead, Customer, CustomerSource, LeadSummary
+from .reference_data import active_project_names
+
+CHUNK_SIZE = 1000
+
+# Per-row errors kept for the report (all are counted)
+MAX_REPORTED_ERRORS = 1000
+
+# Sources that need no partner/referral details, so a spreadsheet row can carry them
+IMPORTABLE_SOURCES = [
+    (code, label) for code, label in CustomerSource.SOURCE_CHOICES
+    if code not in ('channel_partner', 'referral')
+]
+
+# Customer fields a sheet may fill; other columns are ignored
+TEXT_FIELDS = (
+    'first_name', 'middle_name', 'last_name', 'residential_address', 'city', 'locality',
+    'company_name', 'designation', 'industry', 'source_details',
+)
+CHOICE_FIELDS = (
+    'sex', 'marital_status', 'nationality', 'employment_type', 'configuration', 'budget',
+    'construction_status', 'purpose_of_buying',
+)
+
+# Header spellings accepted besides the field names themselves
+HEADER_ALIASES = {
+    'name': 'full_name',
+    'customer_name': 'full_name',
+    'phone': 'phone_number',
+    'mobile': 'phone_number',
+    'mobile_number': 'phone_number',
+    'contact_number': 'phone_number',
+    'email_id': 'email',
+    'email_address': 'email',
+    'gender': 'sex',
+    'dob': 'date_of_birth',
+    'address': 'residential_address',
+    'pin_code': 'pincode',
+    'bhk': 'configuration',
+    'purpose': 'purpose_of_buying',
+    'source_type': 'source',
+    'lead_source': 'source',
+    'remarks': 'source_details',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y')
+
+
+class ImportRejected(Exception):
+    """The file as a whole can't be imported (unreadable, no usable columns, unknown property)."""
+
+
+def _header(value):
+    key = str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _check_headers(headers):
+    if not {'first_name', 'full_name'} & set(headers):
+        raise ImportRejected("The first row needs a 'First Name' (or 'Name') column.")
+    if not {'phone_number', 'email'} & set(headers):
+        raise ImportRejected("The first row needs a 'Phone Number' or 'Email' column.")
+
+
+def count_rows(fileobj, filename):
+    """
+    Data rows in an .xlsx/.csv (blank rows included, as an upper bound), read
+    without cleaning them; the file is rewound afterwards. Raises ImportRejected
+    for other file types.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    try:
+        if extension == '.xlsx':
+            from openpyxl import load_workbook
+
+            try:
+                workbook = load_workbook(fileobj, read_only=True, data_only=True)
+            except Exception as e:
+                raise ImportRejected(f"Could not read the workbook: {e}")
+            try:
+                sheet = workbook.worksheets[0]
+                # max_row comes from the sheet's dimension record; files without one are counted
+                rows = sheet.max_row if sheet.max_row is not None else sum(1 for _ in sheet.iter_rows(values_only=True))
+            finally:
+                workbook.close()
+        elif extension == '.csv':
+            text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+            try:
+                rows = sum(1 for _ in csv.reader(text))
+            except UnicodeDecodeError:
+                raise ImportRejected("The CSV file is not UTF-8 encoded.")
+            finally:
+                text.detach()
+        else:
+            raise ImportRejected("Upload an .xlsx or .csv file.")
+    finally:
+        fileobj.seek(0)
+    return max(rows - 1, 0)
+
+
+def read_rows(fileobj, filename):
+    """Yield (row number, {field: value}) from an .xlsx or .csv file, one row at a time."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+
+        try:
+            workbook = load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as e:
+            raise ImportRejected(f"Could not read the workbook: {e}")
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            headers = [_header(value) for value in next(rows, ())]
+            _check_headers(headers)
+            for number, values in enumerate(rows, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield number, dict(zip(headers, values))
+        finally:
+            workbook.close()
+    elif extension == '.csv':
+        text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+        try:
+            reader = csv.reader(text)
+            headers = [_header(value) for value in next(reader, [])]
+            _check_headers(headers)
+            for number, values in enumerate(reader, start=2):
+                if any(value.strip() for value in values):
+                    yield number, dict(zip(headers, values))
+        except UnicodeDecodeError:
+            raise ImportRejected("The CSV file is not UTF-8 encoded.")
+        finally:
+            text.detach()
+    else:
+        raise ImportRejected("Upload an .xlsx or .csv file.")
+
+
+def _choices(field):
+    """Map of lower-cased code and label -> code for a Customer choice field."""
+    lookup = {}
+    for code, label in Customer._meta.get_field(field).choices:
+        lookup[code.lower()] = code
+        lookup[str(label).lower()] = code
+    return lookup
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _phone(value):
+    """10-digit mobile from '98200 12345', '+91-9820012345', '09820012345' or 9820012345.0; '' if blank."""
+    digits = ''.join(ch for ch in _text(value) if ch.isdigit())
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    if digits and len(digits) != 10:
+        raise ValueError(f"phone number '{_text(value)}' is not a 10-digit mobile number")
+    return digits
+
+
+def _date(value, field):
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(_text(value), date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"{field} '{_text(value)}' is not a date (use YYYY-MM-DD or DD-MM-YYYY)")
+
+
+class RowCleaner:
+    """Turns a sheet row into Customer field values and a source type, or raises ValueError."""
+
+    def __init__(self, default_source, default_details):
+        self.default_source = default_source
+        self.default_details = default_details
+        self.choices = {field: _choices(field) for field in CHOICE_FIELDS}
+        self.choices['sex'].update({'m': 'male', 'f': 'female'})
+        self.sources = {}
+        for code, label in IMPORTABLE_SOURCES:
+            self.sources[code] = code
+            self.sources[str(label).lower()] = code
+            self.sources[str(label).split(' (')[0].lower()] = code  # 'Social Media'
+        self.max_lengths = {field: Customer._meta.get_field(field).max_length for field in TEXT_FIELDS}
+
+    def clean(self, row):
+        fields = {}
+        for field in TEXT_FIELDS:
+            value = _text(row.get(field))
+            if self.max_lengths[field] and len(value) > self.max_lengths[field]:
+                raise ValueError(f"{field} is longer than {self.max_lengths[field]} characters")
+            fields[field] = value
+
+        if not fields['first_name'] and row.get('full_name'):
+            parts = _text(row['full_name']).split()
+            if parts:
+                fields['first_name'] = parts[0]
+                fields['last_name'] = fields['last_name'] or ' '.join(parts[1:])
+        if not fields['first_name']:
+            raise ValueError("first name is missing")
+        if len(fields['first_name']) > 100 or len(fields['last_name']) > 100:
+            raise ValueError("name is longer than 100 characters")
+
+        fields['phone_number'] = _phone(row.get('phone_number')) or None
+        fields['email'] = _text(row.get('email')).lower()
+        if fields['email']:
+            try:
+                validate_email(fields['email'])
+            except ValidationError:
+                raise ValueError(f"email '{fields['email']}' is not valid")
+        if not fields['phone_number'] and not fields['email']:
+            raise ValueError("needs a phone number or an email")
+
+        fields['pincode'] = _text(row.get('pincode'))
+        if fields['pincode'] and not (len(fields['pincode']) == 6 and fields['pincode'].isdigit()):
+            raise ValueError(f"pincode '{fields['pincode']}' is not 6 digits")
+        fields['date_of_birth'] = _date(row.get('date_of_birth'), 'date_of_birth')
+        form_date = _date(row.get('form_date'), 'form_date')
+        if form_date:
+            fields['form_date'] = form_date
+
+        for field in CHOICE_FIELDS:
+            value = _text(row.get(field))
+            if value:
+                if value.lower() not in self.choices[field]:
+                    raise ValueError(f"{field} '{value}' is not one of the form's options")
+                value = self.choices[field][value.lower()]
+            fields[field] = value
+
+        source = _text(row.get('source'))
+        if source:
+            if source.lower() in ('channel_partner', 'channel partner', 'referral'):
+                raise ValueError(f"source '{source}' can't be imported "
+                                 f"(channel partner and referral leads need the enquiry form)")
+            if source.lower() not in self.sources:
+                raise ValueError(f"source '{source}' is not one of the form's lead sources")
+            source = self.sources[source.lower()]
+        if not fields['source_details']:
+            fields['source_details'] = self.default_details
+        return fields, source or self.default_source
+
+
+class FormNumberAllocator:
+    """
+    Hands out unused random form numbers (PREFIX-NNNNN) for one prefix in
+    blocks, reading the numbers already in use — live and archived — once.
+    When the five-digit range gets crowded it moves on to six digits, and so on.
+    """
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.reload()
+
+    def _count_used(self):
+        low, high = 10 ** (self.digits - 1), 10 ** self.digits
+        self.used_in_range = sum(1 for number in self.used if low <= number < high)
+
+    def reload(self):
+        start = f"{self.prefix}-"
+        used = set()
+        for model in (Customer, ArchivedLead):
+            for form_number in model.objects.filter(form_number__startswith=start).values_list('form_number', flat=True):
+                suffix = form_number[len(start):]
+                if suffix.isdigit():
+                    used.add(int(suffix))
+        self.used = used
+        self.digits = 5
+        self._count_used()
+
+    def take(self, count):
+        numbers = []
+        while len(numbers) < count:
+            low, high = 10 ** (self.digits - 1), 10 ** self.digits
+            # Random probing only stays cheap while at least half the range is left free
+            if (high - low) - self.used_in_range - (count - len(numbers)) < (high - low) // 2:
+                self.digits += 1
+                self._count_used()
+                continue
+            number = random.randrange(low, high)
+            if number not in self.used:
+                self.used.add(number)
+                self.used_in_range += 1
+                numbers.append(f"{self.prefix}-{number}")
+        return numbers
+
+
+def _existing_contacts(phones, emails):
+    """{('phone'|'email', value): form number} for live and archived leads with these contacts."""
+    found = {}
+    if not phones and not emails:
+        return found
+    for model in (ArchivedLead, Customer):
+        matches = model.objects.annotate(email_lower=Lower('email')).filter(
+            Q(phone_number__in=phones) | Q(email_lower__in=emails)
+        ).values_list('phone_number', 'email_lower', 'form_number')
+        for phone, email, form_number in matches:
+            if phone in phones:
+                found[('phone', phone)] = form_number
+            if email in emails:
+                found[('email', email)] = form_number
+    return found
+
+
+def _insert_rows(model, rows, now, **constants):
+    """
+    INSERT `rows` ({attname: value}) into `model`'s table with one
+    executemany(). Columns a row leaves out take `constants`, else the field
+    default — each prepared once; auto_now/auto_now_add columns get `now`.
+    Only non-text, non-null row values go through get_db_prep_save().
+    """
+    db = connections[router.db_for_write(model)]  # the connection itself, not the per-thread proxy
+    fields = [field for field in model._meta.concrete_fields if not isinstance(field, AutoField)]
+    defaults, preps = [], []
+    for field in fields:
+        if field.attname in constants:
+            default = constants[field.attname]
+        elif getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+            default = now
+        else:
+            default = field.get_default()
+        defaults.append(field.get_db_prep_save(default, db))
+        preps.append(None if isinstance(field, (CharField, TextField)) else field.get_db_prep_save)
+    columns = [(field.attname, prep, default) for field, prep, default in zip(fields, preps, defaults)]
+    params = [
+        tuple(
+            default if name not in row
+            else row[name] if prep is None or row[name] is None else prep(row[name], db)
+            for name, prep, default in columns
+        )
+        for row in rows
+    ]
+    quote = db.ops.quote_name
+    sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+        quote(model._meta.db_table),
+        ', '.join(quote(field.column) for field in fields),
+        ', '.join(['%s'] * len(fields)),
+    )
+    with db.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _insert(rows, allocator, project_names):
+    """Write one chunk of (fields, source) rows with their sources and summaries."""
+    from .views import get_project_name_from_form_number
+
+    labels = {code: lead_summary._source_label(CustomerSource(source_type=code)) for code, _ in IMPORTABLE_SOURCES}
+    for attempt in range(3):
+        numbers = allocator.take(len(rows))
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                _insert_rows(Customer, [
+                    dict(fields, form_number=number) for number, (fields, _) in zip(numbers, rows)
+                ], now, is_complete=True, current_step=4)
+                pks = dict(Customer.objects.filter(form_number__in=numbers).values_list('form_number', 'pk'))
+                _insert_rows(CustomerSource, [
+                    {'customer_id': pks[number], 'source_type': source}
+                    for number, (_, source) in zip(numbers, rows) if source
+                ], now)
+                # Every number shares the chunk's prefix, so they all map to the same project
+                project_name = get_project_name_from_form_number(numbers[0], project_names)
+                summaries = []
+                for number, (fields, source) in zip(numbers, rows):
+                    if fields['middle_name']:
+                        full_name = f"{fields['first_name']} {fields['middle_name']} {fields['last_name']}"
+                    else:
+                        full_name = f"{fields['first_name']} {fields['last_name']}"
+                    summaries.append({
+                        'customer_id': pks[number],
+                        'form_number': number,
+                        'project_name': project_name,
+                        'full_name': full_name.strip(),
+                        'email': fields['email'],
+                        'phone_number': fields['phone_number'] or '',
+                        'city': fields['city'],
+                        'sources': labels[source] if source else '',
+                    })
+                _insert_rows(LeadSummary, summaries, now, is_complete=True, created_at=now, updated_at=now)
+                versioning.bump()
+            return
+        except IntegrityError:
+            # A form submitted meanwhile took one of the numbers — re-read and try again
+            if attempt == 2:
+                raise
+            allocator.reload()
+
+
+def import_leads(fileobj, filename, prefix, source='', source_details='', user=None, request=None,
+                 chunk_size=CHUNK_SIZE, dry_run=False, progress=None, max_rows=None):
+    """
+    Import the leads in an uploaded .xlsx/.csv under project `prefix`. Rows
+    without a source column get `source` (and `source_details`). Returns a
+    report dict: rows, imported, duplicates, invalid, errors [(row, message)],
+    seconds. With dry_run nothing is written; files of more than `max_rows`
+    rows are rejected before anything is read.
+    """
+    project_names = active_project_names()
+    prefix = prefix.strip().upper()
+    if prefix not in project_names:
+        raise ImportRejected(f"Unknown project prefix '{prefix}'.")
+    if source and source not in dict(IMPORTABLE_SOURCES):
+        raise ImportRejected(f"Source '{source}' can't be used for imported leads.")
+    if max_rows is not None:
+        rows = count_rows(fileobj, filename)
+        if rows > max_rows:
+            raise ImportRejected(
+                f"The file has {rows} rows; the Import Leads page takes up to {max_rows}. "
+                f"Import it with 'python manage.py import_leads' instead."
+            )
+
+    started = time.perf_counter()
+    cleaner = RowCleaner(source, source_details)
+    allocator = None if dry_run else FormNumberAllocator(prefix)
+    report = {'file': filename, 'project': project_names[prefix], 'rows': 0, 'imported': 0,
+              'duplicates': 0, 'invalid': 0, 'errors': [], 'dry_run': dry_run}
+    seen = {}
+
+    def error(number, message, kind):
+        report[kind] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append((number, message))
+
+    def flush(chunk):
+        if not chunk:
+            return
+        phones = {fields['phone_number'] for _, (fields, _) in chunk if fields['phone_number']}
+        emails = {fields['email'] for _, (fields, _) in chunk if fields['email']}
+        existing = _existing_contacts(phones, emails)
+        accepted = []
+        for number, (fields, lead_source) in chunk:
+            contacts = [('phone', fields['phone_number']), ('email', fields['email'])]
+            duplicate = next((
+                f"duplicate {kind} {value} (lead {existing[(kind, value)]})" for kind, value in contacts
+                if value and (kind, value) in existing
+            ), None)
+            if duplicate is None:
+                duplicate = next((
+                    f"duplicate {kind} {value} (row {seen[(kind, value)]})" for kind, value in contacts
+                    if value and (kind, value) in seen
+                ), None)
+            if duplicate:
+                error(number, duplicate, 'duplicates')
+                continue
+            for kind, value in contacts:
+                if value:
+                    seen[(kind, value)] = number
+            accepted.append((fields, lead_source))
+        if accepted and not dry_run:
+            _insert(accepted, allocator, project_names)
+        report['imported'] += len(accepted)
+        if progress:
+            progress(report['rows'], report['imported'])
+
+    chunk = []
+    for number, row in read_rows(fileobj, filename):
+        report['rows'] += 1
+        try:
+            chunk.append((number, cleaner.clean(row)))
+        except ValueError as e:
+            error(number, str(e), 'invalid')
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+
+    report['seconds'] = round(time.perf_counter() - started, 1)
+    if report['imported'] and not dry_run:
+        from .views import log_action
+        log_action(user, 'import', 'Customer', None,
+                   f"{report['imported']} lead(s) from {filename}"[:300],
+                   json.dumps({key: report[key] for key in ('file', 'project', 'rows', 'imported', 'duplicates', 'invalid')}),
+                   request=request)
+    return report
@@ -0,0 +1,88 @@
+"""
+Interakt WhatsApp API client.
+
+Both clients keep their connections open between requests, so an OTP send
+reuses a warm TLS connection instead of handshaking with Interakt every time:
+
+    send_template()   blocking, pooled requests.Session — for the sync (WSGI) views
+    asend_template()  non-blocking, pooled httpx.AsyncClient — for async_views under ASGI
+
+Both return the HTTP response; callers only look at ``status_code`` and ``text``.
+"""
+import asyncio
+import threading
+
+import requests
+from django.conf import settings
+
+INTERAKT_MESSAGE_URL = 'https://api.interakt.ai/v1/public/message/'
+INTERAKT_TIMEOUT = 10  # seconds
+
+# Connections kept open per worker (requests) / per event loop (httpx)
+POOL_SIZE = 20
+ASYNC_POOL_SIZE = 200
+
+_local = threading.local()
+_async_clients = {}
+
+
+def _headers():
+    return {
+        'Authorization': f'Basic {settings.INTERAKT_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+
+
+def otp_template_payload(phone_number, otp, callback_data):
+    """Body for the 'otp_verification' WhatsApp template."""
+    return {
+        'countryCode': '+91',
+        'phoneNumber': phone_number,
+        'callbackData': callback_data,
+        'type': 'Template',
+        'template': {
+            'name': 'otp_verification',
+            'languageCode': 'en',
+            'bodyValues': [otp],
+            'buttonValues': {'0': [otp]}
+        }
+    }
+
+
+def _session():
+    # requests.Session isn't guaranteed thread-safe — one per worker thread
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+
+def send_template(payload):
+    """POST a template message to Interakt and return the requests response."""
+    return _session().post(INTERAKT_MESSAGE_URL, headers=_headers(), json=payload, timeout=INTERAKT_TIMEOUT)
+
+
+def _async_client():
+    # An httpx.AsyncClient is bound to the loop it first ran on, so keep one per loop
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import httpx
+
+        client = httpx.AsyncClient(
+            timeout=INTERAKT_TIMEOUT,
+            limits=httpx.Limits(max_connections=ASYNC_POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+        # Forget clients of loops that have since closed (async_to_sync under WSGI)
+        for stale in [l for l in _async_clients if l.is_closed()]:
+            del _async_clients[stale]
+        _async_clients[loop] = client
+    return client
+
+
+async def asend_template(payload):
+    """POST a template message to Interakt without blocking the event loop."""
+    return await _async_client().post(INTERAKT_MESSAGE_URL, headers=_headers(), json=payload)
@@ -0,0 +1,77 @@
+"""
+Cross-worker invalidation for the per-worker (local) cache tier.
+
+Each namespace ('projects', 'partners', 'staff') has a generation number
+under 'gen:<namespace>' in the shared cache; invalidate() (called from
+signals.py) bumps it. On every request CacheGenerationMiddleware reads all
+the generations in one get_many(). For any namespace whose number moved
+since this worker last looked, it drops the local copies of that namespace's
+keys, so every gunicorn worker picks up an edit on its next request without
+waiting out the local tier's TTL.
+
+The generations a worker has acted on are kept on the local tier itself
+(TieredCache.local_generations), so they always describe the copies they
+guard, whichever thread reads them.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = 'gen:{namespace}'
+
+
+def generation_key(namespace):
+    return GENERATION_KEY.format(namespace=namespace)
+
+
+def current(namespaces):
+    """Map of namespace -> its generation in the shared cache (0 if never bumped)."""
+    generations = cache.get_many([generation_key(namespace) for namespace in namespaces])
+    return {namespace: generations.get(generation_key(namespace), 0) for namespace in namespaces}
+
+
+def seen(namespace):
+    """The generation of `namespace` this worker last synced to, or None before the first sync."""
+    generations = getattr(cache, 'local_generations', None)
+    return None if generations is None else generations.get(namespace)
+
+
+def invalidate(namespace, keys):
+    """
+    Delete `keys` from the cache and move `namespace` to a new generation.
+    Runs after the current transaction commits, so no worker can refill the
+    shared copy from rows that are about to change.
+    """
+    def _invalidate():
+        cache.delete_many(keys)
+        key = generation_key(namespace)
+        # Generations never expire; a lost key reads as 0, which still counts as a change
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, None)
+    transaction.on_commit(_invalidate)
+
+
+def sync(namespace_keys):
+    """
+    Drop local copies for every namespace whose generation changed.
+    `namespace_keys` maps namespace -> cache keys held locally for it.
+    Returns the namespaces that were invalidated.
+    """
+    invalidate_local = getattr(cache, 'invalidate_local', None)
+    if invalidate_local is None:
+        return []  # no local tier configured — nothing can be stale
+
+    seen_generations = cache.local_generations
+    generations = current(namespace_keys)
+    changed = []
+    for namespace, keys in namespace_keys.items():
+        generation = generations[namespace]
+        # The first look since the worker started counts as a change too
+        if generation != seen_generations.get(namespace):
+            for key in keys:
+                invalidate_local(key)
+            seen_generations[namespace] = generation
+            changed.append(namespace)
+    return changed
@@ -0,0 +1,257 @@
+"""
+LeadSummary: the read model behind the lead dashboards.
+
+A dashboard row needs the customer, its sources, sales assessment, bookings,
+additional channel partners, assignment and revisits. Instead of joining and
+prefetching those six tables on every page, each customer has one flat
+LeadSummary row and the dashboards read only that table, through indexes that
+match their filters.
+
+Keeping it current is an outbox: signals.py records the customer id in
+LeadSummaryChange in the same transaction as any change to those tables (so a
+rolled-back edit records nothing), and sync() — run by each dashboard before
+it reads, a few hundred records at a time, and by `manage.py
+rebuild_lead_summary --sync` on a timer — recomputes the summaries of the
+recorded customers and deletes the records. The summary is
+always rebuilt from the source tables, never patched, so applying a change
+twice or out of order is harmless. The same records drive the partner
+attribution read model (attribution.py).
+
+Writes that bypass signals (queryset.update(), bulk_create(), raw SQL, e.g.
+seed_leads) need `manage.py rebuild_lead_summary` afterwards.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from . import attribution
+from .models import (
+    AdditionalChannelPartner, BookingApplication, Customer, CustomerRevisit, LeadSummary,
+    LeadSummaryChange, stale_draft_cutoff,
+)
+from .query_budget import unbudgeted
+from .reference_data import active_project_names, load_projects
+
+# Customers recomputed per query (keeps IN lists well under SQLite's variable limit)
+REFRESH_BATCH = 500
+
+# Outbox records applied by one sync() from the command line
+SYNC_BATCH = 2000
+
+# Outbox records a dashboard request applies before reading — the rest are left to
+# `rebuild_lead_summary --sync` on a timer (or the next requests)
+REQUEST_SYNC_BATCH = 200
+
+SUMMARY_FIELDS = [
+    'form_number', 'project_name', 'full_name', 'email', 'phone_number', 'city', 'sources',
+    'is_complete', 'has_assessment', 'lead_classification', 'has_booking', 'has_additional_cp',
+    'sourcing_manager', 'closing_manager', 'revisit_count', 'last_revisit_date',
+    'created_at', 'updated_at', 'refreshed_at',
+]
+
+
+def mark_changed(customer_id):
+    """Record that the summary of `customer_id` is out of date (in the caller's transaction)."""
+    if customer_id is not None:
+        LeadSummaryChange.objects.create(customer_id=customer_id)
+
+
+def _related(customer, name):
+    """A reverse one-to-one (sales_assessment, assignment), or None when the row doesn't exist."""
+    try:
+        return getattr(customer, name)
+    except ObjectDoesNotExist:
+        return None
+
+
+def _source_label(source):
+    label = source.get_source_type_display()
+    return 'Social Media' if 'Social Media' in label else label
+
+
+def summaries_for(customers, project_names=None):
+    """Unsaved LeadSummary rows for a Customer queryset, in two queries."""
+    if project_names is None:
+        project_names = active_project_names()
+    revisits = CustomerRevisit.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    customers = customers.select_related('sales_assessment', 'assignment').prefetch_related('sources').annotate(
+        summary_has_booking=Exists(BookingApplication.objects.filter(customer=OuterRef('pk'))),
+        summary_has_additional_cp=Exists(AdditionalChannelPartner.objects.filter(customer=OuterRef('pk'))),
+        summary_revisit_count=Coalesce(Subquery(revisits.annotate(n=Count('pk')).values('n')), 0),
+        summary_last_revisit=Subquery(revisits.annotate(last=Max('visit_date')).values('last')),
+    ).order_by()
+
+    rows = []
+    for customer in customers:
+        assessment = _related(customer, 'sales_assessment')
+        assignment = _related(customer, 'assignment')
+        rows.append(build_summary(
+            customer, customer.sources.all(), project_names,
+            has_assessment=assessment is not None,
+            lead_classification=assessment.lead_classification if assessment else '',
+            has_booking=customer.summary_has_booking,
+            has_additional_cp=customer.summary_has_additional_cp,
+            sourcing_manager_id=assignment.sourcing_manager_id if assignment else None,
+            closing_manager_id=assignment.closing_manager_id if assignment else None,
+            revisit_count=customer.summary_revisit_count,
+            last_revisit_date=customer.summary_last_revisit,
+        ))
+    return rows
+
+
+def build_summary(customer, sources, project_names, **related):
+    """
+    The LeadSummary of a saved Customer given its CustomerSource rows;
+    `related` carries the fields from the other tables (their defaults fit a
+    brand-new lead, so bulk inserts can build summaries without querying).
+    """
+    from .views import get_project_name_from_form_number
+
+    return LeadSummary(
+        customer_id=customer.pk,
+        form_number=customer.form_number,
+        project_name=get_project_name_from_form_number(customer.form_number, project_names),
+        full_name=customer.get_full_name().strip(),
+        email=customer.email,
+        phone_number=customer.phone_number or '',
+        city=customer.city,
+        sources=', '.join(dict.fromkeys(_source_label(source) for source in sources))[:255],
+        is_complete=customer.is_complete,
+        created_at=customer.created_at,
+        updated_at=customer.updated_at,
+        **related,
+    )
+
+
+def _write(customers, project_names):
+    rows = summaries_for(customers, project_names)
+    LeadSummary.objects.bulk_create(rows, update_conflicts=True, unique_fields=['customer'],
+                                    update_fields=SUMMARY_FIELDS)
+    return len(rows)
+
+
+def refresh(customer_ids):
+    """Recompute the summaries of these customers (ids of deleted customers are skipped). Returns rows written."""
+    ids = sorted(set(customer_ids))
+    project_names = active_project_names()
+    written = 0
+    for start in range(0, len(ids), REFRESH_BATCH):
+        written += _write(Customer.objects.filter(pk__in=ids[start:start + REFRESH_BATCH]), project_names)
+    return written
+
+
+def sync(limit=SYNC_BATCH):
+    """Apply up to `limit` outbox records. Returns how many were applied (0 when up to date)."""
+    changes = list(LeadSummaryChange.objects.order_by('pk').values_list('pk', 'customer_id')[:limit])
+    if not changes:
+        return 0
+    customer_ids = {customer_id for _, customer_id in changes}
+    refresh(customer_ids)
+    attribution.refresh(customer_ids)
+    change_ids = [pk for pk, _ in changes]
+    for start in range(0, len(change_ids), REFRESH_BATCH):
+        LeadSummaryChange.objects.filter(pk__in=change_ids[start:start + REFRESH_BATCH]).delete()
+    return len(changes)
+
+
+def sync_for_request():
+    """
+    sync() as a dashboard runs it before reading: at most REQUEST_SYNC_BATCH
+    records, and outside the view's query budget — the work depends on how
+    much changed, not on the view.
+    """
+    with unbudgeted():
+        return sync(REQUEST_SYNC_BATCH)
+
+
+def rebuild(batch_size=REFRESH_BATCH, progress=None):
+    """
+    Recompute every summary (and the partner attribution) from the source
+    tables, `batch_size` customers at a time. Outbox records older than the
+    rebuild are dropped — the rebuild read the data they point at. Returns
+    the number of summaries written.
+    """
+    latest_change = LeadSummaryChange.objects.order_by('-pk').values_list('pk', flat=True).first()
+    project_names = active_project_names()
+    written = 0
+    last_pk = 0
+    while True:
+        ids = list(Customer.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        written += _write(Customer.objects.filter(pk__in=ids), project_names)
+        last_pk = ids[-1]
+        if progress:
+            progress(written)
+    attribution.rebuild()
+    if latest_change is not None:
+        LeadSummaryChange.objects.filter(pk__lte=latest_change).delete()
+    return written
+
+
+def refresh_project_names():
+    """Re-derive project_name on every summary after a project is added, renamed or deactivated."""
+    from .views import get_project_name_from_form_number
+
+    # Straight from the database: the cached registry may not have caught up with the edit yet
+    project_names = {}
+    for project in load_projects():
+        project_names.setdefault(project['project_prefix'].upper(), project['project_name'])
+    moved = {}
+    for customer_id, form_number, current in LeadSummary.objects.values_list('customer_id', 'form_number', 'project_name'):
+        name = get_project_name_from_form_number(form_number, project_names)
+        if name != current:
+            moved.setdefault(name, []).append(customer_id)
+    for name, ids in moved.items():
+        for start in range(0, len(ids), REFRESH_BATCH):
+            LeadSummary.objects.filter(customer_id__in=ids[start:start + REFRESH_BATCH]).update(project_name=name)
+    return sum(len(ids) for ids in moved.values())
+
+
+def filter_summaries(summaries, params):
+    """views.filter_leads() for LeadSummary querysets: the same dashboard filter parameters."""
+    search = params.get('search', '')
+    property_filter = params.get('property', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    assessment_filter = params.get('assessment', '')
+    booking_filter = params.get('booking', '')
+    form_numbers_str = params.get('form_numbers', '')
+
+    if params.get('drafts') != 'all':
+        summaries = summaries.exclude(is_complete=False, updated_at__lt=stale_draft_cutoff())
+
+    if form_numbers_str:
+        form_numbers_list = [fn.strip() for fn in form_numbers_str.split(',') if fn.strip()]
+        if form_numbers_list:
+            summaries = summaries.filter(form_number__in=form_numbers_list)
+
+    if search:
+        summaries = summaries.filter(
+            Q(full_name__icontains=search) |
+            Q(email__icontains=search) |
+            Q(form_number__icontains=search) |
+            Q(city__icontains=search) |
+            Q(phone_number__icontains=search)
+        )
+
+    if property_filter:
+        summaries = summaries.filter(form_number__startswith=property_filter)
+
+    if date_from:
+        summaries = summaries.filter(created_at__date__gte=date_from)
+
+    if date_to:
+        summaries = summaries.filter(created_at__date__lte=date_to)
+
+    if assessment_filter == 'completed':
+        summaries = summaries.filter(has_assessment=True)
+    elif assessment_filter == 'pending':
+        summaries = summaries.filter(has_assessment=False)
+
+    if booking_filter == 'completed':
+        summaries = summaries.filter(has_booking=True)
+    elif booking_filter == 'pending':
+        summaries = summaries.filter(has_booking=False)
+
+    return summaries
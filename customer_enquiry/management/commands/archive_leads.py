@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import archive
+
+
+class Command(BaseCommand):
+    help = ('Move lost leads with no activity for --days out of the hot tables into '
+            'archived_leads, in batches. Booked leads are never archived. Opening an archived '
+            'lead from a staff page restores it. Safe to run from cron nightly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_LOST_AFTER_DAYS,
+                            help=f'Days without customer, assessment or revisit activity '
+                                 f'(default ARCHIVE_LOST_AFTER_DAYS = {settings.ARCHIVE_LOST_AFTER_DAYS}).')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Leads moved per transaction (default 200).')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to let other writers in.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count what would be archived without moving anything.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+
+        leads = archive.archivable(options['days'])
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Would archive {leads.count()} lost lead(s)"))
+            return
+
+        archived = 0
+        while True:
+            ids = list(leads.values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            archived += archive.archive_batch(ids)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} lost lead(s)"))
@@ -0,0 +1,399 @@
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+import json
+import math
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.utils import timezone
+
+from customer_enquiry import exports
+from customer_enquiry.management.commands.seed_leads import SEED_FORM_NUMBER_START
+from customer_enquiry.models import Customer, ExportJob, Project, UserProfile
+
+
+ENDPOINTS = [
+    'dashboard', 'export_leads', 'save_step_view', 'customer_submit_view',
+    'send_otp_view', 'audit_trail', 'channel_partners_api',
+]
+
+BENCH_PROJECTS = [
+    ('Altavista', 'ALT'),
+    ('Medius', 'MED'),
+    ('Ornata', 'ORN'),
+]
+
+# Interakt is never called for real — every send gets this canned success
+INTERAKT_TARGET = 'customer_enquiry.interakt.send_template'
+
+
+class _StubResponse:
+    status_code = 200
+    text = '{"result": true}'
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the CRM hot endpoints (latency p50/p95/p99, queries per request, peak memory) '
+        'at one or more data scales and save JSON results that can be diffed across commits. '
+        'export_leads only queues a job, so with the test client each request is followed by '
+        'building the file as run_export_jobs would, and both are timed together; with '
+        '--base-url only the enqueue is measured (use benchmark_exports on the server for the build).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales', default='1000',
+            help='Comma-separated lead counts to benchmark at, e.g. 1000,10000,100000',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint before timing')
+        parser.add_argument(
+            '--endpoints', default=','.join(ENDPOINTS),
+            help=f'Comma-separated subset of: {", ".join(ENDPOINTS)}',
+        )
+        parser.add_argument(
+            '--use-current-db', action='store_true',
+            help='Run against the configured database instead of a throwaway test database. '
+                 'Leads are still seeded up to each scale, so only use this on a dev copy.',
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Benchmark a running server (e.g. http://127.0.0.1:8000) over HTTP instead of the test client. '
+                 'Queries come from the X-Query-Count header; server memory is not measured.',
+        )
+        parser.add_argument('--username', help='Staff user to log in as (required with --base-url)')
+        parser.add_argument('--password', help='Password for --username (with --base-url)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed passed to seed_leads')
+        parser.add_argument('--output', help='Where to write the JSON results (default benchmark-results/<commit>-<time>.json)')
+        parser.add_argument('--compare', help='Earlier results JSON to diff against')
+        parser.add_argument(
+            '--threshold', type=float, default=10.0,
+            help='Percent slowdown (p95) or query increase that counts as a regression with --compare',
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [e.strip() for e in options['endpoints'].split(',') if e.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f'Unknown endpoint(s): {", ".join(sorted(unknown))}')
+        scales = [int(s) for s in options['scales'].split(',') if s.strip()]
+        self.options = options
+
+        live = bool(options['base_url'])
+        if live and not (options['username'] and options['password']):
+            raise CommandError('--base-url needs --username and --password')
+
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'mode': 'http' if live else 'test_client',
+                'database': 'current' if (live or options['use_current_db']) else 'test',
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+            },
+            'scales': {},
+        }
+
+        old_db_name = None
+        if not live and not options['use_current_db']:
+            setup_test_environment()
+            old_db_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            for scale in scales:
+                if not live:
+                    self.ensure_scale(scale)
+                    self.property_code = (
+                        Project.objects.active_projects().values_list('form_number', flat=True).first() or 'ALT'
+                    )
+                else:
+                    self.property_code = 'ALT'
+                self.stdout.write(self.style.MIGRATE_HEADING(f'Scale: {scale} leads'))
+                scale_results = {}
+                for endpoint in endpoints:
+                    if live:
+                        stats = self.run_http(endpoint)
+                    else:
+                        stats = self.run_client(endpoint)
+                    scale_results[endpoint] = stats
+                    self.print_stats(endpoint, stats)
+                results['scales'][str(scale)] = scale_results
+        finally:
+            if old_db_name is not None:
+                connection.creation.destroy_test_db(old_db_name, verbosity=0)
+                teardown_test_environment()
+
+        output = options['output'] or os.path.join(
+            'benchmark-results',
+            f"{results['meta']['commit'] or 'nocommit'}-{datetime.now():%Y%m%d_%H%M%S}.json",
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    # ─── Data setup ──────────────────────────────────────────────────────────
+
+    def ensure_scale(self, scale):
+        """Seed synthetic leads until the database holds at least `scale` customers."""
+        if not Project.objects.active_projects().exclude(project_prefix='').exists():
+            for name, prefix in BENCH_PROJECTS:
+                Project.objects.create(
+                    project_name=name, site_name='Benchmark', maharera_no='P00000000000',
+                    company_name='Benchmark Builders', project_prefix=prefix,
+                )
+
+        existing = Customer.objects.count()
+        if existing >= scale:
+            return
+        seeded = Customer.objects.filter(form_number__regex=r'^[A-Z-]+-\d{7}$').count()
+        self.stdout.write(f'Seeding {scale - existing} leads...')
+        call_command(
+            'seed_leads', count=scale - existing, seed=self.options['seed'] + seeded,
+            start=SEED_FORM_NUMBER_START + seeded, batch_size=5000, stdout=StringIO(),
+        )
+
+    def bench_user(self):
+        if self.options['username']:
+            try:
+                return User.objects.get(username=self.options['username'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{self.options['username']}' not found")
+        user, created = User.objects.get_or_create(
+            username='benchmark_admin', defaults={'is_staff': True, 'first_name': 'Benchmark'}
+        )
+        UserProfile.objects.get_or_create(user=user, defaults={'role': 'super_admin'})
+        return user
+
+    # ─── Requests ────────────────────────────────────────────────────────────
+
+    def build_request(self, endpoint, i):
+        """Return (method, path, kwargs) for the i-th request to `endpoint`."""
+        property_code = self.property_code
+        phone = f'7{i:09d}'
+        lead = {
+            'first_name': 'Bench', 'last_name': f'Lead{i}', 'email': f'bench{i}@example.com',
+            'phone_number': phone, 'sex': 'male', 'marital_status': 'single',
+            'city': 'Mumbai', 'locality': 'Tardeo', 'pincode': '400034', 'nationality': 'indian',
+            'employment_type': 'salaried', 'configuration': '2bhk', 'budget': '2cr_to_4cr',
+            'construction_status': 'under_construction', 'purpose_of_buying': 'personal_use',
+            'source': 'website', 'property_code': property_code,
+        }
+        if endpoint == 'dashboard':
+            return 'get', '/dashboard/', {}
+        if endpoint == 'export_leads':
+            return 'post', '/export-leads/', {'data': {}}
+        if endpoint == 'save_step_view':
+            # An autosave from the current form: draft only, no Customer row
+            return 'post', '/save-step/', {'data': dict(lead, step='3', draft_token='', promote='0')}
+        if endpoint == 'customer_submit_view':
+            return 'post', '/submit/', {'data': lead, 'headers': {'X-Requested-With': 'XMLHttpRequest'}}
+        if endpoint == 'send_otp_view':
+            # Fresh phone + client IP per request so rate limiting never short-circuits the send path
+            return 'post', '/send-otp/', {
+                'json': {'phone_number': phone},
+                'remote_addr': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}',
+            }
+        if endpoint == 'audit_trail':
+            return 'get', '/audit-trail/', {}
+        if endpoint == 'channel_partners_api':
+            return 'get', '/api/channel-partners/', {}
+        raise CommandError(f'Unknown endpoint {endpoint}')
+
+    def build_export(self, response):
+        """
+        Build the job a POST /export-leads/ queued, as run_export_jobs would,
+        then drop the file so the next request isn't served from the result cache.
+        """
+        job_id = json.loads(response.content).get('job_id')
+        if job_id is None:
+            return
+        now = timezone.now()
+        if ExportJob.objects.filter(pk=job_id, status='queued').update(status='running', started_at=now, updated_at=now):
+            job = ExportJob.objects.get(pk=job_id)
+            exports.run_job(job)
+            os.remove(exports.result_path(job.result_key))
+
+    def client_call(self, client, endpoint, i):
+        method, path, kwargs = self.build_request(endpoint, i)
+        extra = {}
+        if 'remote_addr' in kwargs:
+            extra['REMOTE_ADDR'] = kwargs['remote_addr']
+        if 'json' in kwargs:
+            return client.post(path, data=json.dumps(kwargs['json']), content_type='application/json',
+                               headers=kwargs.get('headers'), **extra)
+        call = getattr(client, method)
+        response = call(path, data=kwargs.get('data'), headers=kwargs.get('headers'), **extra)
+        if endpoint == 'export_leads':
+            self.build_export(response)
+        return response
+
+    def run_client(self, endpoint):
+        client = Client()
+        client.force_login(self.bench_user())
+        iterations, warmup = self.options['iterations'], self.options['warmup']
+        latencies, queries, statuses = [], [], set()
+        counter = int(time.time()) % 100000 * 1000
+
+        # Exports built here go to a scratch directory, not the server's EXPORT_ROOT
+        export_root = tempfile.TemporaryDirectory(prefix='bench-exports-')
+        with export_root, override_settings(EXPORT_ROOT=export_root.name), \
+                mock.patch(INTERAKT_TARGET, return_value=_StubResponse()):
+            for i in range(warmup):
+                self.client_call(client, endpoint, counter + i)
+            counter += warmup
+
+            for i in range(iterations):
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    response = self.client_call(client, endpoint, counter + i)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                queries.append(len(ctx.captured_queries))
+                statuses.add(response.status_code)
+            counter += iterations
+
+            # Memory is traced on a separate request so tracemalloc overhead stays out of the timings
+            tracemalloc.start()
+            try:
+                self.client_call(client, endpoint, counter)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+
+        return self.summarise(latencies, queries, statuses, peak_kb=round(peak / 1024, 1))
+
+    def run_http(self, endpoint):
+        import requests
+
+        base = self.options['base_url'].rstrip('/')
+        session = requests.Session()
+        session.get(f'{base}/login/', timeout=30)
+        session.post(
+            f'{base}/login/',
+            data={'username': self.options['username'], 'password': self.options['password'],
+                  'csrfmiddlewaretoken': session.cookies.get('csrftoken', '')},
+            headers={'Referer': f'{base}/login/'}, timeout=30,
+        )
+        csrf = {'X-CSRFToken': session.cookies.get('csrftoken', ''), 'Referer': f'{base}/'}
+
+        latencies, queries, statuses = [], [], set()
+        counter = int(time.time()) % 100000 * 1000
+        total = self.options['warmup'] + self.options['iterations']
+        for i in range(total):
+            method, path, kwargs = self.build_request(endpoint, counter + i)
+            headers = dict(csrf, **kwargs.get('headers', {}))
+            started = time.perf_counter()
+            response = session.request(
+                method.upper(), base + path, data=kwargs.get('data'), json=kwargs.get('json'),
+                headers=headers, timeout=300,
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            if i < self.options['warmup']:
+                continue
+            latencies.append(elapsed)
+            statuses.add(response.status_code)
+            if 'X-Query-Count' in response.headers:
+                queries.append(int(response.headers['X-Query-Count']))
+
+        return self.summarise(latencies, queries, statuses, peak_kb=None)
+
+    def summarise(self, latencies, queries, statuses, peak_kb):
+        return {
+            'requests': len(latencies),
+            'status_codes': sorted(statuses),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50), 2),
+                'p95': round(percentile(latencies, 95), 2),
+                'p99': round(percentile(latencies, 99), 2),
+                'mean': round(sum(latencies) / len(latencies), 2),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 1),
+                'max': max(queries),
+            } if queries else None,
+            'peak_memory_kb': peak_kb,
+        }
+
+    # ─── Reporting ───────────────────────────────────────────────────────────
+
+    def print_stats(self, endpoint, stats):
+        latency = stats['latency_ms']
+        queries = stats['queries']['mean'] if stats['queries'] else '-'
+        memory = f"{stats['peak_memory_kb']} KB" if stats['peak_memory_kb'] is not None else '-'
+        self.stdout.write(
+            f"  {endpoint:<22} p50 {latency['p50']:>9.2f} ms  p95 {latency['p95']:>9.2f} ms  "
+            f"p99 {latency['p99']:>9.2f} ms  queries {queries:>6}  peak {memory}  "
+            f"status {','.join(map(str, stats['status_codes']))}"
+        )
+
+    def compare(self, path, current):
+        with open(path) as fh:
+            previous = json.load(fh)
+
+        threshold = self.options['threshold']
+        regressions = []
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Compared with {path} (commit {previous['meta'].get('commit')})"
+        ))
+        for scale, endpoints in current['scales'].items():
+            for endpoint, stats in endpoints.items():
+                before = previous.get('scales', {}).get(scale, {}).get(endpoint)
+                if not before:
+                    continue
+                p95_old, p95_new = before['latency_ms']['p95'], stats['latency_ms']['p95']
+                change = (p95_new - p95_old) / p95_old * 100 if p95_old else 0.0
+                line = f'  [{scale}] {endpoint:<22} p95 {p95_old:.2f} -> {p95_new:.2f} ms ({change:+.1f}%)'
+                if before.get('queries') and stats.get('queries'):
+                    q_old, q_new = before['queries']['mean'], stats['queries']['mean']
+                    line += f'  queries {q_old} -> {q_new}'
+                    if q_new > q_old * (1 + threshold / 100):
+                        regressions.append(f'{endpoint}@{scale} queries')
+                if change > threshold:
+                    regressions.append(f'{endpoint}@{scale} p95')
+                self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'Regressions over {threshold}%: {", ".join(regressions)}')
+        self.stdout.write(self.style.SUCCESS('No regressions over threshold'))
@@ -0,0 +1,115 @@
+from datetime import datetime
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import exports
+from customer_enquiry.management.commands.benchmark_endpoints import git_commit
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the lead export formats (xlsx, parquet, ndjson) on the configured database: '
+        'build time, file size and peak memory, plus how long pandas takes to read each file back. '
+        'Seed a dev copy with seed_leads first for realistic scales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formats', default=','.join(exports.FORMATS),
+                            help=f'Comma-separated subset of: {", ".join(exports.FORMATS)}')
+        parser.add_argument('--repeat', type=int, default=3, help='Builds per format (the median is reported)')
+        parser.add_argument('--property', default='', help='Only export leads of this form-number prefix')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='Customers read per chunk')
+        parser.add_argument('--no-memory', action='store_true',
+                            help='Skip the tracemalloc pass (it slows the build down)')
+        parser.add_argument('--output', help='Where to write the JSON results (default benchmark-results/exports-<commit>-<time>.json)')
+
+    def handle(self, *args, **options):
+        formats = [f.strip() for f in options['formats'].split(',') if f.strip()]
+        unknown = set(formats) - set(exports.FORMATS)
+        if unknown:
+            raise CommandError(f'Unknown format(s): {", ".join(sorted(unknown))}')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1.')
+        self.options = options
+
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'repeat': options['repeat'],
+                'chunk_size': options['chunk_size'],
+                'property': options['property'],
+            },
+            'formats': {},
+        }
+        with tempfile.TemporaryDirectory(prefix='export-bench-') as tmp_dir:
+            for export_format in formats:
+                params = {'format': export_format}
+                if options['property']:
+                    params['property'] = options['property']
+                stats = self.bench(params, os.path.join(tmp_dir, f'leads{exports.FORMATS[export_format][0]}'))
+                results['formats'][export_format] = stats
+                self.stdout.write(
+                    f"  {export_format:<8} {stats['leads']:>8} leads  build {stats['build_ms']:>9.1f} ms  "
+                    f"read {stats['read_ms']:>9.1f} ms  size {stats['size_bytes'] / 1024:>9.0f} KB  "
+                    f"peak {stats['peak_memory_kb'] if stats['peak_memory_kb'] is not None else '-'} KB"
+                )
+
+        output = options['output'] or os.path.join(
+            'benchmark-results',
+            f"exports-{results['meta']['commit'] or 'nocommit'}-{datetime.now():%Y%m%d_%H%M%S}.json",
+        )
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Results written to {output}'))
+
+    def bench(self, params, path):
+        chunk_size = self.options['chunk_size']
+        timings = []
+        leads = 0
+        for _ in range(self.options['repeat']):
+            started = time.perf_counter()
+            leads = exports.build_export(path, params, chunk_size, lambda processed: None)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        peak_kb = None
+        if not self.options['no_memory']:
+            tracemalloc.start()
+            exports.build_export(path, params, chunk_size, lambda processed: None)
+            peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+
+        started = time.perf_counter()
+        self.read_back(params['format'], path)
+        read_ms = (time.perf_counter() - started) * 1000
+
+        return {
+            'leads': leads,
+            'build_ms': round(statistics.median(timings), 1),
+            'read_ms': round(read_ms, 1),
+            'size_bytes': os.path.getsize(path),
+            'peak_memory_kb': peak_kb,
+        }
+
+    def read_back(self, export_format, path):
+        """Load the file the way a BI consumer would."""
+        import pandas as pd
+
+        if export_format == 'xlsx':
+            return pd.read_excel(path, sheet_name=exports.LEADS_SHEET)
+        if export_format == 'parquet':
+            return pd.read_parquet(path)
+        return pd.read_json(path, lines=True, compression='gzip')
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import imports
+
+
+class Command(BaseCommand):
+    help = ('Import leads from an .xlsx or .csv file under a project prefix. Rows are validated '
+            'and de-duplicated (within the file and against live and archived leads by phone or '
+            'email) and written in chunks; invalid and duplicate rows are reported and skipped. '
+            'Re-running an interrupted import is safe.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='The .xlsx or .csv file; the first row holds the column names.')
+        parser.add_argument('--property', required=True,
+                            help='Project form-number prefix the leads are filed under (e.g. SPR).')
+        parser.add_argument('--source', default='',
+                            help=f'Lead source for rows without a source column: '
+                                 f'{", ".join(code for code, _ in imports.IMPORTABLE_SOURCES)}.')
+        parser.add_argument('--source-details', default='',
+                            help='Source details for rows that have none (e.g. the event or campaign).')
+        parser.add_argument('--chunk-size', type=int, default=imports.CHUNK_SIZE,
+                            help=f'Rows written per transaction (default {imports.CHUNK_SIZE}).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate and de-duplicate without writing anything.')
+        parser.add_argument('--show-errors', type=int, default=20,
+                            help='Row errors to print (default 20; all are counted).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        def progress(rows, imported):
+            self.stdout.write(f"  {rows} row(s) read, {imported} {'valid' if options['dry_run'] else 'imported'}")
+
+        try:
+            with open(options['path'], 'rb') as fh:
+                report = imports.import_leads(
+                    fh, options['path'], options['property'], source=options['source'],
+                    source_details=options['source_details'], chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'], progress=progress,
+                )
+        except OSError as e:
+            raise CommandError(f"Could not open {options['path']}: {e}")
+        except imports.ImportRejected as e:
+            raise CommandError(str(e))
+
+        for number, message in report['errors'][:options['show_errors']]:
+            self.stdout.write(self.style.WARNING(f"  row {number}: {message}"))
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['imported']} of {report['rows']} row(s) into {report['project']} "
+            f"({report['duplicates']} duplicate(s), {report['invalid']} invalid) in {report['seconds']}s"
+        ))
@@ -0,0 +1,96 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Runs in a fresh interpreter so nothing this process already imported skews it.
+# Prints one JSON line: timings in ms, peak RSS in KB, and what got imported.
+CHILD_SCRIPT = r'''
+import json, resource, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+from django.urls import get_resolver
+resolver = get_resolver()
+resolver.resolve('/')
+resolver.reverse_dict  # forces every urlconf/view module to load
+t2 = time.perf_counter()
+if WITH_EXPORT:
+    import customer_enquiry.exports
+    import pandas, openpyxl
+t3 = time.perf_counter()
+maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    maxrss //= 1024  # bytes on macOS, KB everywhere else
+print(json.dumps({
+    'setup_ms': (t1 - t0) * 1000,
+    'urls_ms': (t2 - t1) * 1000,
+    'export_ms': (t3 - t2) * 1000,
+    'total_ms': (t3 - t0) * 1000,
+    'maxrss_kb': maxrss,
+    'modules': len(sys.modules),
+    'pandas_loaded': 'pandas' in sys.modules,
+    'openpyxl_loaded': 'openpyxl' in sys.modules,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Measure cold start of a worker: django.setup() plus URL resolution, '
+            'peak RSS, and whether heavy export libraries were imported on the way.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Fresh interpreters to start (default 5); the median is reported.')
+        parser.add_argument('--with-export', action='store_true',
+                            help='Also import the export module, to show what the first export costs.')
+        parser.add_argument('--json', action='store_true',
+                            help='Print the raw per-run results as JSON.')
+
+    def handle(self, *args, **options):
+        if sys.platform == 'win32':
+            raise CommandError('measure_startup needs the resource module (Linux/macOS).')
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+
+        script = f"WITH_EXPORT = {bool(options['with_export'])}\n" + CHILD_SCRIPT
+
+        results = []
+        for _ in range(options['runs']):
+            proc = subprocess.run(
+                [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=os.environ,
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                raise CommandError(f'Worker failed to start:\n{proc.stderr.strip()}')
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        def median(key):
+            return statistics.median(r[key] for r in results)
+
+        self.stdout.write(f"Cold start over {len(results)} run(s) (median):")
+        self.stdout.write(f"  django.setup()      {median('setup_ms'):8.1f} ms")
+        self.stdout.write(f"  URL resolution      {median('urls_ms'):8.1f} ms")
+        if options['with_export']:
+            self.stdout.write(f"  export imports      {median('export_ms'):8.1f} ms")
+        self.stdout.write(f"  total               {median('total_ms'):8.1f} ms")
+        self.stdout.write(f"  peak RSS per worker {median('maxrss_kb') / 1024:8.1f} MB")
+        self.stdout.write(f"  modules imported    {int(median('modules')):8d}")
+
+        last = results[-1]
+        loaded = [name for name in ('pandas', 'openpyxl') if last[f'{name}_loaded']]
+        if loaded and not options['with_export']:
+            self.stdout.write(self.style.WARNING(
+                f"  {', '.join(loaded)} imported at startup — something pulls export code into the request path"))
+        else:
+            self.stdout.write(f"  heavy export libs   {', '.join(loaded) or 'not loaded'}")
@@ -0,0 +1,29 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import snapshot
+
+
+class Command(BaseCommand):
+    help = ('Build the shared reference-data snapshot (projects, channel partners, staff) '
+            'and atomically replace the published file. Run after each deploy; edits republish it on their own.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default=None,
+                            help='Write here instead of settings.REFERENCE_SNAPSHOT_PATH.')
+
+    def handle(self, *args, **options):
+        path = options['path'] or settings.REFERENCE_SNAPSHOT_PATH
+        if not path:
+            raise CommandError('REFERENCE_SNAPSHOT_PATH is not set; pass --path.')
+
+        started = time.perf_counter()
+        size = snapshot.publish(path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        published = snapshot.Snapshot(path)
+        for name, (_, length) in published.sections.items():
+            self.stdout.write(f'  {name:<14} {length:>9,} bytes')
+        self.stdout.write(self.style.SUCCESS(f'Published {size:,} bytes to {path} in {elapsed_ms:.1f} ms'))
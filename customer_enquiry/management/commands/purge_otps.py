@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import otp
+
+
+class Command(BaseCommand):
+    help = 'Delete expired WhatsApp OTP codes. Run from cron (e.g. every 15 minutes).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per statement (default 1000).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        deleted = otp.purge_expired(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired OTP code(s)'))
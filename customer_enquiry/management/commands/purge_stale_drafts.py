@@ -0,0 +1,75 @@
+import time
+
+from django.conf import settings
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from customer_enquiry import archive
+from customer_enquiry.models import Customer
+
+# Child rows deleted (and archived) along with a draft
+CHILD_RELATIONS = ['sources', 'channel_partner', 'referral', 'additional_channel_partners', 'revisits']
+
+
+class Command(BaseCommand):
+    help = ('Delete abandoned enquiry drafts — incomplete Customer rows untouched for --days — '
+            'with their child rows, in small batches. Drafts that staff have assigned, assessed '
+            'or booked are never touched. Safe to run from cron nightly.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.STALE_DRAFT_DAYS,
+                            help=f'Age in days after which an untouched draft is stale '
+                                 f'(default STALE_DRAFT_DAYS = {settings.STALE_DRAFT_DAYS}).')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Drafts deleted per transaction (default 500).')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to let other writers in.')
+        parser.add_argument('--archive', metavar='PATH',
+                            help='Append each batch to this JSON Lines file before deleting it '
+                                 '(restorable with `manage.py loaddata PATH`).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count what would be deleted without deleting anything.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1.')
+
+        # stale_drafts() is served by the partial index on incomplete rows
+        stale = Customer.objects.stale_drafts(options['days']).filter(
+            assignment__isnull=True,
+            sales_assessment__isnull=True,
+            booking_applications__isnull=True,
+        ).order_by()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Would delete {stale.count()} stale draft(s)"))
+            return
+
+        archive_file = open(options['archive'], 'a', encoding='utf-8') if options['archive'] else None
+        deleted = 0
+        try:
+            while True:
+                ids = list(stale.values_list('pk', flat=True)[:options['batch_size']])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    if archive_file:
+                        self.archive_batch(archive_file, ids)
+                    Customer.objects.filter(pk__in=ids).delete()
+                deleted += len(ids)
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if archive_file:
+                archive_file.close()
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} stale draft(s)"))
+
+    def archive_batch(self, archive_file, ids):
+        """Write the drafts and their child rows, parents first so loaddata can restore them."""
+        customers = Customer.objects.filter(pk__in=ids).prefetch_related(*CHILD_RELATIONS)
+        archive_file.write(serializers.serialize('jsonl', archive.collect(customers, CHILD_RELATIONS)))
+        archive_file.flush()
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_enquiry import lead_summary
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the LeadSummary read model the dashboards query, and the partner attribution '
+            'behind the partner leaderboard, from the customer tables. '
+            'Migrations fill both for the existing leads; run this after any bulk write that skips '
+            'signals (seed_leads, queryset.update()). With --sync, only apply the pending change records.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync', action='store_true',
+                            help='Apply the outstanding LeadSummaryChange records instead of rebuilding everything.')
+        parser.add_argument('--batch-size', type=int, default=lead_summary.REFRESH_BATCH,
+                            help=f'Customers recomputed per query (default {lead_summary.REFRESH_BATCH}).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        started = time.perf_counter()
+        if options['sync']:
+            applied = 0
+            while True:
+                synced = lead_summary.sync()
+                if not synced:
+                    break
+                applied += synced
+            self.stdout.write(self.style.SUCCESS(
+                f"Applied {applied} lead summary change(s) in {time.perf_counter() - started:.1f}s"))
+            return
+
+        def progress(written):
+            self.stdout.write(f"  {written} summaries written", ending='\r')
+            self.stdout.flush()
+
+        written = lead_summary.rebuild(options['batch_size'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} lead summaries in {time.perf_counter() - started:.1f}s"))
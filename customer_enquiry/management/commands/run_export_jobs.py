@@ -0,0 +1,85 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from customer_enquiry import exports
+from customer_enquiry.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = ('Build queued lead exports (ExportJob) in the background, oldest first, saving '
+            'progress as each chunk of customers is read. Runs until stopped; use --once '
+            'from cron to drain the queue and exit.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for new jobs.')
+        parser.add_argument('--poll', type=float, default=2.0,
+                            help='Seconds between looks at an empty queue (default 2).')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help=f'Customers read per chunk (default EXPORT_CHUNK_SIZE = '
+                                 f'{settings.EXPORT_CHUNK_SIZE}).')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Seconds without progress after which a running job is assumed '
+                                 'to belong to a dead worker and is queued again (default 600).')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        built = 0
+        while True:
+            self.requeue_stale(options['stale_after'])
+            job = self.claim_next()
+            if job is None:
+                removed = exports.purge_results()
+                if removed:
+                    self.stdout.write(f"Removed {removed} expired export file(s)")
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+            self.run(job, options['chunk_size'])
+            built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {built} export job(s)"))
+
+    def requeue_stale(self, seconds):
+        stale = ExportJob.objects.filter(status='running',
+                                         updated_at__lt=timezone.now() - timedelta(seconds=seconds))
+        requeued = stale.update(status='queued', processed_rows=0, updated_at=timezone.now())
+        if requeued:
+            self.stderr.write(self.style.WARNING(f"Re-queued {requeued} stalled export job(s)"))
+
+    def claim_next(self):
+        """The oldest queued job, marked running. Safe with several workers: only one claim wins."""
+        while True:
+            job = ExportJob.objects.filter(status='queued').order_by('created_at').first()
+            if job is None:
+                return None
+            now = timezone.now()
+            if ExportJob.objects.filter(pk=job.pk, status='queued').update(
+                    status='running', started_at=now, updated_at=now):
+                return job
+
+    def run(self, job, chunk_size):
+        started = time.perf_counter()
+        try:
+            if exports.has_fresh_result(job.result_key):
+                # An identical export finished while this one waited in the queue
+                previous = ExportJob.objects.filter(result_key=job.result_key, status='done').first()
+                rows = previous.total_rows if previous else 0
+                exports.finish_job(job, rows)
+            else:
+                rows = exports.run_job(job, chunk_size)
+        except Exception as e:
+            now = timezone.now()
+            ExportJob.objects.filter(pk=job.pk).update(
+                status='failed', error=str(e)[:1000], finished_at=now, updated_at=now)
+            self.stderr.write(self.style.ERROR(f"Export job {job.pk} failed: {e}"))
+            return
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Export job {job.pk}: {rows} lead(s) in {elapsed:.1f}s — {job.filename}")
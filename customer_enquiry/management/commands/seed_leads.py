@@ -0,0 +1,376 @@
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from customer_enquiry import versioning
+from customer_enquiry.models import (
+    AdditionalChannelPartner, AuditLog, BookingApplicant, BookingApplication,
+    BookingChannelPartner, ChannelPartner, ChannelPartnerMaster, Customer,
+    CustomerAssignment, CustomerRevisit, CustomerSource, InternalSalesAssessment,
+    Project, Referral, UserProfile,
+)
+from customer_enquiry.views import get_project_name_from_form_number
+
+
+FIRST_NAMES = [
+    'Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+    'Ananya', 'Diya', 'Priya', 'Isha', 'Kavya', 'Meera', 'Riya', 'Sneha', 'Pooja', 'Neha',
+    'Rahul', 'Amit', 'Sanjay', 'Vikram', 'Karan', 'Nikhil', 'Farhan', 'Zoya', 'Cyrus', 'Perizad',
+]
+LAST_NAMES = [
+    'Shah', 'Mehta', 'Patel', 'Desai', 'Joshi', 'Kulkarni', 'Iyer', 'Nair', 'Reddy', 'Rao',
+    'Sharma', 'Verma', 'Gupta', 'Agarwal', 'Khan', 'Sheikh', 'Irani', 'Wadia', 'Pillai', 'Menon',
+]
+CITIES = [
+    ('Mumbai', ['Tardeo', 'Worli', 'Andheri', 'Bandra', 'Powai', 'Dadar', 'Colaba']),
+    ('Thane', ['Ghodbunder Road', 'Majiwada', 'Kolshet']),
+    ('Navi Mumbai', ['Vashi', 'Kharghar', 'Nerul']),
+    ('Pune', ['Baner', 'Kothrud', 'Hinjewadi']),
+]
+COMPANIES = ['TCS', 'Infosys', 'HDFC Bank', 'Reliance', 'L&T', 'Self', 'Wipro', 'ICICI Bank', 'Mahindra', '']
+DESIGNATIONS = ['Manager', 'Director', 'Engineer', 'Consultant', 'Analyst', 'Partner', 'Owner', '']
+INDUSTRIES = ['IT', 'Banking', 'Manufacturing', 'Healthcare', 'Real Estate', 'Retail', '']
+CP_FIRMS = ['Realty', 'Estates', 'Properties', 'Homes', 'Realtors', 'Associates']
+
+# Weighted mixes — roughly what the sales team sees at site
+SOURCE_WEIGHTS = [
+    ('channel_partner', 38), ('referral', 10), ('whatsapp', 6), ('social_media', 14), ('website', 8),
+    ('passing_by', 6), ('property_portal', 8), ('hoarding', 4), ('newspaper_ad', 3), ('exhibition', 3),
+]
+CLASSIFICATION_WEIGHTS = [('hot', 15), ('warm', 30), ('cold', 30), ('lost', 20), ('', 5)]
+
+ASSESSMENT_RATE = 0.6
+BOOKING_RATE = 0.18  # share of hot/warm assessed leads that book
+ASSIGNMENT_RATE = 0.5
+REVISIT_RATE = 0.2
+EXTRA_CP_RATE = 0.05
+PARTNER_POOL_SIZE = 200
+MANAGERS_PER_ROLE = 3
+
+SEED_FORM_NUMBER_START = 1000000
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set instead of now()."""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate realistic synthetic leads for load and scale testing (deterministic by --seed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help='Number of customers to generate')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed — same seed, same data')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk_create batch')
+        parser.add_argument('--days', type=int, default=365, help='Spread leads over this many days')
+        parser.add_argument(
+            '--anchor-date',
+            help='Last day of the generated range (YYYY-MM-DD, default today). Fix it for byte-identical runs.',
+        )
+        parser.add_argument(
+            '--start',
+            type=int,
+            default=SEED_FORM_NUMBER_START,
+            help='First numeric part of generated form numbers (PREFIX-<n>); change it to seed a second batch',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        if count <= 0 or batch_size <= 0:
+            raise CommandError('--count and --batch-size must be positive')
+
+        self.project_names = {}
+        for prefix, name in Project.objects.active_projects().values_list('project_prefix', 'project_name'):
+            if prefix:
+                self.project_names.setdefault(prefix.upper(), name)
+        prefixes = sorted(self.project_names)
+        if not prefixes:
+            raise CommandError('No active projects with a prefix — create at least one Project first.')
+
+        start = options['start']
+        first_form_number = f"{prefixes[start % len(prefixes)]}-{start}"
+        if Customer.objects.filter(form_number=first_form_number).exists():
+            raise CommandError(f'{first_form_number} already exists — pass a different --start to add more leads.')
+
+        if options['anchor_date']:
+            anchor = datetime.strptime(options['anchor_date'], '%Y-%m-%d').date()
+        else:
+            anchor = timezone.localdate()
+
+        self.rng = random.Random(options['seed'])
+        self.anchor = anchor
+        self.days = max(options['days'], 1)
+        self.sources, self.source_weights = zip(*SOURCE_WEIGHTS)
+        self.classifications, self.classification_weights = zip(*CLASSIFICATION_WEIGHTS)
+
+        self.partners = self.ensure_partner_pool()
+        self.sourcing_managers = self.ensure_managers('sourcing_manager')
+        self.closing_managers = self.ensure_managers('closing_manager')
+
+        self.stdout.write(
+            f'Seeding {count} leads across {", ".join(prefixes)} (seed={options["seed"]}, batch={batch_size})'
+        )
+
+        created = 0
+        started = timezone.now()
+        while created < count:
+            size = min(batch_size, count - created)
+            self.create_batch(prefixes, start + created, size)
+            created += size
+            self.stdout.write(f'  {created}/{count} leads')
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f'Seeded {created} leads in {elapsed:.1f}s'))
+
+    # ─── Reference data ──────────────────────────────────────────────────────
+
+    def ensure_partner_pool(self):
+        """Deterministic pool of channel partners, created in the master directory if missing."""
+        rng = random.Random(0)
+        pool = []
+        for i in range(PARTNER_POOL_SIZE):
+            pool.append({
+                'company_name': f"{rng.choice(LAST_NAMES)} {rng.choice(CP_FIRMS)}",
+                'partner_name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                'mobile_number': f"9{800000000 + i:09d}",
+                'rera_number': f"A5180000{i:04d}",
+            })
+
+        existing = set(ChannelPartnerMaster.objects.filter(
+            mobile_number__in=[p['mobile_number'] for p in pool]
+        ).values_list('mobile_number', flat=True))
+        ChannelPartnerMaster.objects.bulk_create(
+            [ChannelPartnerMaster(**p) for p in pool if p['mobile_number'] not in existing]
+        )
+        return pool
+
+    def ensure_managers(self, role):
+        users = list(User.objects.filter(profile__role=role).order_by('id'))
+        for i in range(len(users), MANAGERS_PER_ROLE):
+            user, _ = User.objects.get_or_create(
+                username=f'seed_{role}_{i + 1}',
+                defaults={'first_name': role.replace('_', ' ').title(), 'last_name': str(i + 1)},
+            )
+            UserProfile.objects.get_or_create(user=user, defaults={'role': role})
+            users.append(user)
+        return users
+
+    # ─── Lead generation ─────────────────────────────────────────────────────
+
+    def random_datetime(self):
+        day = self.anchor - timedelta(days=self.rng.randrange(self.days))
+        moment = time(self.rng.randint(9, 19), self.rng.randrange(60), self.rng.randrange(60))
+        return timezone.make_aware(datetime.combine(day, moment))
+
+    def build_customer(self, prefix, number):
+        rng = self.rng
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        city, localities = rng.choice(CITIES)
+        created_at = self.random_datetime()
+        complete = rng.random() > 0.1
+        return Customer(
+            form_number=f'{prefix}-{number}',
+            form_date=created_at.date(),
+            first_name=first_name,
+            last_name=last_name,
+            email=f'{first_name}.{last_name}{number}@example.com'.lower(),
+            phone_number=f'{rng.choice("6789")}{rng.randrange(10 ** 9):09d}',
+            sex=rng.choice(Customer.SEX_CHOICES)[0],
+            marital_status=rng.choice(Customer.MARITAL_STATUS_CHOICES)[0],
+            date_of_birth=created_at.date() - timedelta(days=rng.randint(25 * 365, 65 * 365)),
+            residential_address=f'{rng.randint(1, 500)}, {rng.choice(localities)}',
+            city=city,
+            locality=rng.choice(localities),
+            pincode=f'4{rng.randrange(100000):05d}',
+            nationality=rng.choices(['indian', 'nri', 'pio', 'oci'], [85, 10, 3, 2])[0],
+            employment_type=rng.choice(Customer.EMPLOYMENT_CHOICES)[0],
+            company_name=rng.choice(COMPANIES),
+            designation=rng.choice(DESIGNATIONS),
+            industry=rng.choice(INDUSTRIES),
+            configuration=rng.choice(Customer.CONFIGURATION_CHOICES)[0],
+            budget=rng.choice(Customer.BUDGET_CHOICES)[0],
+            construction_status=rng.choice(Customer.CONSTRUCTION_STATUS_CHOICES)[0],
+            purpose_of_buying=rng.choice(Customer.PURPOSE_CHOICES)[0],
+            source_details='',
+            current_step=4 if complete else rng.randint(1, 3),
+            is_complete=complete,
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def create_batch(self, prefixes, first_number, size):
+        rng = self.rng
+        customers = [
+            self.build_customer(prefixes[(first_number + i) % len(prefixes)], first_number + i)
+            for i in range(size)
+        ]
+
+        with transaction.atomic(), explicit_timestamps(
+            Customer, InternalSalesAssessment, BookingApplication, CustomerAssignment,
+            CustomerRevisit, AdditionalChannelPartner, AuditLog,
+        ):
+            Customer.objects.bulk_create(customers, batch_size=500)
+
+            sources, partners, extra_partners, referrals = [], [], [], []
+            assessments, bookings, assignments, revisits, logs = [], [], [], [], []
+            booking_sources = []
+
+            for customer in customers:
+                created_at = customer.created_at
+                source = rng.choices(self.sources, self.source_weights)[0]
+                sources.append(CustomerSource(customer=customer, source_type=source))
+                partner = None
+                if source == 'channel_partner':
+                    partner = rng.choice(self.partners)
+                    partners.append(ChannelPartner(customer=customer, **partner))
+                    if rng.random() < EXTRA_CP_RATE:
+                        extra = rng.choice(self.partners)
+                        claimed_at = created_at + timedelta(days=rng.randint(0, 10))
+                        extra_partners.append(AdditionalChannelPartner(
+                            customer=customer, created_at=claimed_at, updated_at=claimed_at, **extra
+                        ))
+                elif source == 'referral':
+                    referrals.append(Referral(
+                        customer=customer,
+                        referral_name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                        project_name=self.project_names[rng.choice(prefixes)],
+                    ))
+
+                logs.append(AuditLog(
+                    action='submit', model_name='Customer', object_id=customer.id,
+                    object_repr=str(customer)[:300], timestamp=created_at,
+                ))
+
+                if not customer.is_complete:
+                    continue
+
+                sourcing = rng.choice(self.sourcing_managers)
+                closing = rng.choice(self.closing_managers)
+                if rng.random() < ASSIGNMENT_RATE:
+                    assignments.append(CustomerAssignment(
+                        customer=customer, sourcing_manager=sourcing, closing_manager=closing,
+                        assigned_at=created_at + timedelta(hours=1), updated_at=created_at + timedelta(hours=1),
+                    ))
+
+                if rng.random() < ASSESSMENT_RATE:
+                    assessed_at = created_at + timedelta(days=rng.randint(0, 7), hours=rng.randint(0, 8))
+                    classification = rng.choices(self.classifications, self.classification_weights)[0]
+                    assessments.append(InternalSalesAssessment(
+                        customer=customer,
+                        sourcing_manager=sourcing.get_full_name(),
+                        sales_manager=closing.get_full_name(),
+                        customer_gender=rng.choice(InternalSalesAssessment.GENDER_CHOICES)[0],
+                        lead_classification=classification,
+                        reason_for_lost=rng.choice(InternalSalesAssessment.REASON_FOR_LOST_CHOICES)[0]
+                        if classification == 'lost' else '',
+                        current_residence_config=rng.choice(InternalSalesAssessment.CURRENT_RESIDENCE_CONFIG_CHOICES)[0],
+                        current_residence_ownership=rng.choice(InternalSalesAssessment.OWNERSHIP_CHOICES)[0],
+                        family_size=rng.choice(InternalSalesAssessment.FAMILY_SIZE_CHOICES)[0],
+                        source_of_funding=rng.choice(InternalSalesAssessment.FUNDING_SOURCE_CHOICES)[0],
+                        ethnicity=rng.choice(InternalSalesAssessment.ETHNICITY_CHOICES)[0],
+                        created_at=assessed_at,
+                        updated_at=assessed_at,
+                    ))
+                    logs.append(AuditLog(
+                        user=closing, action='assessment', model_name='InternalSalesAssessment',
+                        object_repr=f'Assessment for {customer.get_full_name()} ({customer.form_number})',
+                        timestamp=assessed_at,
+                    ))
+
+                    if classification in ('hot', 'warm') and rng.random() < BOOKING_RATE:
+                        booked_at = assessed_at + timedelta(days=rng.randint(1, 45))
+                        price = rng.randint(80, 900) * 100000
+                        booking = BookingApplication(
+                            customer=customer,
+                            project_name=get_project_name_from_form_number(customer.form_number, self.project_names),
+                            application_date=booked_at.date(),
+                            flat_number=f'{rng.randint(1, 40)}{rng.randint(1, 8):02d}',
+                            floor=str(rng.randint(1, 40)),
+                            rera_carpet_area=rng.randint(450, 2500),
+                            car_parking_count=rng.randint(0, 2),
+                            total_purchase_price=price,
+                            self_financed=rng.random() < 0.4,
+                            housing_loan=rng.random() < 0.6,
+                            application_money_amount=price // 10,
+                            sales_manager_name=closing.get_full_name(),
+                            sourcing_manager_name=sourcing.get_full_name(),
+                            created_at=booked_at,
+                            updated_at=booked_at,
+                        )
+                        bookings.append(booking)
+                        booking_sources.append(partner)
+                        logs.append(AuditLog(
+                            user=closing, action='booking', model_name='BookingApplication',
+                            object_repr=f'Booking created for {customer.get_full_name()} ({customer.form_number})',
+                            timestamp=booked_at,
+                        ))
+
+                if rng.random() < REVISIT_RATE:
+                    for _ in range(rng.randint(1, 3)):
+                        visit = created_at + timedelta(days=rng.randint(3, 60))
+                        revisits.append(CustomerRevisit(
+                            customer=customer, visit_date=visit.date(), remark='Site revisit',
+                            created_by=closing, created_at=visit,
+                        ))
+
+            CustomerSource.objects.bulk_create(sources, batch_size=500)
+            ChannelPartner.objects.bulk_create(partners, batch_size=500)
+            AdditionalChannelPartner.objects.bulk_create(extra_partners, batch_size=500)
+            Referral.objects.bulk_create(referrals, batch_size=500)
+            CustomerAssignment.objects.bulk_create(assignments, batch_size=500)
+            InternalSalesAssessment.objects.bulk_create(assessments, batch_size=500)
+            CustomerRevisit.objects.bulk_create(revisits, batch_size=500)
+            BookingApplication.objects.bulk_create(bookings, batch_size=500)
+
+            applicants, booking_partners = [], []
+            for booking, partner in zip(bookings, booking_sources):
+                customer = booking.customer
+                for order in range(1, rng.choices([1, 2, 3], [60, 35, 5])[0] + 1):
+                    primary = order == 1
+                    applicants.append(BookingApplicant(
+                        booking_application=booking,
+                        applicant_order=order,
+                        title=rng.choice(BookingApplicant.TITLE_CHOICES)[0],
+                        first_name=customer.first_name if primary else rng.choice(FIRST_NAMES),
+                        last_name=customer.last_name,
+                        sex=rng.choice(BookingApplicant.SEX_CHOICES)[0],
+                        marital_status=rng.choice(BookingApplicant.MARITAL_STATUS_CHOICES)[0],
+                        pan_no=f'ABCDE{rng.randrange(10000):04d}F',
+                        residential_status=customer.nationality,
+                        residential_address=customer.residential_address,
+                        city=customer.city,
+                        pin=customer.pincode,
+                        state='Maharashtra',
+                        mobile=customer.phone_number if primary else f'9{rng.randrange(10 ** 9):09d}',
+                        email=customer.email if primary else '',
+                        employment_type=rng.choice(BookingApplicant.EMPLOYMENT_TYPE_CHOICES)[0],
+                    ))
+                if partner:
+                    booking_partners.append(BookingChannelPartner(
+                        booking_application=booking,
+                        name=partner['company_name'],
+                        maharera_registration=partner['rera_number'],
+                        mobile=partner['mobile_number'],
+                    ))
+            BookingApplicant.objects.bulk_create(applicants, batch_size=500)
+            BookingChannelPartner.objects.bulk_create(booking_partners, batch_size=500)
+            AuditLog.objects.bulk_create(logs, batch_size=500)
+            versioning.bump()
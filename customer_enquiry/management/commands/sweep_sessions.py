@@ -0,0 +1,69 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Delete expired rows from django_session in small batches, so the sweep '
+            'never holds a long write lock. Safe to run from cron every few minutes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per transaction (default 1000).')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to let other writers in.')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Also delete unexpired sessions with no logged-in user — the public '
+                                 'enquiry sessions stored in the database before they moved to the cache.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count what would be deleted without deleting anything.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        expired = Session.objects.filter(expire_date__lt=timezone.now())
+        deleted = self.sweep(expired, options)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would delete' if options['dry_run'] else 'Deleted'} {deleted} expired session(s)"))
+
+        if options['anonymous']:
+            deleted = self.sweep_anonymous(options)
+            self.stdout.write(self.style.SUCCESS(
+                f"{'Would delete' if options['dry_run'] else 'Deleted'} {deleted} anonymous session(s)"))
+
+    def sweep(self, queryset, options):
+        """Delete `queryset` batch by batch (expire_date is indexed, so each pick is cheap)."""
+        if options['dry_run']:
+            return queryset.count()
+
+        deleted = 0
+        while True:
+            keys = list(queryset.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                return deleted
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+    def sweep_anonymous(self, options):
+        """Walk live sessions in key order and delete the ones that never logged anybody in."""
+        deleted = 0
+        last_key = ''
+        while True:
+            batch = list(Session.objects.filter(
+                session_key__gt=last_key, expire_date__gte=timezone.now()
+            ).order_by('session_key')[:options['batch_size']])
+            if not batch:
+                return deleted
+            last_key = batch[-1].session_key
+
+            keys = [s.session_key for s in batch if '_auth_user_id' not in s.get_decoded()]
+            if keys and not options['dry_run']:
+                Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if options['sleep']:
+                time.sleep(options['sleep'])
@@ -0,0 +1,107 @@
+import os
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import reverse
+
+from customer_enquiry import reference_data, snapshot
+
+# Public pages a QR scan lands on, pre-hit with --base-url
+PUBLIC_PAGES = [
+    'customer_enquiry:verification',
+    'customer_enquiry:altavista_verification',
+    'customer_enquiry:ornata_verification',
+    'customer_enquiry:medius_verification',
+    'customer_enquiry:stardeous_verification',
+    'customer_enquiry:anthea_verification',
+]
+
+
+class Command(BaseCommand):
+    help = ('Warm caches after a deploy or restart: publish the reference snapshot, rebuild the '
+            'reference cache keys, compile every template and optionally pre-hit the public pages. '
+            'Reports how long each step took.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default=None,
+                            help='Site root (e.g. https://enquiry.example.com) to pre-hit the public '
+                                 'property pages on, so the workers compile their templates.')
+        parser.add_argument('--rounds', type=int, default=4,
+                            help='Times each page is requested with --base-url (default 4), '
+                                 'so the hits spread over several workers.')
+        parser.add_argument('--timeout', type=float, default=10.0,
+                            help='Per-request timeout in seconds for --base-url (default 10).')
+
+    def handle(self, *args, **options):
+        if options['rounds'] < 1:
+            raise CommandError('--rounds must be at least 1.')
+
+        steps = [
+            ('reference snapshot', self.publish_snapshot),
+            ('reference cache', self.warm_reference_cache),
+            ('templates', self.compile_templates),
+        ]
+        if options['base_url']:
+            steps.append(('public pages', lambda: self.hit_pages(
+                options['base_url'], options['rounds'], options['timeout'])))
+
+        total_ms = 0.0
+        for name, step in steps:
+            started = time.perf_counter()
+            detail = step()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            total_ms += elapsed_ms
+            self.stdout.write(f"  {name:<20} {elapsed_ms:9.1f} ms  {detail}")
+        self.stdout.write(self.style.SUCCESS(f"Caches warmed in {total_ms:.1f} ms"))
+
+    def publish_snapshot(self):
+        if not settings.REFERENCE_SNAPSHOT_PATH:
+            return 'skipped (REFERENCE_SNAPSHOT_PATH not set)'
+        return f'{snapshot.publish():,} bytes'
+
+    def warm_reference_cache(self):
+        return f'{len(reference_data.warm())} keys'
+
+    def compile_templates(self):
+        """
+        Parse every template. Compiled templates are cached per
+        worker process, so this checks they all compile; --base-url is what
+        warms the workers themselves.
+        """
+        engine = engines['django'].engine
+        dirs = list(engine.dirs) + list(get_app_template_dirs('templates'))
+        compiled = 0
+        for template_dir in dirs:
+            template_dir = str(template_dir)
+            for root, _, files in os.walk(template_dir):
+                for filename in files:
+                    if not filename.endswith(('.html', '.txt')):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), template_dir)
+                    engine.get_template(name.replace(os.sep, '/'))
+                    compiled += 1
+        return f'{compiled} templates'
+
+    def hit_pages(self, base_url, rounds, timeout):
+        urls = [reverse(name) for name in PUBLIC_PAGES]
+        urls += [
+            f"{reverse('customer_enquiry:get_project_data')}?property_code={project.form_number}"
+            for project in reference_data.active_projects() if project.form_number
+        ]
+        failures = []
+        for _ in range(rounds):
+            for path in urls:
+                url = base_url.rstrip('/') + path
+                try:
+                    with urllib.request.urlopen(url, timeout=timeout) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as e:
+                    failures.append(f'{path}: {e}')
+        for failure in sorted(set(failures)):
+            self.stderr.write(self.style.WARNING(f'    {failure}'))
+        return f'{len(urls) * rounds - len(failures)}/{len(urls) * rounds} requests OK'
@@ -0,0 +1,69 @@
+"""
+Project middleware.
+
+CacheGenerationMiddleware keeps this worker's local cache tier in step with
+edits made in other workers (see invalidation.py).
+
+EnquirySessionMiddleware replaces django.contrib.sessions' SessionMiddleware.
+Staff pages keep the normal database sessions. The public QR/OTP enquiry
+pages (settings.PUBLIC_SESSION_URL_NAMES) get a cache-backed session under
+their own cookie instead, so sending or verifying an OTP, or submitting an
+enquiry, never writes a django_session row.
+"""
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+from . import invalidation, reference_data
+
+
+class CacheGenerationMiddleware(MiddlewareMixin):
+    def process_request(self, request):
+        invalidation.sync(reference_data.NAMESPACE_KEYS)
+
+
+class EnquirySessionMiddleware(SessionMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.PublicSessionStore = import_module(settings.PUBLIC_SESSION_ENGINE).SessionStore
+        self.public_url_names = frozenset(settings.PUBLIC_SESSION_URL_NAMES)
+
+    def is_public(self, request):
+        # A signed-in staff member filling the form keeps their own session (and login)
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        return match.view_name in self.public_url_names
+
+    def process_request(self, request):
+        request.public_session = self.is_public(request)
+        if not request.public_session:
+            return super().process_request(request)
+        session_key = request.COOKIES.get(settings.PUBLIC_SESSION_COOKIE_NAME)
+        request.session = self.PublicSessionStore(session_key)
+
+    def process_response(self, request, response):
+        response = super().process_response(request, response)
+        if not getattr(request, 'public_session', False):
+            return response
+
+        cookie_name = settings.PUBLIC_SESSION_COOKIE_NAME
+        # SessionMiddleware always writes settings.SESSION_COOKIE_NAME — move it to our cookie
+        morsel = response.cookies.pop(settings.SESSION_COOKIE_NAME, None)
+        if morsel is not None:
+            morsel.set(cookie_name, morsel.value, morsel.coded_value)
+            response.cookies[cookie_name] = morsel
+        elif cookie_name in request.COOKIES and request.session.is_empty():
+            response.delete_cookie(
+                cookie_name,
+                path=settings.SESSION_COOKIE_PATH,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0017_channelpartnermaster'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('edit', 'Edited'), ('delete', 'Deleted'), ('login', 'Logged In'), ('logout', 'Logged Out'), ('assign', 'Assigned'), ('submit', 'Form Submitted'), ('assessment', 'Assessment Saved'), ('booking', 'Booking Submitted'), ('export', 'Exported Data'), ('password_reset', 'Password Reset Requested'), ('cp_add', 'CP Added'), ('cp_remove', 'CP Removed'), ('cp_toggle', 'CP Status Toggled')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='OTPCode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(choices=[('enquiry', 'Enquiry Verification'), ('password_reset', 'Password Reset')], max_length=20)),
+                ('identifier', models.CharField(help_text='Phone number or username the code was sent for', max_length=150)),
+                ('code_hash', models.CharField(max_length=64)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'OTP Code',
+                'verbose_name_plural': 'OTP Codes',
+                'db_table': 'otp_codes',
+                'constraints': [models.UniqueConstraint(fields=('purpose', 'identifier'), name='otp_code_purpose_identifier_uniq')],
+            },
+        ),
+    ]
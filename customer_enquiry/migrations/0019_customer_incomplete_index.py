@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0018_otpcode'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('is_complete', False)), fields=['updated_at'], name='customer_incomplete_upd_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0019_customer_incomplete_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedLead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_id', models.IntegerField(help_text='Original Customer id', unique=True)),
+                ('form_number', models.CharField(max_length=20, unique=True)),
+                ('full_name', models.CharField(blank=True, max_length=300)),
+                ('phone_number', models.CharField(blank=True, db_index=True, max_length=10)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('lead_classification', models.CharField(blank=True, max_length=10)),
+                ('last_activity_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payload', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Archived Lead',
+                'verbose_name_plural': 'Archived Leads',
+                'db_table': 'archived_leads',
+                'ordering': ['-archived_at'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('edit', 'Edited'), ('delete', 'Deleted'), ('login', 'Logged In'), ('logout', 'Logged Out'), ('assign', 'Assigned'), ('submit', 'Form Submitted'), ('assessment', 'Assessment Saved'), ('booking', 'Booking Submitted'), ('export', 'Exported Data'), ('password_reset', 'Password Reset Requested'), ('cp_add', 'CP Added'), ('cp_remove', 'CP Removed'), ('cp_toggle', 'CP Status Toggled'), ('archive', 'Archived'), ('restore', 'Restored from Archive')], max_length=20),
+        ),
+    ]
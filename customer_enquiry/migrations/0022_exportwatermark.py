@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0021_exportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('exported_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Export Watermark',
+                'verbose_name_plural': 'Export Watermarks',
+                'db_table': 'export_watermarks',
+            },
+        ),
+        migrations.AddField(
+            model_name='exportjob',
+            name='watermark_key',
+            field=models.CharField(blank=True, help_text='ExportWatermark this incremental export advances (blank for full exports)', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['updated_at'], name='customer_updated_at_idx'),
+        ),
+    ]
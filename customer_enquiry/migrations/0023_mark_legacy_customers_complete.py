@@ -0,0 +1,45 @@
+from django.db import migrations
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Exists, OuterRef, Q
+
+
+def mark_legacy_customers_complete(apps, schema_editor):
+    """
+    Customers submitted before the multi-step form (0014) got is_complete=False
+    and current_step=0 from that migration's defaults — but so did every
+    autosaved draft, because save_step_view never set current_step. Only
+    rows with something a submit (or staff work on a submitted lead)
+    produces are marked complete: a lead source, an assessment, a booking,
+    or a created_at before 0014 was applied. The rest stay drafts.
+    """
+    Customer = apps.get_model('customer_enquiry', 'Customer')
+    CustomerSource = apps.get_model('customer_enquiry', 'CustomerSource')
+    InternalSalesAssessment = apps.get_model('customer_enquiry', 'InternalSalesAssessment')
+    BookingApplication = apps.get_model('customer_enquiry', 'BookingApplication')
+
+    submitted = (
+        Exists(CustomerSource.objects.filter(customer=OuterRef('pk')))
+        | Exists(InternalSalesAssessment.objects.filter(customer=OuterRef('pk')))
+        | Exists(BookingApplication.objects.filter(customer=OuterRef('pk')))
+    )
+    multi_step_applied = (
+        MigrationRecorder.Migration.objects.using(schema_editor.connection.alias)
+        .filter(app='customer_enquiry', name='0014_customer_current_step_customer_is_complete_and_more')
+        .values_list('applied', flat=True).first()
+    )
+    if multi_step_applied is not None:
+        submitted |= Q(created_at__lt=multi_step_applied)
+
+    legacy = Customer.objects.filter(is_complete=False, current_step=0).filter(submitted)
+    Customer.objects.filter(pk__in=legacy.values('pk')).update(is_complete=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0022_exportwatermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_legacy_customers_complete, migrations.RunPython.noop),
+    ]
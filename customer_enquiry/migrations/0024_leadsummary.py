@@ -0,0 +1,61 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0023_mark_legacy_customers_complete'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeadSummaryChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('customer_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Lead Summary Change',
+                'verbose_name_plural': 'Lead Summary Changes',
+                'db_table': 'lead_summary_changes',
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadSummary',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='customer_enquiry.customer')),
+                ('form_number', models.CharField(max_length=20)),
+                ('project_name', models.CharField(blank=True, max_length=200)),
+                ('full_name', models.CharField(blank=True, max_length=302)),
+                ('email', models.EmailField(blank=True, max_length=254)),
+                ('phone_number', models.CharField(blank=True, max_length=10)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('sources', models.CharField(blank=True, help_text='Lead source labels, comma-separated', max_length=255)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('has_assessment', models.BooleanField(default=False)),
+                ('lead_classification', models.CharField(blank=True, max_length=10)),
+                ('has_booking', models.BooleanField(default=False)),
+                ('has_additional_cp', models.BooleanField(default=False)),
+                ('revisit_count', models.PositiveIntegerField(default=0)),
+                ('last_revisit_date', models.DateField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(help_text='Customer.created_at')),
+                ('updated_at', models.DateTimeField(help_text='Customer.updated_at')),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+                ('closing_manager', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('sourcing_manager', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Lead Summary',
+                'verbose_name_plural': 'Lead Summaries',
+                'db_table': 'lead_summaries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='lead_summary_created_idx'), models.Index(fields=['form_number'], name='lead_summary_form_idx'), models.Index(fields=['sourcing_manager', '-created_at'], name='lead_summary_sourcing_idx'), models.Index(fields=['closing_manager', '-created_at'], name='lead_summary_closing_idx'), models.Index(fields=['has_assessment', '-created_at'], name='lead_summary_assessed_idx'), models.Index(fields=['has_booking', '-created_at'], name='lead_summary_booked_idx'), models.Index(condition=models.Q(('is_complete', False)), fields=['updated_at'], name='lead_summary_incomplete_idx')],
+            },
+        ),
+    ]
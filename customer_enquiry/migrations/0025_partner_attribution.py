@@ -0,0 +1,53 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0024_leadsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartnerStats',
+            fields=[
+                ('partner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='customer_enquiry.channelpartnermaster')),
+                ('enquiries', models.PositiveIntegerField(default=0, help_text='Leads that named the partner at enquiry')),
+                ('assessed', models.PositiveIntegerField(default=0, help_text='Of those, leads with a sales assessment')),
+                ('booked', models.PositiveIntegerField(default=0, help_text='Of those, leads with a booking')),
+                ('additional_claims', models.PositiveIntegerField(default=0, help_text='Leads the partner was added to as an additional CP')),
+                ('booking_forms', models.PositiveIntegerField(default=0, help_text='Booking forms naming the partner')),
+                ('last_enquiry_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Partner Stats',
+                'verbose_name_plural': 'Partner Stats',
+                'db_table': 'partner_stats',
+                'indexes': [models.Index(fields=['-enquiries'], name='partner_stats_enquiries_idx'), models.Index(fields=['-booked'], name='partner_stats_booked_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PartnerAttribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('enquiry', 'Enquiry'), ('additional', 'Additional CP'), ('booking', 'Booking Form')], max_length=10)),
+                ('source_id', models.BigIntegerField(help_text='pk of the ChannelPartner / AdditionalChannelPartner / BookingChannelPartner row')),
+                ('customer_id', models.BigIntegerField()),
+                ('mobile', models.CharField(blank=True, help_text='Last 10 digits', max_length=10)),
+                ('rera', models.CharField(blank=True, help_text='Upper-case, letters and digits only', max_length=50)),
+                ('matched_by', models.CharField(blank=True, choices=[('rera', 'RERA Number'), ('mobile', 'Mobile Number')], max_length=10)),
+                ('partner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attributions', to='customer_enquiry.channelpartnermaster')),
+            ],
+            options={
+                'verbose_name': 'Partner Attribution',
+                'verbose_name_plural': 'Partner Attributions',
+                'db_table': 'partner_attributions',
+                'indexes': [models.Index(fields=['partner', 'kind'], name='partner_attr_partner_idx'), models.Index(fields=['customer_id'], name='partner_attr_customer_idx'), models.Index(fields=['mobile'], name='partner_attr_mobile_idx'), models.Index(fields=['rera'], name='partner_attr_rera_idx')],
+                'constraints': [models.UniqueConstraint(fields=('kind', 'source_id'), name='partner_attr_source_uniq')],
+            },
+        ),
+    ]
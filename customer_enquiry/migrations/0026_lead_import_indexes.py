@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 12:48
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0025_partner_attribution'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('edit', 'Edited'), ('delete', 'Deleted'), ('login', 'Logged In'), ('logout', 'Logged Out'), ('assign', 'Assigned'), ('submit', 'Form Submitted'), ('assessment', 'Assessment Saved'), ('booking', 'Booking Submitted'), ('export', 'Exported Data'), ('password_reset', 'Password Reset Requested'), ('cp_add', 'CP Added'), ('cp_remove', 'CP Removed'), ('cp_toggle', 'CP Status Toggled'), ('archive', 'Archived'), ('restore', 'Restored from Archive'), ('import', 'Imported Leads')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='archivedlead',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='archived_lead_email_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['phone_number'], name='customer_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='customer_email_lower_idx'),
+        ),
+    ]
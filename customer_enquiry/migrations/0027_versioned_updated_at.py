@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0026_lead_import_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='additionalchannelpartner',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='bookingapplicant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='bookingchannelpartner',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='channelpartner',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='customersource',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
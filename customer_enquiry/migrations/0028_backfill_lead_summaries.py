@@ -0,0 +1,108 @@
+from django.db import migrations
+from django.db.models import Count, Exists, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH = 500
+
+
+def _project_name(form_number, project_names):
+    """views.get_project_name_from_form_number() with a prefix map, frozen for this migration."""
+    if not form_number:
+        return ''
+    if '-' in form_number:
+        parts = form_number.split('-')
+        prefix = f"{parts[0]}-{parts[1]}" if len(parts) >= 3 and not parts[1].isdigit() else parts[0]
+    else:
+        prefix = form_number[:3]
+    prefix = prefix.upper()
+    return project_names.get(prefix) or project_names.get(prefix.split('-')[0], '')
+
+
+def backfill_lead_summaries(apps, schema_editor):
+    """
+    Fill lead_summaries for every customer that has no row yet, as
+    lead_summary.rebuild() would, so the dashboards show the existing leads
+    straight after deploy. Customers that already have a summary (e.g. after
+    a manual rebuild_lead_summary) are left alone.
+    """
+    Customer = apps.get_model('customer_enquiry', 'Customer')
+    CustomerSource = apps.get_model('customer_enquiry', 'CustomerSource')
+    InternalSalesAssessment = apps.get_model('customer_enquiry', 'InternalSalesAssessment')
+    BookingApplication = apps.get_model('customer_enquiry', 'BookingApplication')
+    AdditionalChannelPartner = apps.get_model('customer_enquiry', 'AdditionalChannelPartner')
+    CustomerAssignment = apps.get_model('customer_enquiry', 'CustomerAssignment')
+    CustomerRevisit = apps.get_model('customer_enquiry', 'CustomerRevisit')
+    LeadSummary = apps.get_model('customer_enquiry', 'LeadSummary')
+    Project = apps.get_model('customer_enquiry', 'Project')
+
+    project_names = {}
+    for prefix, name in Project.objects.filter(is_active=True).values_list('project_prefix', 'project_name'):
+        project_names.setdefault(prefix.upper(), name)
+    labels = {}
+    for code, label in CustomerSource._meta.get_field('source_type').choices:
+        labels[code] = 'Social Media' if 'Social Media' in str(label) else str(label)
+
+    assessment = InternalSalesAssessment.objects.filter(customer=OuterRef('pk'))
+    assignment = CustomerAssignment.objects.filter(customer=OuterRef('pk'))
+    revisits = CustomerRevisit.objects.filter(customer=OuterRef('pk')).order_by().values('customer')
+    missing = Customer.objects.exclude(Exists(LeadSummary.objects.filter(customer=OuterRef('pk')))).annotate(
+        summary_has_assessment=Exists(assessment),
+        summary_classification=Subquery(assessment.values('lead_classification')[:1]),
+        summary_has_booking=Exists(BookingApplication.objects.filter(customer=OuterRef('pk'))),
+        summary_has_additional_cp=Exists(AdditionalChannelPartner.objects.filter(customer=OuterRef('pk'))),
+        summary_sourcing=Subquery(assignment.values('sourcing_manager_id')[:1]),
+        summary_closing=Subquery(assignment.values('closing_manager_id')[:1]),
+        summary_revisit_count=Coalesce(Subquery(revisits.annotate(n=Count('pk')).values('n')), 0),
+        summary_last_revisit=Subquery(revisits.annotate(last=Max('visit_date')).values('last')),
+    ).order_by('pk')
+
+    last_pk = 0
+    while True:
+        customers = list(missing.filter(pk__gt=last_pk)[:BATCH])
+        if not customers:
+            break
+        sources = {}
+        for customer_id, source_type in (CustomerSource.objects.filter(customer__in=[c.pk for c in customers])
+                                         .order_by('pk').values_list('customer_id', 'source_type')):
+            sources.setdefault(customer_id, []).append(labels.get(source_type, source_type))
+
+        rows = []
+        for customer in customers:
+            if customer.middle_name:
+                full_name = f"{customer.first_name} {customer.middle_name} {customer.last_name}"
+            else:
+                full_name = f"{customer.first_name} {customer.last_name}"
+            rows.append(LeadSummary(
+                customer_id=customer.pk,
+                form_number=customer.form_number,
+                project_name=_project_name(customer.form_number, project_names),
+                full_name=full_name.strip(),
+                email=customer.email,
+                phone_number=customer.phone_number or '',
+                city=customer.city,
+                sources=', '.join(dict.fromkeys(sources.get(customer.pk, [])))[:255],
+                is_complete=customer.is_complete,
+                has_assessment=customer.summary_has_assessment,
+                lead_classification=customer.summary_classification or '',
+                has_booking=customer.summary_has_booking,
+                has_additional_cp=customer.summary_has_additional_cp,
+                sourcing_manager_id=customer.summary_sourcing,
+                closing_manager_id=customer.summary_closing,
+                revisit_count=customer.summary_revisit_count,
+                last_revisit_date=customer.summary_last_revisit,
+                created_at=customer.created_at,
+                updated_at=customer.updated_at,
+            ))
+        LeadSummary.objects.bulk_create(rows, ignore_conflicts=True)
+        last_pk = customers[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0027_versioned_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lead_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,105 @@
+import re
+
+from django.db import migrations
+from django.db.models import Count, Exists, Max, OuterRef, Q, Subquery
+
+BATCH = 2000
+
+_NON_ALNUM_RE = re.compile(r'[^0-9A-Z]')
+
+
+# attribution.normalize_mobile() / normalize_rera(), frozen for this migration
+def _mobile(value):
+    digits = ''.join(ch for ch in value or '' if ch.isdigit())
+    return digits[-10:] if len(digits) >= 10 else ''
+
+
+def _rera(value):
+    return _NON_ALNUM_RE.sub('', (value or '').upper())
+
+
+def backfill_partner_attribution(apps, schema_editor):
+    """
+    Resolve every partner mention and count every directory partner, as
+    attribution.rebuild() would, so the partner leaderboard isn't empty after
+    deploy. Skipped when attributions already exist (a rebuild already ran).
+    """
+    ChannelPartnerMaster = apps.get_model('customer_enquiry', 'ChannelPartnerMaster')
+    ChannelPartner = apps.get_model('customer_enquiry', 'ChannelPartner')
+    AdditionalChannelPartner = apps.get_model('customer_enquiry', 'AdditionalChannelPartner')
+    BookingChannelPartner = apps.get_model('customer_enquiry', 'BookingChannelPartner')
+    InternalSalesAssessment = apps.get_model('customer_enquiry', 'InternalSalesAssessment')
+    BookingApplication = apps.get_model('customer_enquiry', 'BookingApplication')
+    Customer = apps.get_model('customer_enquiry', 'Customer')
+    PartnerAttribution = apps.get_model('customer_enquiry', 'PartnerAttribution')
+    PartnerStats = apps.get_model('customer_enquiry', 'PartnerStats')
+
+    if PartnerAttribution.objects.exists():
+        return
+
+    # RERA first (unique per partner), then mobile; active partners win ties
+    by_rera, by_mobile = {}, {}
+    for pk, mobile, rera in ChannelPartnerMaster.objects.order_by('is_active', 'pk').values_list(
+            'pk', 'mobile_number', 'rera_number'):
+        if _rera(rera):
+            by_rera[_rera(rera)] = pk
+        if _mobile(mobile):
+            by_mobile[_mobile(mobile)] = pk
+
+    sources = [
+        ('enquiry', ChannelPartner.objects.values_list('pk', 'customer_id', 'mobile_number', 'rera_number')),
+        ('additional', AdditionalChannelPartner.objects.values_list('pk', 'customer_id', 'mobile_number', 'rera_number')),
+        ('booking', BookingChannelPartner.objects.values_list(
+            'pk', 'booking_application__customer_id', 'mobile', 'maharera_registration')),
+    ]
+    rows = []
+    for kind, mentions in sources:
+        for source_id, customer_id, mobile, rera in mentions.order_by('pk').iterator(chunk_size=BATCH):
+            mobile, rera = _mobile(mobile), _rera(rera)
+            if rera and rera in by_rera:
+                partner_id, matched_by = by_rera[rera], 'rera'
+            elif mobile and mobile in by_mobile:
+                partner_id, matched_by = by_mobile[mobile], 'mobile'
+            else:
+                partner_id, matched_by = None, ''
+            rows.append(PartnerAttribution(kind=kind, source_id=source_id, customer_id=customer_id, mobile=mobile,
+                                           rera=rera[:50], partner_id=partner_id, matched_by=matched_by))
+            if len(rows) >= BATCH:
+                PartnerAttribution.objects.bulk_create(rows)
+                rows = []
+    PartnerAttribution.objects.bulk_create(rows)
+
+    enquiry = Q(kind='enquiry')
+    stats = {pk: PartnerStats(partner_id=pk) for pk in ChannelPartnerMaster.objects.values_list('pk', flat=True)}
+    counts = (
+        PartnerAttribution.objects.exclude(partner=None).order_by()
+        .values('partner_id')
+        .annotate(
+            enquiries=Count('customer_id', filter=enquiry, distinct=True),
+            assessed=Count('customer_id', distinct=True, filter=enquiry & Q(Exists(
+                InternalSalesAssessment.objects.filter(customer_id=OuterRef('customer_id'))))),
+            booked=Count('customer_id', distinct=True, filter=enquiry & Q(Exists(
+                BookingApplication.objects.filter(customer_id=OuterRef('customer_id'))))),
+            additional_claims=Count('customer_id', filter=Q(kind='additional'), distinct=True),
+            booking_forms=Count('source_id', filter=Q(kind='booking')),
+            last_enquiry_at=Max(Subquery(Customer.objects.filter(pk=OuterRef('customer_id')).values('created_at')),
+                                filter=enquiry),
+        )
+    )
+    for row in counts:
+        stat = stats.get(row.pop('partner_id'))
+        if stat is not None:
+            for field, value in row.items():
+                setattr(stat, field, value)
+    PartnerStats.objects.bulk_create(stats.values(), batch_size=BATCH, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_enquiry', '0028_backfill_lead_summaries'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_partner_attribution, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.core.validators import RegexValidator, EmailValidator
 from django.utils import timezone
 from django.contrib.auth.models import User
@@ -55,6 +56,67 @@ class UserProfile(models.Model):
         return self.role == 'closing_manager'
 
 
+# Custom Manager for Customer model with useful querysets
+class CustomerManager(models.Manager):
+    """
+    Custom manager for Customer model with helpful methods
+    """
+    
+    def get_by_form_number(self, form_number):
+        """Get customer by form number"""
+        return self.get(form_number=form_number)
+    
+    def by_nationality(self, nationality):
+        """Filter customers by nationality"""
+        return self.filter(nationality=nationality)
+    
+    def by_employment_type(self, employment_type):
+        """Filter customers by employment type"""
+        return self.filter(employment_type=employment_type)
+    
+    def by_budget_range(self, budget):
+        """Filter customers by budget range"""
+        return self.filter(budget=budget)
+    
+    def by_configuration(self, configuration):
+        """Filter customers by property configuration"""
+        return self.filter(configuration=configuration)
+    
+    def recent_inquiries(self, days=30):
+        """Get customers who inquired in the last N days"""
+        from django.utils import timezone
+        from datetime import timedelta
+        
+        since_date = timezone.now() - timedelta(days=days)
+        return self.filter(created_at__gte=since_date)
+    
+    def with_channel_partners(self):
+        """Get customers who came through channel partners"""
+        return self.filter(sources__source_type='channel_partner')
+    
+    def with_referrals(self):
+        """Get customers who came through referrals"""
+        return self.filter(sources__source_type='referral')
+
+    def stale_drafts(self, days=None):
+        """Incomplete enquiries untouched for `days` (default settings.STALE_DRAFT_DAYS)"""
+        return self.filter(is_complete=False, updated_at__lt=stale_draft_cutoff(days))
+
+    def without_stale_drafts(self, days=None):
+        """Everything except stale drafts — what the dashboards list by default"""
+        return self.exclude(is_complete=False, updated_at__lt=stale_draft_cutoff(days))
+
+
+def stale_draft_cutoff(days=None):
+    from django.conf import settings
+    from django.utils import timezone
+    from datetime import timedelta
+
+    if days is None:
+        days = settings.STALE_DRAFT_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
 class Customer(models.Model):
     """
     Main customer information model that stores all form data
@@ -247,11 +309,23 @@ class Customer(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CustomerManager()
+
     class Meta:
         db_table = 'customers'
         ordering = ['-created_at']
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
+        indexes = [
+            # Only the (few) unfinished enquiries — keeps the stale-draft sweep cheap
+            models.Index(fields=['updated_at'], condition=models.Q(is_complete=False),
+                         name='customer_incomplete_upd_idx'),
+            # Range scans for incremental ("since last export") exports
+            models.Index(fields=['updated_at'], name='customer_updated_at_idx'),
+            # Duplicate checks on bulk import (imports.py)
+            models.Index(fields=['phone_number'], name='customer_phone_idx'),
+            models.Index(Lower('email'), name='customer_email_lower_idx'),
+        ]
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.form_number}"
@@ -303,6 +377,7 @@ class CustomerSource(models.Model):
         max_length=20,
         choices=SOURCE_CHOICES
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'customer_sources'
@@ -340,6 +415,7 @@ class ChannelPartner(models.Model):
         max_length=50,
         help_text="Real Estate Regulatory Authority Number"
     )
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'channel_partners'
@@ -372,53 +448,6 @@ class Referral(models.Model):
         return f"{self.referral_name} - {self.project_name}"
 
 
-# Custom Manager for Customer model with useful querysets
-class CustomerManager(models.Manager):
-    """
-    Custom manager for Customer model with helpful methods
-    """
-    
-    def get_by_form_number(self, form_number):
-        """Get customer by form number"""
-        return self.get(form_number=form_number)
-    
-    def by_nationality(self, nationality):
-        """Filter customers by nationality"""
-        return self.filter(nationality=nationality)
-    
-    def by_employment_type(self, employment_type):
-        """Filter customers by employment type"""
-        return self.filter(employment_type=employment_type)
-    
-    def by_budget_range(self, budget):
-        """Filter customers by budget range"""
-        return self.filter(budget=budget)
-    
-    def by_configuration(self, configuration):
-        """Filter customers by property configuration"""
-        return self.filter(configuration=configuration)
-    
-    def recent_inquiries(self, days=30):
-        """Get customers who inquired in the last N days"""
-        from django.utils import timezone
-        from datetime import timedelta
-        
-        since_date = timezone.now() - timedelta(days=days)
-        return self.filter(created_at__gte=since_date)
-    
-    def with_channel_partners(self):
-        """Get customers who came through channel partners"""
-        return self.filter(sources__source_type='channel_partner')
-    
-    def with_referrals(self):
-        """Get customers who came through referrals"""
-        return self.filter(sources__source_type='referral')
-
-
-# Add the custom manager to Customer model
-Customer.add_to_class('objects', CustomerManager())
-
-
 class InternalSalesAssessment(models.Model):
     """
     Internal sales team assessment form for existing customers
@@ -707,6 +736,7 @@ class BookingApplicant(models.Model):
     employment_type = models.CharField(max_length=20, choices=EMPLOYMENT_TYPE_CHOICES, blank=True)
     profession = models.CharField(max_length=100, blank=True)
     company_name = models.CharField(max_length=200, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'booking_applicants'
@@ -738,6 +768,7 @@ class BookingChannelPartner(models.Model):
     maharera_registration = models.CharField(max_length=100, blank=True)
     mobile = models.CharField(max_length=10, blank=True)
     email = models.EmailField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'booking_channel_partners'
@@ -910,6 +941,7 @@ class AdditionalChannelPartner(models.Model):
     )
     rera_number = models.CharField(max_length=50, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'additional_channel_partners'
@@ -1036,6 +1068,9 @@ class AuditLog(models.Model):
         ('cp_add', 'CP Added'),
         ('cp_remove', 'CP Removed'),
         ('cp_toggle', 'CP Status Toggled'),
+        ('archive', 'Archived'),
+        ('restore', 'Restored from Archive'),
+        ('import', 'Imported Leads'),
     ]
 
     user = models.ForeignKey(
@@ -1060,4 +1095,306 @@ class AuditLog(models.Model):
 
     def __str__(self):
         user_str = self.user.username if self.user else 'System'
-        return f"{user_str} — {self.get_action_display()} {self.model_name} ({self.timestamp:%d %b %Y %H:%M})"
\ No newline at end of file
+        return f"{user_str} — {self.get_action_display()} {self.model_name} ({self.timestamp:%d %b %Y %H:%M})"
+
+
+class OTPCode(models.Model):
+    """
+    One outstanding WhatsApp OTP per (purpose, identifier) — see customer_enquiry/otp.py.
+    Only an HMAC of the code is stored; rows past expires_at are purged by `purge_otps`.
+    """
+    PURPOSE_CHOICES = [
+        ('enquiry', 'Enquiry Verification'),
+        ('password_reset', 'Password Reset'),
+    ]
+
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    identifier = models.CharField(max_length=150, help_text="Phone number or username the code was sent for")
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'otp_codes'
+        constraints = [
+            models.UniqueConstraint(fields=['purpose', 'identifier'], name='otp_code_purpose_identifier_uniq'),
+        ]
+        verbose_name = 'OTP Code'
+        verbose_name_plural = 'OTP Codes'
+
+    def __str__(self):
+        return f"{self.get_purpose_display()} OTP for {self.identifier}"
+
+
+class ArchivedLead(models.Model):
+    """
+    A lost lead moved out of the hot tables by `archive_leads` — see customer_enquiry/archive.py.
+    `payload` holds the Customer and its child rows as serialized JSON; opening
+    the lead again restores them under their original ids.
+    """
+    customer_id = models.IntegerField(unique=True, help_text="Original Customer id")
+    form_number = models.CharField(max_length=20, unique=True)
+    full_name = models.CharField(max_length=300, blank=True)
+    phone_number = models.CharField(max_length=10, blank=True, db_index=True)
+    email = models.EmailField(blank=True)
+    lead_classification = models.CharField(max_length=10, blank=True)
+    last_activity_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.TextField()
+
+    class Meta:
+        db_table = 'archived_leads'
+        ordering = ['-archived_at']
+        indexes = [
+            models.Index(Lower('email'), name='archived_lead_email_lower_idx'),
+        ]
+        verbose_name = 'Archived Lead'
+        verbose_name_plural = 'Archived Leads'
+
+    def __str__(self):
+        return f"{self.full_name} - {self.form_number} (archived)"
+
+
+class ExportJob(models.Model):
+    """
+    A lead export built in the background by `run_export_jobs` — see customer_enquiry/exports.py.
+    The dashboard polls the job for progress and downloads the file once it is done.
+    Finished files are shared by every job with the same result_key (filters + data version).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='export_jobs'
+    )
+    params = models.TextField(help_text="JSON of the dashboard filters the export was requested with")
+    result_key = models.CharField(max_length=64, db_index=True, help_text="Hash of the filters and the data version")
+    filename = models.CharField(max_length=200)
+    watermark_key = models.CharField(max_length=100, blank=True,
+                                     help_text="ExportWatermark this incremental export advances (blank for full exports)")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_status_idx'),
+        ]
+        verbose_name = 'Export Job'
+        verbose_name_plural = 'Export Jobs'
+
+    def __str__(self):
+        return f"{self.filename} ({self.get_status_display()})"
+
+    @property
+    def percent(self):
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, self.processed_rows * 100 // self.total_rows)
+
+
+class ExportWatermark(models.Model):
+    """
+    How far an incremental lead export has got: the next one covers customers
+    updated after `exported_until`. One row per user and filter set
+    ("user:<id>[:<filters hash>]") or per shared named feed ("feed:<name>");
+    advanced by run_export_jobs once the export file is written.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    exported_until = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'export_watermarks'
+        verbose_name = 'Export Watermark'
+        verbose_name_plural = 'Export Watermarks'
+
+    def __str__(self):
+        return f"{self.key} exported until {self.exported_until:%d %b %Y %H:%M}"
+
+
+class LeadSummary(models.Model):
+    """
+    One flat row per Customer with everything a dashboard row shows — the
+    read model the dashboards query instead of joining six tables. Rebuilt
+    from the source tables by customer_enquiry/lead_summary.py; never edit it
+    directly.
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary'
+    )
+    form_number = models.CharField(max_length=20)
+    project_name = models.CharField(max_length=200, blank=True)
+    full_name = models.CharField(max_length=302, blank=True)
+    email = models.EmailField(blank=True)
+    phone_number = models.CharField(max_length=10, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    sources = models.CharField(max_length=255, blank=True, help_text="Lead source labels, comma-separated")
+    is_complete = models.BooleanField(default=False)
+    has_assessment = models.BooleanField(default=False)
+    lead_classification = models.CharField(max_length=10, blank=True)
+    has_booking = models.BooleanField(default=False)
+    has_additional_cp = models.BooleanField(default=False)
+    sourcing_manager = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    closing_manager = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    revisit_count = models.PositiveIntegerField(default=0)
+    last_revisit_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField(help_text="Customer.created_at")
+    updated_at = models.DateTimeField(help_text="Customer.updated_at")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'lead_summaries'
+        ordering = ['-created_at']
+        indexes = [
+            # One per dashboard filter, each ending in the dashboards' sort order
+            models.Index(fields=['-created_at'], name='lead_summary_created_idx'),
+            models.Index(fields=['form_number'], name='lead_summary_form_idx'),
+            models.Index(fields=['sourcing_manager', '-created_at'], name='lead_summary_sourcing_idx'),
+            models.Index(fields=['closing_manager', '-created_at'], name='lead_summary_closing_idx'),
+            models.Index(fields=['has_assessment', '-created_at'], name='lead_summary_assessed_idx'),
+            models.Index(fields=['has_booking', '-created_at'], name='lead_summary_booked_idx'),
+            # The stale-draft exclusion
+            models.Index(fields=['updated_at'], condition=models.Q(is_complete=False),
+                         name='lead_summary_incomplete_idx'),
+        ]
+        verbose_name = 'Lead Summary'
+        verbose_name_plural = 'Lead Summaries'
+
+    def __str__(self):
+        return f"{self.full_name} - {self.form_number} (summary)"
+
+
+class LeadSummaryChange(models.Model):
+    """
+    Outbox of customers whose LeadSummary is out of date. signals.py adds a
+    row in the same transaction as the change, so a rolled-back edit leaves
+    nothing behind; lead_summary.sync() applies and deletes them.
+    """
+    customer_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'lead_summary_changes'
+        verbose_name = 'Lead Summary Change'
+        verbose_name_plural = 'Lead Summary Changes'
+
+    def __str__(self):
+        return f"Customer {self.customer_id} changed {self.created_at:%d %b %Y %H:%M}"
+
+
+class PartnerAttribution(models.Model):
+    """
+    One row per channel partner named on a lead — at enquiry, as an additional
+    CP, or on the booking form — with the partner's mobile and RERA number
+    normalised and resolved to a ChannelPartnerMaster (null when the partner
+    isn't in the directory). Maintained by customer_enquiry/attribution.py.
+    """
+    KIND_CHOICES = [
+        ('enquiry', 'Enquiry'),
+        ('additional', 'Additional CP'),
+        ('booking', 'Booking Form'),
+    ]
+    MATCH_CHOICES = [
+        ('rera', 'RERA Number'),
+        ('mobile', 'Mobile Number'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    source_id = models.BigIntegerField(help_text="pk of the ChannelPartner / AdditionalChannelPartner / BookingChannelPartner row")
+    customer_id = models.BigIntegerField()
+    mobile = models.CharField(max_length=10, blank=True, help_text="Last 10 digits")
+    rera = models.CharField(max_length=50, blank=True, help_text="Upper-case, letters and digits only")
+    partner = models.ForeignKey(
+        ChannelPartnerMaster,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attributions'
+    )
+    matched_by = models.CharField(max_length=10, choices=MATCH_CHOICES, blank=True)
+
+    class Meta:
+        db_table = 'partner_attributions'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'source_id'], name='partner_attr_source_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['partner', 'kind'], name='partner_attr_partner_idx'),
+            models.Index(fields=['customer_id'], name='partner_attr_customer_idx'),
+            models.Index(fields=['mobile'], name='partner_attr_mobile_idx'),
+            models.Index(fields=['rera'], name='partner_attr_rera_idx'),
+        ]
+        verbose_name = 'Partner Attribution'
+        verbose_name_plural = 'Partner Attributions'
+
+    def __str__(self):
+        return f"{self.get_kind_display()} CP of customer {self.customer_id} -> {self.partner_id or 'unmatched'}"
+
+
+class PartnerStats(models.Model):
+    """
+    Per-partner lead counters for the leaderboard, recomputed from
+    PartnerAttribution whenever one of the partner's leads changes.
+    """
+    partner = models.OneToOneField(
+        ChannelPartnerMaster,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    enquiries = models.PositiveIntegerField(default=0, help_text="Leads that named the partner at enquiry")
+    assessed = models.PositiveIntegerField(default=0, help_text="Of those, leads with a sales assessment")
+    booked = models.PositiveIntegerField(default=0, help_text="Of those, leads with a booking")
+    additional_claims = models.PositiveIntegerField(default=0, help_text="Leads the partner was added to as an additional CP")
+    booking_forms = models.PositiveIntegerField(default=0, help_text="Booking forms naming the partner")
+    last_enquiry_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'partner_stats'
+        indexes = [
+            models.Index(fields=['-enquiries'], name='partner_stats_enquiries_idx'),
+            models.Index(fields=['-booked'], name='partner_stats_booked_idx'),
+        ]
+        verbose_name = 'Partner Stats'
+        verbose_name_plural = 'Partner Stats'
+
+    def __str__(self):
+        return f"{self.partner}: {self.enquiries} leads, {self.booked} booked"
+
+    @property
+    def conversion(self):
+        return self.booked / self.enquiries if self.enquiries else None
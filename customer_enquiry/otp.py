@@ -0,0 +1,93 @@
+"""
+WhatsApp OTP store.
+
+Codes live in the OTPCode table, one row per (purpose, identifier). Only an
+HMAC of each code is stored, keyed with SECRET_KEY. Rows expire after
+settings.OTP_TTL seconds; expires_at is indexed, and `manage.py purge_otps`
+deletes expired rows. Each verification spends one attempt before the code is
+compared, so parallel guesses can't get past settings.OTP_MAX_ATTEMPTS.
+
+    code = issue('enquiry', phone_number)     # send `code`, never store it
+    result = verify('enquiry', phone_number, entered)
+    if result == VERIFIED: ...
+"""
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OTPCode
+
+VERIFIED = 'verified'
+INVALID = 'invalid'      # wrong code, attempts left
+EXPIRED = 'expired'
+LOCKED = 'locked'        # attempt limit reached
+MISSING = 'missing'      # nothing issued (or already used)
+
+
+def hash_code(purpose, identifier, code):
+    message = f'{purpose}:{identifier}:{code}'.encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def issue(purpose, identifier):
+    """Create (or replace) the code for `identifier` and return it in plain text."""
+    code = f'{secrets.randbelow(900000) + 100000}'
+    OTPCode.objects.update_or_create(
+        purpose=purpose, identifier=identifier,
+        defaults={
+            'code_hash': hash_code(purpose, identifier, code),
+            'attempts': 0,
+            'expires_at': timezone.now() + timedelta(seconds=settings.OTP_TTL),
+        },
+    )
+    return code
+
+
+def verify(purpose, identifier, code):
+    """Check `code` and return VERIFIED, INVALID, EXPIRED, LOCKED or MISSING. A verified code is used up."""
+    now = timezone.now()
+    codes = OTPCode.objects.filter(purpose=purpose, identifier=identifier)
+
+    # Spend an attempt first — the guard makes it atomic, so concurrent guesses can't exceed the limit
+    spent = codes.filter(expires_at__gt=now, attempts__lt=settings.OTP_MAX_ATTEMPTS).update(
+        attempts=F('attempts') + 1
+    )
+    otp_code = codes.only('code_hash', 'attempts', 'expires_at').first()
+    if otp_code is None:
+        return MISSING
+    if not spent:
+        return EXPIRED if otp_code.expires_at <= now else LOCKED
+
+    if not hmac.compare_digest(otp_code.code_hash, hash_code(purpose, identifier, str(code).strip())):
+        return INVALID
+
+    # Single use: only one of two simultaneous correct submissions gets to delete it
+    deleted, _ = codes.filter(code_hash=otp_code.code_hash).delete()
+    return VERIFIED if deleted else MISSING
+
+
+def discard(purpose, identifier):
+    OTPCode.objects.filter(purpose=purpose, identifier=identifier).delete()
+
+
+def purge_expired(batch_size=1000):
+    """Delete expired codes batch by batch; returns how many were removed."""
+    expired = OTPCode.objects.filter(expires_at__lte=timezone.now())
+    deleted = 0
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += OTPCode.objects.filter(id__in=ids).delete()[0]
+
+
+# For async_views: one thread hop per call instead of one per query
+aissue = sync_to_async(issue)
+averify = sync_to_async(verify)
+adiscard = sync_to_async(discard)
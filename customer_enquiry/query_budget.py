@@ -0,0 +1,137 @@
+"""
+Per-view query budgets and N+1 detection.
+
+Decorate a view with ``@query_budget(15)`` to declare the most queries it may
+run for one request. ``settings.QUERY_BUDGETS`` can override the number per
+view name without touching code. While a budgeted view runs, every query is
+recorded and normalised to its "shape" (literals and parameters stripped) so a
+loop that fires the same query per row shows up as one shape repeated N times.
+
+Behaviour is controlled from settings:
+
+    QUERY_BUDGET_ENABLED           turn recording on (development and tests)
+    QUERY_BUDGET_RAISE             raise QueryBudgetExceeded instead of logging
+    QUERY_BUDGET_REPEAT_THRESHOLD  repeats of one shape that count as N+1
+    QUERY_BUDGETS                  {'view_name': max_queries} overrides
+
+Bounded housekeeping a view does before its own work (e.g. applying the
+lead-summary outbox) runs inside ``unbudgeted()`` and isn't counted.
+"""
+import contextlib
+import functools
+import logging
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"IN \(\?(?:, \?)*\)")
+
+# The recorder of the budgeted view running on this thread, if any
+_active = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    """A budgeted view ran more queries than allowed, or repeated one query shape too often."""
+
+
+def query_shape(sql):
+    """Normalise SQL so the same query with different parameters compares equal."""
+    shape = sql.replace('%s', '?')
+    shape = _STRING_LITERAL_RE.sub('?', shape)
+    shape = _NUMBER_LITERAL_RE.sub('?', shape)
+    return _IN_LIST_RE.sub('IN (...)', shape)
+
+
+class QueryRecorder:
+    """
+    ``connection.execute_wrapper`` hook that counts queries and their shapes.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.shapes = Counter()
+        self.paused = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if not self.paused:
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    def repeated(self, threshold):
+        """Return [(shape, times)] for shapes executed at least `threshold` times."""
+        return [(shape, times) for shape, times in self.shapes.most_common() if times >= threshold]
+
+
+def check_budget(view_name, budget, recorder):
+    """Log or raise if the recorded queries break the budget or look like an N+1."""
+    problems = []
+    if budget is not None and recorder.count > budget:
+        problems.append(f"{recorder.count} queries (budget {budget})")
+
+    threshold = getattr(settings, 'QUERY_BUDGET_REPEAT_THRESHOLD', 10)
+    for shape, times in recorder.repeated(threshold):
+        problems.append(f"possible N+1 — {times}x {shape[:200]}")
+
+    if not problems:
+        return
+
+    message = f"Query budget for '{view_name}': " + '; '.join(problems)
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextlib.contextmanager
+def unbudgeted():
+    """Don't count the queries run inside this block against the current view's budget."""
+    recorder = getattr(_active, 'recorder', None)
+    if recorder is None or recorder.paused:
+        yield
+        return
+    recorder.paused = True
+    try:
+        yield
+    finally:
+        recorder.paused = False
+
+
+def query_budget(max_queries, name=None):
+    """
+    Decorator: record the queries a view runs and enforce a per-request budget.
+
+    `name` defaults to the view function's name and is the key looked up in
+    ``settings.QUERY_BUDGETS``. Does nothing unless QUERY_BUDGET_ENABLED is set.
+    """
+    def decorator(view_func):
+        view_name = name or view_func.__name__
+
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'QUERY_BUDGET_ENABLED', False):
+                return view_func(request, *args, **kwargs)
+
+            budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name, max_queries)
+            recorder = QueryRecorder()
+            outer, _active.recorder = getattr(_active, 'recorder', None), recorder
+            try:
+                with connection.execute_wrapper(recorder):
+                    response = view_func(request, *args, **kwargs)
+                    # TemplateResponse renders lazily — count its template queries too
+                    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+                        response.render()
+            finally:
+                _active.recorder = outer
+
+            response['X-Query-Count'] = str(recorder.count)
+            check_budget(view_name, budget, recorder)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,39 @@
+"""
+Fixed-window counters for the OTP and password-reset rate limits.
+
+hit() counts one event with cache.add() + cache.incr(). The shared SQLite
+cache does each of those in one statement, so two workers counting at the
+same moment can't both write `count + 1` and lose an event. The window
+starts at the first event and lasts `window` seconds.
+"""
+from django.core.cache import cache
+
+
+def count(key):
+    return cache.get(key, 0)
+
+
+def hit(key, window):
+    """Record one event under `key` and return the new count."""
+    if cache.add(key, 1, window):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr() — this event opens a new window
+        cache.set(key, 1, window)
+        return 1
+
+
+async def acount(key):
+    return await cache.aget(key, 0)
+
+
+async def ahit(key, window):
+    if await cache.aadd(key, 1, window):
+        return 1
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        await cache.aset(key, 1, window)
+        return 1
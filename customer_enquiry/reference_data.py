@@ -0,0 +1,141 @@
+"""
+Reference data: the project registry, channel partner directory and staff
+directory. Almost every page needs one of them and they change only when an
+admin edits something.
+
+Reads come from the memory-mapped snapshot every worker shares (snapshot.py).
+Without an up-to-date snapshot they fall back to 'ref:' keys that the
+TieredCache keeps in each worker's memory (see settings.CACHES), rebuilt by
+one worker at a time when they expire (singleflight.py).
+
+When the underlying rows change, signals.py calls invalidate(namespace). That
+clears the keys here and, through the generation counters in invalidation.py,
+in every other worker's local tier, then republishes the snapshot.
+"""
+import json
+
+from django.contrib.auth.models import User
+
+from . import invalidation, singleflight, snapshot
+from .models import ChannelPartnerMaster, Project, UserProfile
+
+PROJECTS_KEY = 'ref:projects'
+PARTNERS_KEY = 'ref:partners'
+STAFF_KEY = 'ref:staff:{role}'
+
+REFERENCE_TIMEOUT = 3600
+
+PROJECT_FIELDS = (
+    'id', 'project_name', 'site_name', 'address', 'maharera_no', 'company_name',
+    'project_prefix', 'form_number', 'project_logo', 'project_qr_code', 'is_active',
+)
+PARTNER_FIELDS = ('id', 'company_name', 'partner_name', 'mobile_number', 'rera_number')
+STAFF_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+
+# Loaders — one query each, shared by the cache fallback and snapshot.build()
+
+def load_projects():
+    return list(Project.objects.active_projects().values(*PROJECT_FIELDS))
+
+
+def load_partners():
+    return list(ChannelPartnerMaster.objects.filter(is_active=True).values(*PARTNER_FIELDS))
+
+
+def load_staff():
+    """Map of role -> users with that role, ordered by first name, for every role."""
+    staff = {role: [] for role, _ in UserProfile.ROLE_CHOICES}
+    users = User.objects.filter(profile__role__in=staff).order_by('first_name').values(*STAFF_FIELDS, 'profile__role')
+    for user in users:
+        staff[user.pop('profile__role')].append(user)
+    return staff
+
+
+def _project_objects():
+    return list(Project.objects.active_projects())
+
+
+def active_projects():
+    """Active Project objects, ordered by name (a list, not a queryset)."""
+    snap = snapshot.read('projects')
+    if snap is not None:
+        return [Project(**fields) for fields in snap.load('projects')]
+    return singleflight.get_or_set(PROJECTS_KEY, _project_objects, REFERENCE_TIMEOUT)
+
+
+def project_by_form_number(form_number):
+    """The active Project with this exact form number, or None."""
+    snap = snapshot.read('projects')
+    if snap is not None:
+        record = snap.record('projects', form_number)
+        return Project(**json.loads(record)) if record else None
+    for project in active_projects():
+        if project.form_number == form_number:
+            return project
+    return None
+
+
+def active_project_names():
+    """
+    Map of upper-cased project prefix -> project name for all active projects.
+    Pass it to get_project_name_from_form_number() inside loops to avoid a query per row.
+    """
+    project_names = {}
+    for project in active_projects():
+        project_names.setdefault(project.project_prefix.upper(), project.project_name)
+    return project_names
+
+
+def partner_directory():
+    """Active master channel partners as dicts, for the auto-fill dropdowns."""
+    snap = snapshot.read('partners')
+    if snap is not None:
+        return snap.load('partners')
+    return singleflight.get_or_set(PARTNERS_KEY, load_partners, REFERENCE_TIMEOUT)
+
+
+def partner_directory_json():
+    """partner_directory() as a JSON string for embedding in a page — straight from the snapshot when possible."""
+    snap = snapshot.read('partners')
+    if snap is not None:
+        return snap.text('partners')
+    return json.dumps(partner_directory())
+
+
+def _staff_for(role):
+    return lambda: list(User.objects.filter(profile__role=role).order_by('first_name'))
+
+
+def staff_directory(role):
+    """Users with the given UserProfile role, ordered by first name."""
+    snap = snapshot.read('staff')
+    if snap is not None:
+        return [User(**fields) for fields in snap.load('staff').get(role, [])]
+    return singleflight.get_or_set(STAFF_KEY.format(role=role), _staff_for(role), REFERENCE_TIMEOUT)
+
+
+def warm():
+    """Rebuild every cached reference key now (see the warm_caches command). Returns the keys."""
+    loaders = {
+        PROJECTS_KEY: _project_objects,
+        PARTNERS_KEY: load_partners,
+    }
+    for role, _ in UserProfile.ROLE_CHOICES:
+        loaders[STAFF_KEY.format(role=role)] = _staff_for(role)
+    for key, load in loaders.items():
+        singleflight.refresh(key, load, REFERENCE_TIMEOUT)
+    return list(loaders)
+
+
+# Invalidation namespace -> every key cached for it
+NAMESPACE_KEYS = {
+    'projects': [PROJECTS_KEY],
+    'partners': [PARTNERS_KEY],
+    'staff': [STAFF_KEY.format(role=role) for role, _ in UserProfile.ROLE_CHOICES],
+}
+
+
+def invalidate(namespace):
+    invalidation.invalidate(namespace, NAMESPACE_KEYS[namespace])
+    snapshot.schedule_publish()
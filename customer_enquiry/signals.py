@@ -0,0 +1,72 @@
+"""
+Signal handlers, connected in CustomerEnquiryConfig.ready().
+"""
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import attribution, lead_summary, reference_data, versioning
+from .models import (
+    AdditionalChannelPartner, BookingApplication, BookingChannelPartner, ChannelPartner,
+    ChannelPartnerMaster, Customer, CustomerAssignment, CustomerRevisit, CustomerSource,
+    InternalSalesAssessment, Project, UserProfile,
+)
+
+
+def data_changed(sender, **kwargs):
+    versioning.bump()
+
+
+for model in versioning.VERSIONED_MODELS:
+    post_save.connect(data_changed, sender=model, dispatch_uid=f'data_changed:{model._meta.label}')
+    post_delete.connect(data_changed, sender=model, dispatch_uid=f'data_changed:{model._meta.label}')
+
+
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, **kwargs):
+    reference_data.invalidate('projects')
+    transaction.on_commit(lead_summary.refresh_project_names)
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, **kwargs):
+    lead_summary.mark_changed(instance.pk)
+
+
+# The other tables a LeadSummary row or a partner attribution is built from
+@receiver([post_save, post_delete], sender=CustomerSource)
+@receiver([post_save, post_delete], sender=ChannelPartner)
+@receiver([post_save, post_delete], sender=InternalSalesAssessment)
+@receiver([post_save, post_delete], sender=BookingApplication)
+@receiver([post_save, post_delete], sender=AdditionalChannelPartner)
+@receiver([post_save, post_delete], sender=CustomerAssignment)
+@receiver([post_save, post_delete], sender=CustomerRevisit)
+def lead_detail_changed(sender, instance, **kwargs):
+    lead_summary.mark_changed(instance.customer_id)
+
+
+@receiver([post_save, post_delete], sender=BookingChannelPartner)
+def booking_partner_changed(sender, instance, **kwargs):
+    customer_id = BookingApplication.objects.filter(
+        pk=instance.booking_application_id).values_list('customer_id', flat=True).first()
+    lead_summary.mark_changed(customer_id)
+
+
+@receiver([post_save, post_delete], sender=ChannelPartnerMaster)
+def partner_changed(sender, instance, **kwargs):
+    reference_data.invalidate('partners')
+    # Bound now: a deleted instance has lost its pk by the time the transaction commits
+    transaction.on_commit(partial(attribution.partner_changed,
+                                  instance.pk, instance.mobile_number, instance.rera_number))
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=User)
+def staff_changed(sender, **kwargs):
+    # Every login saves User.last_login — that doesn't touch the directory
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    reference_data.invalidate('staff')
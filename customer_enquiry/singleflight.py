@@ -0,0 +1,107 @@
+"""
+Single-flight recomputation with stale-while-revalidate.
+
+cache.get_or_set() lets every request that misses run the query itself, so
+when a popular key expires (or the cache is empty after a deploy) all the
+workers rebuild it at once and pile onto SQLite. get_or_set() here lets only
+one of them recompute:
+
+- Values are stored with a soft expiry inside the cached entry and a hard
+  expiry `stale_timeout` seconds later.
+- Fresh: returned as is.
+- Past the soft expiry: the caller that wins a short lock (cache.add on
+  'lock:<key>') recomputes; everyone else keeps getting the stale value.
+- Missing: the lock winner computes; the others poll for up to `wait`
+  seconds for its result, then compute it themselves rather than fail.
+"""
+import time
+import uuid
+
+from django.core.cache import cache
+
+LOCK_KEY = 'lock:{key}'
+LOCK_TIMEOUT = 30        # seconds before a crashed holder's lock lapses
+POLL_INTERVAL = 0.05
+
+
+def _entry(cached):
+    """
+    `cached` if it is a (fresh_until, value) entry stored by this module, else
+    None — values cached by plain cache.set() aren't wrapped and count as missing.
+    """
+    if isinstance(cached, tuple) and len(cached) == 2:
+        return cached
+    return None
+
+
+def _store(key, value, timeout, stale_timeout):
+    cache.set(key, (time.time() + timeout, value), timeout + stale_timeout)
+
+
+def refresh(key, compute, timeout, stale_timeout=300):
+    """Recompute and store `key` unconditionally (cache warm-up)."""
+    value = compute()
+    _store(key, value, timeout, stale_timeout)
+    return value
+
+
+def _recompute(key, compute, timeout, stale_timeout):
+    """Compute under the lock if we can get it. Returns (acquired, value)."""
+    lock_key = LOCK_KEY.format(key=key)
+    token = uuid.uuid4().hex
+    if not cache.add(lock_key, token, LOCK_TIMEOUT):
+        return False, None
+    try:
+        value = compute()
+        _store(key, value, timeout, stale_timeout)
+        return True, value
+    finally:
+        # Don't release a lock that lapsed and was taken by someone else
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def _refreshed_elsewhere(key):
+    """
+    A fresh entry from the shared tier when our local copy is the stale one —
+    another worker may already have recomputed it.
+    """
+    invalidate_local = getattr(cache, 'invalidate_local', None)
+    if invalidate_local is None:
+        return None
+    entry = _entry(cache.shared.get(key))
+    if entry is None or entry[0] <= time.time():
+        return None
+    invalidate_local(key)
+    return entry
+
+
+def get_or_set(key, compute, timeout, stale_timeout=300, wait=2.0):
+    """
+    Cached value of `key`, recomputed by calling `compute()` in at most one
+    worker at a time. `timeout` is how long a value stays fresh; it is then
+    served stale for up to `stale_timeout` more seconds while it is rebuilt.
+    """
+    entry = _entry(cache.get(key))
+    if entry is not None:
+        fresh_until, value = entry
+        if fresh_until > time.time():
+            return value
+        newer = _refreshed_elsewhere(key)
+        if newer is not None:
+            return newer[1]
+        acquired, new_value = _recompute(key, compute, timeout, stale_timeout)
+        return new_value if acquired else value
+
+    acquired, value = _recompute(key, compute, timeout, stale_timeout)
+    if acquired:
+        return value
+
+    # Someone else is computing it — wait for their result
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = _entry(cache.get(key))
+        if entry is not None:
+            return entry[1]
+    return compute()
@@ -0,0 +1,233 @@
+"""
+Memory-mapped snapshot of the reference data (projects, channel partners,
+staff directory) shared by every worker on the host.
+
+publish() writes the whole set to one file at settings.REFERENCE_SNAPSHOT_PATH:
+a header, a section table, then the sections. It writes a temporary file and
+os.replace()s it over the old one, so readers only ever map a complete
+snapshot. Workers map the file read-only, so its pages sit once in the OS page
+cache rather than once per worker, and a lookup decodes only the section (or
+the single record) it needs:
+
+    meta          build time and the invalidation generation of each namespace
+    projects      JSON array of active projects, in display order
+    projects.idx  fixed-width (form_number, offset, length) entries sorted by
+                  form number, each pointing at one record inside 'projects'
+    partners      JSON array of active master channel partners, ready to embed
+    staff         JSON object of role -> users
+
+current() re-maps the file once it has been replaced. read(namespace) returns
+None when there is no snapshot, or when its generation for that namespace is
+behind the one this worker last saw (see invalidation.py) — reference_data then
+falls back to the cache until the newer snapshot lands.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import invalidation
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'SPRS'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')          # magic, version, section count
+SECTION = struct.Struct('<16sII')        # name, offset, length
+INDEX_ENTRY = struct.Struct('<32sII')    # key, offset, length within the indexed section
+
+NAMESPACES = ('projects', 'partners', 'staff')
+
+# Publishes retried when an edit lands while the snapshot is being built
+MAX_PUBLISH_ATTEMPTS = 3
+
+
+def _encode(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+class Snapshot:
+    """One mapped snapshot file. Only ever hands out copies, never views of the map."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} reference snapshot')
+        self.sections = {}
+        for i in range(count):
+            name, offset, length = SECTION.unpack_from(self._map, HEADER.size + i * SECTION.size)
+            self.sections[name.rstrip(b'\0').decode()] = (offset, length)
+        self.meta = self.load('meta')
+
+    def raw(self, name):
+        offset, length = self.sections[name]
+        return self._map[offset:offset + length]
+
+    def load(self, name):
+        return json.loads(self.raw(name))
+
+    def text(self, name):
+        return self.raw(name).decode()
+
+    def record(self, name, key):
+        """Bytes of the record filed under `key` in the section's index, or None."""
+        index_offset, index_length = self.sections[f'{name}.idx']
+        offset, _ = self.sections[name]
+        target = key.encode()
+        if len(target) > INDEX_ENTRY.size - 8:
+            return None
+        target = target.ljust(INDEX_ENTRY.size - 8, b'\0')
+
+        lo, hi = 0, index_length // INDEX_ENTRY.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry_key, start, length = INDEX_ENTRY.unpack_from(self._map, index_offset + mid * INDEX_ENTRY.size)
+            if entry_key < target:
+                lo = mid + 1
+            elif entry_key > target:
+                hi = mid
+            else:
+                return self._map[offset + start:offset + start + length]
+        return None
+
+    def is_current(self, namespace):
+        seen = invalidation.seen(namespace)
+        return seen is None or seen == self.meta['generations'].get(namespace)
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def current():
+    """The mapped snapshot, re-mapped if the file was replaced; None when there is none."""
+    global _snapshot
+    path = settings.REFERENCE_SNAPSHOT_PATH
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _snapshot = None
+        return None
+
+    snapshot = _snapshot
+    if snapshot is None or snapshot.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+        with _lock:
+            try:
+                snapshot = Snapshot(path)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Could not map reference snapshot {path}: {e}")
+                return None
+            # The old map is unmapped once the last request holding it is done
+            _snapshot = snapshot
+    return snapshot
+
+
+def read(namespace):
+    """The snapshot, if it is up to date for `namespace`; otherwise None."""
+    snapshot = current()
+    if snapshot is None or not snapshot.is_current(namespace):
+        return None
+    return snapshot
+
+
+def build():
+    """
+    Snapshot bytes for the reference data as it is now, plus the generations
+    they were built at. Generations are read first, so an edit that lands
+    mid-build leaves the snapshot looking stale rather than current.
+    """
+    from . import reference_data
+
+    generations = invalidation.current(NAMESPACES)
+
+    projects = bytearray(b'[')
+    index = []
+    for i, fields in enumerate(reference_data.load_projects()):
+        record = _encode(fields)
+        if i:
+            projects += b','
+        if fields['form_number']:
+            index.append((fields['form_number'].encode(), len(projects), len(record)))
+        projects += record
+    projects += b']'
+
+    index_bytes = bytearray()
+    for key, offset, length in sorted(index):
+        if len(key) <= INDEX_ENTRY.size - 8:
+            index_bytes += INDEX_ENTRY.pack(key, offset, length)
+
+    sections = [
+        ('meta', _encode({'built_at': time.time(), 'generations': generations})),
+        ('projects', bytes(projects)),
+        ('projects.idx', bytes(index_bytes)),
+        ('partners', _encode(reference_data.load_partners())),
+        ('staff', _encode(reference_data.load_staff())),
+    ]
+
+    offset = HEADER.size + SECTION.size * len(sections)
+    table = [HEADER.pack(MAGIC, VERSION, len(sections))]
+    for name, data in sections:
+        table.append(SECTION.pack(name.encode(), offset, len(data)))
+        offset += len(data)
+    return b''.join(table + [data for _, data in sections]), generations
+
+
+def publish(path=None):
+    """
+    Build a snapshot and atomically replace the published file with it.
+    Returns the number of bytes written.
+    """
+    path = path or settings.REFERENCE_SNAPSHOT_PATH
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    for _ in range(MAX_PUBLISH_ATTEMPTS):
+        data, generations = build()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.reference-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        # A publish for an edit made while we were building may have landed
+        # before ours and been overwritten by it — if so, build again
+        if invalidation.current(NAMESPACES) == generations:
+            break
+    return len(data)
+
+
+def schedule_publish():
+    """Republish once the current transaction commits (called on every reference-data edit)."""
+    if not settings.REFERENCE_SNAPSHOT_PATH:
+        return
+
+    def _publish():
+        try:
+            publish()
+        except Exception as e:
+            # Readers notice the generation moved and use the cache until the next publish
+            logger.error(f"Reference snapshot publish failed: {e}")
+    transaction.on_commit(_publish)
@@ -1,3 +1,1074 @@
-from django.test import TestCase
-
-# Create your tests here.
+import gzip
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.cache import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    analytics, archive, async_views, attribution, exports, imports, invalidation, lead_summary, otp,
+    ratelimit, reference_data, singleflight, snapshot,
+)
+from .cache_backends import SQLiteCache, TieredCache
+from .management.commands import benchmark_endpoints
+from .models import (
+    AdditionalChannelPartner, ArchivedLead, BookingApplication, BookingChannelPartner, ChannelPartner,
+    ChannelPartnerMaster, Customer, CustomerAssignment, CustomerRevisit, CustomerSource, ExportJob,
+    InternalSalesAssessment, LeadSummary, LeadSummaryChange, OTPCode, PartnerAttribution, PartnerStats,
+    Project, UserProfile,
+)
+from .query_budget import QueryBudgetExceeded, query_budget, unbudgeted
+from .views import get_project_name_from_form_number
+
+
+# Tests get their own cache files, so they never read or clear a dev server's cache
+CACHE_DIR = tempfile.mkdtemp(prefix='customer-enquiry-tests-')
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'customer_enquiry.cache_backends.TieredCache',
+        'OPTIONS': {'SHARED': 'shared', 'LOCAL_KEY_PREFIXES': {'ref:': 300, 't:': 60}},
+    },
+    'shared': {
+        'BACKEND': 'customer_enquiry.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'shared.sqlite3'),
+        'OPTIONS': {'PURGE_INTERVAL': 0},
+    },
+    'sessions': {
+        'BACKEND': 'customer_enquiry.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'sessions.sqlite3'),
+        'OPTIONS': {'PURGE_INTERVAL': 0},
+    },
+}
+
+
+def tearDownModule():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+def make_project(prefix='ALT', name='Altavista'):
+    return Project.objects.create(project_name=name, site_name='Test Site', maharera_no='P00000000000',
+                                  company_name='Test Builders', project_prefix=prefix)
+
+
+def make_customer(form_number='ALT-10001', **fields):
+    fields.setdefault('first_name', 'Asha')
+    fields.setdefault('last_name', 'Rao')
+    fields.setdefault('email', f'{form_number.lower()}@example.com')
+    return Customer.objects.create(form_number=form_number, **fields)
+
+
+def in_thread(func):
+    """Run `func` on a new thread (so it gets its own cache instances) and return its result."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+@override_settings(CACHES=TEST_CACHES, REFERENCE_SNAPSHOT_PATH='')
+class CacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+
+# ─── Query budget ────────────────────────────────────────────────────────────
+
+@override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={})
+class QueryBudgetTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    def test_within_budget_reports_the_count(self):
+        @query_budget(2)
+        def view(request):
+            list(User.objects.all())
+            return HttpResponse()
+
+        self.assertEqual(view(self.request)['X-Query-Count'], '1')
+
+    def test_over_budget_raises(self):
+        @query_budget(1)
+        def view(request):
+            list(User.objects.all())
+            list(Project.objects.all())
+            return HttpResponse()
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, '2 queries (budget 1)'):
+            view(self.request)
+
+    def test_unbudgeted_queries_are_not_counted(self):
+        @query_budget(1)
+        def view(request):
+            list(User.objects.all())
+            with unbudgeted():
+                list(Project.objects.all())
+                list(Customer.objects.all())
+            return HttpResponse()
+
+        self.assertEqual(view(self.request)['X-Query-Count'], '1')
+
+    def test_settings_override_the_budget(self):
+        @query_budget(1, name='busy_view')
+        def view(request):
+            list(User.objects.all())
+            list(Project.objects.all())
+            return HttpResponse()
+
+        with self.settings(QUERY_BUDGETS={'busy_view': 2}):
+            self.assertEqual(view(self.request)['X-Query-Count'], '2')
+
+    @override_settings(QUERY_BUDGET_REPEAT_THRESHOLD=3)
+    def test_repeated_query_shape_is_flagged(self):
+        @query_budget(100)
+        def view(request):
+            for pk in range(3):
+                list(Customer.objects.filter(pk=pk))
+            return HttpResponse()
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1'):
+            view(self.request)
+
+
+# ─── Cache backends and invalidation ─────────────────────────────────────────
+
+class CacheBackendTests(CacheTestCase):
+    def test_threads_share_the_local_tier(self):
+        cache.set('t:greeting', 'hello')
+        before = cache.stats()['local_hits']
+        self.assertEqual(in_thread(lambda: caches['default'].get('t:greeting')), 'hello')
+        self.assertIsNot(in_thread(lambda: caches['default']), cache)
+        self.assertEqual(cache.stats()['local_hits'], before + 1)
+
+    def test_identically_configured_instances_share_a_tier(self):
+        params = {'OPTIONS': {'SHARED': 'shared', 'LOCAL_KEY_PREFIXES': {'x:': 5}}}
+        self.assertIs(TieredCache('', params)._local, TieredCache('', params)._local)
+
+    def test_prefixed_keys_are_served_from_the_local_tier(self):
+        cache.set('t:greeting', 'hello')
+        caches['shared'].delete('t:greeting')
+        before = cache.stats()['local_hits']
+        self.assertEqual(cache.get('t:greeting'), 'hello')
+        self.assertEqual(cache.stats()['local_hits'], before + 1)
+
+        cache.set('other', 'shared only')
+        caches['shared'].delete('other')
+        self.assertIsNone(cache.get('other'))
+
+    def test_local_copy_expires_after_its_ttl(self):
+        expirations = cache.stats()['expirations']
+        with mock.patch('customer_enquiry.cache_backends.time.monotonic', return_value=1000.0):
+            cache.set('t:greeting', 'hello')
+        caches['shared'].set('t:greeting', 'updated')
+        with mock.patch('customer_enquiry.cache_backends.time.monotonic', return_value=1061.0):
+            self.assertEqual(cache.get('t:greeting'), 'updated')
+        self.assertEqual(cache.stats()['expirations'], expirations + 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        tiered = TieredCache('', {'OPTIONS': {'SHARED': 'shared', 'LOCAL_MAX_ENTRIES': 2,
+                                              'LOCAL_KEY_PREFIXES': {'t:': 60}}})
+        tiered.set('t:a', 1)
+        tiered.set('t:b', 2)
+        tiered.get('t:a')
+        tiered.set('t:c', 3)
+        self.assertEqual(tiered.stats()['evictions'], 1)
+        caches['shared'].clear()
+        self.assertEqual(tiered.get_many(['t:a', 't:b', 't:c']), {'t:a': 1, 't:c': 3})
+
+    def test_saving_a_project_refreshes_the_registry(self):
+        make_project()
+        self.assertEqual(reference_data.active_project_names(), {'ALT': 'Altavista'})
+        with self.captureOnCommitCallbacks(execute=True):
+            make_project('MED', 'Medius')
+        self.assertEqual(reference_data.active_project_names(), {'ALT': 'Altavista', 'MED': 'Medius'})
+
+
+class SQLiteCacheTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shared = caches['shared']
+
+    def test_add_and_incr_are_single_statements(self):
+        self.assertTrue(self.shared.add('n', 1, 60))
+        self.assertFalse(self.shared.add('n', 5, 60))
+        self.assertEqual(self.shared.incr('n', 2), 3)
+        with self.assertRaises(ValueError):
+            self.shared.incr('missing')
+
+    def test_many_operations(self):
+        self.assertEqual(self.shared.set_many({'a': 1, 'b': [2], 'c': {'x': 3}}), [])
+        self.assertEqual(self.shared.get_many(['a', 'b', 'c', 'd']), {'a': 1, 'b': [2], 'c': {'x': 3}})
+        self.shared.delete_many(['a', 'b'])
+        self.assertEqual(self.shared.get_many(['a', 'b', 'c']), {'c': {'x': 3}})
+
+    def test_expired_rows_are_ignored_then_purged(self):
+        self.shared.set('old', 'value', 60)
+        self.shared.set('forever', 'value', None)
+        with mock.patch('customer_enquiry.cache_backends.time.time', return_value=time.time() + 61):
+            self.assertIsNone(self.shared.get('old'))
+            self.shared.purge()
+        self.assertEqual(self.shared.get_many(['old', 'forever']), {'forever': 'value'})
+
+    def test_one_purge_thread_per_file_per_process(self):
+        path = os.path.join(CACHE_DIR, 'purge.sqlite3')
+
+        def touch():
+            SQLiteCache(path, {'OPTIONS': {'PURGE_INTERVAL': 3600}}).set('k', 1)
+
+        def purge_threads():
+            return sum(thread.name == 'sqlite-cache-purge' for thread in threading.enumerate())
+
+        before = purge_threads()
+        for _ in range(5):
+            in_thread(touch)
+        self.assertEqual(purge_threads(), before + 1)
+
+    def test_rate_limit_counts_every_hit_across_threads(self):
+        def worker():
+            for _ in range(25):
+                ratelimit.hit('otp_count_phone_9800000001', 60)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(ratelimit.count('otp_count_phone_9800000001'), 100)
+
+
+class InvalidationTests(CacheTestCase):
+    def test_sync_drops_local_copies_once_the_generation_moves(self):
+        namespaces = {'projects': ['ref:projects']}
+        invalidation.sync(namespaces)
+        cache.set('ref:projects', ['stale'])
+        caches['shared'].set('ref:projects', ['fresh'])
+        self.assertEqual(invalidation.sync(namespaces), [])
+        self.assertEqual(cache.get('ref:projects'), ['stale'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidation.invalidate('projects', [])
+        self.assertEqual(invalidation.sync(namespaces), ['projects'])
+        self.assertEqual(cache.get('ref:projects'), ['fresh'])
+
+    def test_invalidation_waits_for_commit(self):
+        cache.set('ref:projects', ['old'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            invalidation.invalidate('projects', ['ref:projects'])
+            self.assertEqual(cache.get('ref:projects'), ['old'])
+        callbacks[0]()
+        self.assertIsNone(cache.get('ref:projects'))
+
+    def test_invalidation_is_seen_once_per_process(self):
+        keys = {'projects': ['ref:projects']}
+        invalidation.sync(keys)
+        cache.set('ref:projects', ['old'])
+        cache.shared.set(invalidation.generation_key('projects'), 42, None)
+
+        # Another thread syncs first; its drop of the local copy holds for this thread too
+        self.assertEqual(in_thread(lambda: invalidation.sync(keys)), ['projects'])
+        self.assertEqual(invalidation.sync(keys), [])
+        self.assertEqual(invalidation.seen('projects'), 42)
+        cache.shared.delete('ref:projects')
+        self.assertIsNone(cache.get('ref:projects'))
+
+
+class ReferenceSnapshotTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        path = os.path.join(CACHE_DIR, 'reference.snapshot')
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        override = self.settings(REFERENCE_SNAPSHOT_PATH=path)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_published_snapshot_serves_reference_data(self):
+        make_project()
+        Project.objects.update(form_number='altavista')
+        user = User.objects.create_user('closer', first_name='Cyrus')
+        UserProfile.objects.create(user=user, role='closing_manager')
+        snapshot.publish()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(reference_data.active_project_names(), {'ALT': 'Altavista'})
+            self.assertEqual(reference_data.project_by_form_number('altavista').project_name, 'Altavista')
+            self.assertIsNone(reference_data.project_by_form_number('nowhere'))
+            self.assertEqual([u.first_name for u in reference_data.staff_directory('closing_manager')],
+                             ['Cyrus'])
+
+    def test_stale_snapshot_falls_back_to_the_database(self):
+        make_project()
+        snapshot.publish()
+        invalidation.sync({'projects': []})
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.settings(REFERENCE_SNAPSHOT_PATH=''):
+                make_project('MED', 'Medius')
+        invalidation.sync({'projects': []})
+
+        self.assertIsNone(snapshot.read('projects'))
+        self.assertEqual(reference_data.active_project_names(), {'ALT': 'Altavista', 'MED': 'Medius'})
+
+
+class SingleFlightTests(CacheTestCase):
+    def test_fresh_value_is_computed_once(self):
+        compute = mock.Mock(return_value=42)
+        self.assertEqual(singleflight.get_or_set('t:answer', compute, 60), 42)
+        self.assertEqual(singleflight.get_or_set('t:answer', compute, 60), 42)
+        compute.assert_called_once()
+
+    def test_stale_value_is_served_while_another_worker_recomputes(self):
+        singleflight._store('stats', 'old', -1, 300)  # past its soft expiry
+        cache.add('lock:stats', 'another worker', 30)
+        self.assertEqual(singleflight.get_or_set('stats', lambda: 'new', 60), 'old')
+
+        cache.delete('lock:stats')
+        self.assertEqual(singleflight.get_or_set('stats', lambda: 'new', 60), 'new')
+        self.assertEqual(singleflight.get_or_set('stats', lambda: 'newer', 60), 'new')
+
+    def test_missing_value_waits_for_the_lock_holder(self):
+        cache.add('lock:stats', 'another worker', 30)
+
+        def finish_elsewhere(seconds):
+            singleflight._store('stats', 'theirs', 60, 300)
+
+        with mock.patch('customer_enquiry.singleflight.time.sleep', side_effect=finish_elsewhere):
+            self.assertEqual(singleflight.get_or_set('stats', lambda: 'ours', 60), 'theirs')
+
+    def test_unwrapped_value_counts_as_missing(self):
+        cache.set('stats', 'plain')
+        self.assertEqual(singleflight.get_or_set('stats', lambda: 'new', 60), 'new')
+
+        cache.set('stats', 'plain')
+        cache.add('lock:stats', 'another worker', 30)
+        with mock.patch('customer_enquiry.singleflight.time.sleep'):
+            self.assertEqual(singleflight.get_or_set('stats', lambda: 'ours', 60, wait=0.2), 'ours')
+
+    def test_unwrapped_shared_value_is_not_a_refresh(self):
+        cache.shared.set('t:stats', 'plain')
+        self.assertIsNone(singleflight._refreshed_elsewhere('t:stats'))
+
+
+class WarmCachesTests(CacheTestCase):
+    def test_warms_reference_keys_and_compiles_templates(self):
+        make_project()
+        out = io.StringIO()
+        call_command('warm_caches', stdout=out)
+        self.assertIn('skipped (REFERENCE_SNAPSHOT_PATH not set)', out.getvalue())
+        self.assertIn('Caches warmed', out.getvalue())
+        self.assertIsNotNone(cache.get(reference_data.PROJECTS_KEY))
+
+
+# ─── OTP ─────────────────────────────────────────────────────────────────────
+
+class InteraktOK:
+    status_code = 200
+    text = '{"result": true}'
+
+
+class AsyncOTPViewTests(CacheTestCase):
+    def post(self, view, payload, session):
+        request = AsyncRequestFactory().post('/', json.dumps(payload), content_type='application/json')
+        request.session = session
+        return view(request)
+
+    async def test_send_then_verify(self):
+        session = SessionStore()
+        with mock.patch('customer_enquiry.interakt.asend_template', return_value=InteraktOK()) as send:
+            response = await self.post(async_views.send_otp_view, {'phone_number': '9820000001'}, session)
+        self.assertTrue(json.loads(response.content)['success'])
+        otp = send.call_args.args[0]['template']['bodyValues'][0]
+
+        response = await self.post(async_views.verify_otp_view, {
+            'phone_number': '9820000001', 'otp': otp, 'property_code': 'ALT',
+        }, session)
+        self.assertTrue(json.loads(response.content)['success'])
+        self.assertTrue(session['user_authenticated'])
+        self.assertFalse(await OTPCode.objects.aexists())
+
+    async def test_failed_send_is_not_counted(self):
+        session = SessionStore()
+        failed = mock.Mock(status_code=500, text='error')
+        with mock.patch('customer_enquiry.interakt.asend_template', return_value=failed):
+            response = await self.post(async_views.send_otp_view, {'phone_number': '9820000001'}, session)
+        self.assertFalse(json.loads(response.content)['success'])
+        self.assertFalse(await OTPCode.objects.aexists())
+
+
+class OTPTests(TestCase):
+    def test_code_is_single_use_and_stored_hashed(self):
+        code = otp.issue('enquiry', '9800000001')
+        self.assertNotEqual(OTPCode.objects.get().code_hash, code)
+        self.assertEqual(otp.verify('enquiry', '9800000001', code), otp.VERIFIED)
+        self.assertEqual(otp.verify('enquiry', '9800000001', code), otp.MISSING)
+
+    @override_settings(OTP_MAX_ATTEMPTS=2)
+    def test_wrong_guesses_lock_the_code(self):
+        code = otp.issue('enquiry', '9800000001')
+        wrong = '000000' if code != '000000' else '111111'
+        self.assertEqual(otp.verify('enquiry', '9800000001', wrong), otp.INVALID)
+        self.assertEqual(otp.verify('enquiry', '9800000001', wrong), otp.INVALID)
+        self.assertEqual(otp.verify('enquiry', '9800000001', code), otp.LOCKED)
+
+    def test_expired_code(self):
+        code = otp.issue('enquiry', '9800000001')
+        OTPCode.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(otp.verify('enquiry', '9800000001', code), otp.EXPIRED)
+        self.assertEqual(otp.purge_expired(), 1)
+
+
+class PublicSessionTests(CacheTestCase):
+    def send_otp(self):
+        with mock.patch('customer_enquiry.interakt.send_template', return_value=InteraktOK()) as send:
+            response = self.client.post('/send-otp/', json.dumps({'phone_number': '9820000001'}),
+                                        content_type='application/json')
+        return response, send.call_args.args[0]['template']['bodyValues'][0]
+
+    def test_otp_flow_never_writes_django_session(self):
+        response, otp = self.send_otp()
+        self.assertTrue(response.json()['success'])
+
+        response = self.client.post('/verify-otp/', json.dumps({
+            'phone_number': '9820000001', 'otp': otp, 'property_code': 'ALT',
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertIn(settings.PUBLIC_SESSION_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+    def test_staff_keep_database_sessions(self):
+        self.client.force_login(User.objects.create_user('staff', password='pw'))
+        self.assertTrue(Session.objects.exists())
+        response, _ = self.send_otp()
+        self.assertTrue(response.json()['success'])
+        self.assertNotIn(settings.PUBLIC_SESSION_COOKIE_NAME, response.cookies)
+
+
+# ─── Enquiry form: drafts and idempotency ────────────────────────────────────
+
+STEP_ONE = {
+    'step': '1', 'property_code': 'ALT', 'first_name': 'Asha', 'last_name': 'Rao',
+    'email': 'asha@example.com', 'phone_number': '9800000001', 'sex': 'female', 'marital_status': 'single',
+    'city': 'Mumbai', 'locality': 'Tardeo', 'pincode': '400034', 'nationality': 'indian',
+}
+SUBMIT = dict(
+    STEP_ONE, employment_type='salaried', configuration='2bhk', budget='2cr_to_4cr',
+    construction_status='under_construction', purpose_of_buying='personal_use', source='website',
+)
+AJAX = {'X-Requested-With': 'XMLHttpRequest'}
+
+
+class EnquiryFormTests(CacheTestCase):
+    def test_autosave_stays_a_draft_until_saved_then_submit_completes_it(self):
+        response = self.client.post(reverse('customer_enquiry:save_step'),
+                                    dict(STEP_ONE, draft_token='', promote='0')).json()
+        token = response['draft_token']
+        self.assertFalse(Customer.objects.exists())
+
+        saved = self.client.post(reverse('customer_enquiry:save_step'),
+                                 dict(STEP_ONE, step='2', draft_token=token, promote='1')).json()
+        customer = Customer.objects.get()
+        self.assertEqual(saved['customer_id'], customer.id)
+        self.assertFalse(customer.is_complete)
+        self.assertEqual(customer.current_step, 2)
+
+        submitted = self.client.post(reverse('customer_enquiry:submit'), dict(SUBMIT, draft_token=token),
+                                     headers=AJAX).json()
+        self.assertTrue(submitted['success'], submitted)
+        customer = Customer.objects.get()
+        self.assertEqual(submitted['customer_id'], customer.id)
+        self.assertTrue(customer.is_complete)
+        self.assertEqual(customer.current_step, 4)
+
+    def test_repeated_submit_is_replayed_not_duplicated(self):
+        headers = dict(AJAX, **{'Idempotency-Key': 'submit-1'})
+        first = self.client.post(reverse('customer_enquiry:submit'), SUBMIT, headers=headers)
+        again = self.client.post(reverse('customer_enquiry:submit'), SUBMIT, headers=headers)
+        self.assertEqual(Customer.objects.count(), 1)
+        self.assertEqual(again['Idempotent-Replayed'], 'true')
+        self.assertEqual(again.content, first.content)
+
+    def test_idempotency_key_reused_for_another_payload(self):
+        headers = dict(AJAX, **{'Idempotency-Key': 'save-1'})
+        self.client.post(reverse('customer_enquiry:save_step'), dict(STEP_ONE, promote='1'), headers=headers)
+        response = self.client.post(reverse('customer_enquiry:save_step'),
+                                    dict(STEP_ONE, first_name='Ravi', promote='1'), headers=headers)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_only_customers_this_session_saved_are_adopted(self):
+        other = make_customer('ALT-20001', is_complete=False)
+        submitted = self.client.post(reverse('customer_enquiry:submit'),
+                                     dict(SUBMIT, draft_token='', customer_id=str(other.id)), headers=AJAX).json()
+        self.assertNotEqual(submitted['customer_id'], other.id)
+        other.refresh_from_db()
+        self.assertFalse(other.is_complete)
+
+    def test_legacy_page_updates_the_row_it_saved(self):
+        saved = self.client.post(reverse('customer_enquiry:save_step'), STEP_ONE).json()
+        again = self.client.post(reverse('customer_enquiry:save_step'),
+                                 dict(STEP_ONE, step='2', customer_id=str(saved['customer_id']))).json()
+        self.assertEqual(again['customer_id'], saved['customer_id'])
+
+        submitted = self.client.post(reverse('customer_enquiry:submit'),
+                                     dict(SUBMIT, customer_id=str(saved['customer_id'])), headers=AJAX).json()
+        self.assertEqual(submitted['customer_id'], saved['customer_id'])
+        self.assertTrue(Customer.objects.get().is_complete)
+
+    @override_settings(LEGACY_CUSTOMER_ID_UNTIL='2000-01-01')
+    def test_legacy_path_expires(self):
+        response = self.client.post(reverse('customer_enquiry:save_step'), STEP_ONE).json()
+        self.assertNotIn('customer_id', response)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_non_integer_customer_id_is_rejected(self):
+        for url in ('customer_enquiry:save_step', 'customer_enquiry:submit'):
+            response = self.client.post(reverse(url), dict(SUBMIT, draft_token='', customer_id='1 OR 1=1'),
+                                        headers=AJAX)
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Customer.objects.exists())
+
+
+# ─── Retention ───────────────────────────────────────────────────────────────
+
+class PurgeStaleDraftsTests(TestCase):
+    def test_only_untouched_unclaimed_drafts_are_purged_and_archived(self):
+        long_ago = timezone.now() - timedelta(days=60)
+        stale = make_customer('ALT-10001')
+        CustomerSource.objects.create(customer=stale, source_type='website')
+        assigned = make_customer('ALT-10002')
+        CustomerAssignment.objects.create(customer=assigned)
+        complete = make_customer('ALT-10003', is_complete=True)
+        recent = make_customer('ALT-10004')
+        Customer.objects.exclude(pk=recent.pk).update(updated_at=long_ago)
+
+        archive = os.path.join(CACHE_DIR, 'drafts.jsonl')
+        self.addCleanup(os.remove, archive)
+        call_command('purge_stale_drafts', days=30, archive=archive, stdout=io.StringIO())
+        self.assertEqual(set(Customer.objects.values_list('pk', flat=True)), {assigned.pk, complete.pk, recent.pk})
+
+        call_command('loaddata', archive, verbosity=0)
+        self.assertEqual(Customer.objects.get(pk=stale.pk).sources.get().source_type, 'website')
+
+
+class ArchiveTests(TestCase):
+    def make_lead(self, form_number, classification, days_idle):
+        customer = make_customer(form_number)
+        CustomerSource.objects.create(customer=customer, source_type='website')
+        InternalSalesAssessment.objects.create(customer=customer, lead_classification=classification)
+        idle_since = timezone.now() - timedelta(days=days_idle)
+        Customer.objects.filter(pk=customer.pk).update(updated_at=idle_since)
+        InternalSalesAssessment.objects.filter(customer=customer).update(updated_at=idle_since)
+        return customer
+
+    def test_idle_lost_leads_are_archived_and_restored_on_touch(self):
+        lost = self.make_lead('ALT-10001', 'lost', 200)
+        self.make_lead('ALT-10002', 'lost', 10)
+        self.make_lead('ALT-10003', 'warm', 200)
+
+        call_command('archive_leads', stdout=io.StringIO())
+        self.assertEqual(list(ArchivedLead.objects.values_list('customer_id', flat=True)), [lost.pk])
+        self.assertFalse(Customer.objects.filter(pk=lost.pk).exists())
+        self.assertTrue(archive.form_number_in_use('ALT-10001'))
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        restored = archive.get_customer_or_404(request, lost.pk)
+        self.assertEqual(restored.form_number, 'ALT-10001')
+        self.assertEqual(restored.sales_assessment.lead_classification, 'lost')
+        self.assertEqual(restored.sources.get().source_type, 'website')
+        self.assertFalse(ArchivedLead.objects.exists())
+        self.assertEqual(archive.archivable().count(), 0)
+
+
+# ─── Migrations ──────────────────────────────────────────────────────────────
+
+class LegacyCompleteMigrationTests(TransactionTestCase):
+    """0023 marks pre-multi-step submissions complete but leaves drafts alone."""
+    before = [('customer_enquiry', '0022_exportwatermark')]
+    after = [('customer_enquiry', '0023_mark_legacy_customers_complete')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_only_submitted_rows_are_marked_complete(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        Customer = apps.get_model('customer_enquiry', 'Customer')
+        CustomerSource = apps.get_model('customer_enquiry', 'CustomerSource')
+
+        draft = Customer.objects.create(form_number='ALT-10001', first_name='Draft', email='d@example.com')
+        submitted = Customer.objects.create(form_number='ALT-10002', first_name='Lead', email='l@example.com')
+        CustomerSource.objects.create(customer=submitted, source_type='website')
+        legacy = Customer.objects.create(form_number='ALT-10003', first_name='Old', email='o@example.com')
+        Customer.objects.filter(pk=legacy.pk).update(created_at=timezone.now() - timedelta(days=3650))
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+        complete = dict(Customer.objects.values_list('pk', 'is_complete'))
+        self.assertEqual(complete, {draft.pk: False, submitted.pk: True, legacy.pk: True})
+
+
+# ─── Synthetic data ──────────────────────────────────────────────────────────
+
+class SeedLeadsTests(TestCase):
+    def seed(self, **options):
+        call_command('seed_leads', stdout=io.StringIO(), anchor_date='2025-06-30', **options)
+
+    def test_seeds_complete_leads_with_related_rows(self):
+        make_project()
+        self.seed(count=120, batch_size=50)
+
+        self.assertEqual(Customer.objects.count(), 120)
+        self.assertEqual(CustomerSource.objects.count(), 120)
+        self.assertTrue(ChannelPartner.objects.exists())
+        self.assertTrue(all(n.startswith('ALT-1') for n in Customer.objects.values_list('form_number', flat=True)))
+
+    def test_same_seed_same_leads(self):
+        make_project()
+        self.seed(count=20)
+        first = list(Customer.objects.order_by('form_number').values_list('first_name', 'phone_number'))
+        Customer.objects.all().delete()
+        self.seed(count=20)
+        self.assertEqual(list(Customer.objects.order_by('form_number').values_list('first_name', 'phone_number')),
+                         first)
+
+    def test_refuses_to_reuse_a_form_number_range(self):
+        make_project()
+        self.seed(count=5)
+        with self.assertRaisesMessage(CommandError, '--start'):
+            self.seed(count=5)
+        self.seed(count=5, start=2000000)
+        self.assertEqual(Customer.objects.count(), 10)
+
+    def test_compound_prefix_project_names(self):
+        make_project('ALT-PH1', 'Altavista Phase 1')
+        self.seed(count=300)
+
+        self.assertTrue(BookingApplication.objects.exists())
+        self.assertEqual(set(BookingApplication.objects.values_list('project_name', flat=True)),
+                         {'Altavista Phase 1'})
+
+    def test_project_name_lookup(self):
+        make_project('ALT-PH1', 'Altavista Phase 1')
+        make_project()
+        self.assertEqual(get_project_name_from_form_number('ALT-PH1-1000001'), 'Altavista Phase 1')
+        self.assertEqual(get_project_name_from_form_number('ALT-1000001'), 'Altavista')
+
+
+class BenchmarkEndpointsTests(SimpleTestCase):
+    def test_percentile_is_nearest_rank(self):
+        samples = [15, 20, 35, 40, 50]
+        self.assertEqual(benchmark_endpoints.percentile(samples, 50), 35)
+        self.assertEqual(benchmark_endpoints.percentile(samples, 95), 50)
+        self.assertEqual(benchmark_endpoints.percentile(samples, 0), 15)
+        self.assertIsNone(benchmark_endpoints.percentile([], 50))
+
+    def test_unknown_endpoint_is_rejected(self):
+        with self.assertRaisesMessage(CommandError, 'homepage'):
+            call_command('benchmark_endpoints', endpoints='dashboard,homepage', stdout=io.StringIO())
+
+    def test_compare_flags_slower_p95(self):
+        def run(p95, queries):
+            return {'meta': {'commit': 'abc1234'}, 'scales': {'1000': {'dashboard': {
+                'latency_ms': {'p95': p95}, 'queries': {'mean': queries},
+            }}}}
+
+        fd, path = tempfile.mkstemp(suffix='.json')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(run(100.0, 12), fh)
+
+        command = benchmark_endpoints.Command(stdout=io.StringIO())
+        command.options = {'threshold': 10.0}
+        command.compare(path, run(105.0, 12))
+        with self.assertRaisesMessage(CommandError, 'dashboard@1000 p95'):
+            command.compare(path, run(125.0, 12))
+
+
+# ─── Lead export ─────────────────────────────────────────────────────────────
+
+class StartupImportTests(SimpleTestCase):
+    def test_workers_start_without_export_libraries(self):
+        out = io.StringIO()
+        call_command('measure_startup', runs=1, json=True, stdout=out)
+        [run] = json.loads(out.getvalue())
+        self.assertFalse(run['pandas_loaded'])
+        self.assertFalse(run['openpyxl_loaded'])
+
+
+@override_settings(EXPORT_ROOT=os.path.join(CACHE_DIR, 'exports'))
+class LeadExportTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('admin', password='pw', first_name='Admin')
+        UserProfile.objects.create(user=self.user, role='super_admin')
+        self.client.force_login(self.user)
+        make_project()
+        make_customer('ALT-10001', phone_number='9820000001')
+        make_customer('ALT-10002', first_name='Ravi', phone_number='9820000002')
+
+    def download(self, status):
+        import openpyxl
+
+        response = self.client.get(status['download_url'])
+        self.assertEqual(response.status_code, 200)
+        return openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_export_runs_in_the_background_and_is_reused(self):
+        queued = self.client.post('/export-leads/', {'property': 'ALT'})
+        self.assertEqual(queued.status_code, 202)
+        self.assertEqual(queued.json()['status'], 'queued')
+
+        call_command('run_export_jobs', once=True, stdout=io.StringIO())
+        status = self.client.get(queued.json()['status_url']).json()
+        self.assertEqual((status['status'], status['total_rows']), ('done', 2))
+        self.assertEqual(self.download(status).active.max_row, 3)
+
+        again = self.client.post('/export-leads/', {'property': 'ALT'})
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['status'], 'done')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_customer('ALT-10003', phone_number='9820000003')
+        self.assertEqual(self.client.post('/export-leads/', {'property': 'ALT'}).status_code, 202)
+
+    def test_benchmark_times_the_build_not_just_the_enqueue(self):
+        response = self.client.post('/export-leads/', {'property': 'ALT'})
+        benchmark_endpoints.Command(stdout=io.StringIO()).build_export(response)
+
+        job = ExportJob.objects.get(pk=response.json()['job_id'])
+        self.assertEqual((job.status, job.total_rows), ('done', 2))
+        self.assertFalse(os.path.exists(exports.result_path(job.result_key)))
+
+    def test_full_workbook_has_the_related_sheets(self):
+        customer = Customer.objects.get(form_number='ALT-10001')
+        InternalSalesAssessment.objects.create(customer=customer, lead_classification='warm')
+        ChannelPartner.objects.create(customer=customer, company_name='Realty Co', partner_name='Vikram',
+                                      mobile_number='9800000002', rera_number='A51800000001')
+
+        job = self.client.post('/export-leads/', {'sheets': 'all'}).json()
+        call_command('run_export_jobs', once=True, stdout=io.StringIO())
+        workbook = self.download(self.client.get(job['status_url']).json())
+
+        self.assertEqual(workbook.sheetnames, ['Leads Export', 'Assessments', 'Bookings', 'Applicants',
+                                               'Booking Partners', 'Channel Partners', 'Additional Partners'])
+        assessments = list(workbook['Assessments'].values)
+        self.assertEqual(len(assessments), 2)
+        self.assertIn('ALT-10001', assessments[1])
+        self.assertIn('Warm', assessments[1])
+        self.assertEqual(workbook['Bookings'].max_row, 1)
+
+    def export_as(self, fmt):
+        job = self.client.post('/export-leads/', {'format': fmt}).json()
+        call_command('run_export_jobs', once=True, stdout=io.StringIO())
+        response = self.client.get(self.client.get(job['status_url']).json()['download_url'])
+        return b''.join(response.streaming_content)
+
+    def test_parquet_export(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(self.export_as('parquet')))
+        self.assertEqual(sorted(table.column('form_number').to_pylist()), ['ALT-10001', 'ALT-10002'])
+
+    def test_ndjson_export(self):
+        rows = [json.loads(line) for line in gzip.decompress(self.export_as('ndjson')).splitlines()]
+        self.assertEqual(sorted(row['form_number'] for row in rows), ['ALT-10001', 'ALT-10002'])
+
+    @override_settings(EXPORT_WATERMARK_LAG=0)
+    def test_incremental_export_only_has_leads_changed_since_the_last_one(self):
+        def export_new():
+            job = self.client.post('/export-leads/', {'incremental': '1'}).json()
+            self.assertEqual(self.client.post('/export-leads/', {'incremental': '1'}).json()['job_id'],
+                             job['job_id'])
+            call_command('run_export_jobs', once=True, stdout=io.StringIO())
+            return self.client.get(job['status_url']).json()['total_rows']
+
+        self.assertEqual(export_new(), 2)
+        make_customer('ALT-10003', phone_number='9820000003')
+        self.assertEqual(export_new(), 1)
+
+    def test_jobs_are_private_to_their_owner(self):
+        job = ExportJob.objects.create(user=self.user, params='{}', result_key='x', filename='leads.xlsx')
+        self.client.force_login(User.objects.create_user('other'))
+        self.assertEqual(self.client.get(f'/export-leads/{job.id}/').status_code, 404)
+
+
+class ExportVersionTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer = make_customer()
+
+    def test_additional_partner_moves_the_version(self):
+        before = exports.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            AdditionalChannelPartner.objects.create(customer=self.customer, company_name='Realty Co',
+                                                    partner_name='Vikram', mobile_number='9800000002')
+        self.assertNotEqual(exports.data_version(), before)
+
+    def test_partner_edit_moves_the_version(self):
+        partner = ChannelPartner.objects.create(customer=self.customer, company_name='Realty Co',
+                                                partner_name='Vikram', mobile_number='9800000002',
+                                                rera_number='A51800000001')
+        before = exports.data_version()
+        partner.partner_name = 'Vikram Shah'
+        with self.captureOnCommitCallbacks(execute=True):
+            partner.save()
+        self.assertNotEqual(exports.data_version(), before)
+
+    def test_reading_the_version_costs_no_queries(self):
+        exports.data_version()
+        with self.assertNumQueries(0):
+            exports.data_version()
+
+    def test_rolled_back_edit_keeps_the_version(self):
+        before = exports.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Customer.objects.filter(pk=self.customer.pk).first().save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(exports.data_version(), before)
+
+
+# ─── Analytics ───────────────────────────────────────────────────────────────
+
+class FunnelAnalyticsTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('boss', first_name='Meera')
+        UserProfile.objects.create(user=self.user, role='super_admin')
+        self.client.force_login(self.user)
+
+    def test_counts_each_stage(self):
+        make_project()
+        for i, stage in enumerate(['enquiry', 'assessed', 'booked'], start=1):
+            customer = make_customer(f'ALT-1000{i}', is_complete=True)
+            CustomerSource.objects.create(customer=customer, source_type='website')
+            if stage != 'enquiry':
+                InternalSalesAssessment.objects.create(customer=customer, lead_classification='warm')
+            if stage == 'booked':
+                BookingApplication.objects.create(customer=customer, project_name='Altavista')
+        make_customer('ALT-10004')  # a draft is not an enquiry yet
+
+        result = self.client.get(reverse('customer_enquiry:funnel_analytics_api')).json()
+        totals = result['totals']
+        self.assertEqual((totals['enquiries'], totals['assessed'], totals['booked']), (3, 2, 1))
+        self.assertEqual(result['breakdowns']['project'][0]['key'], 'Altavista')
+        self.assertEqual(result['breakdowns']['source'][0]['enquiries'], 3)
+
+    def test_bad_date_is_a_400(self):
+        response = self.client.get(reverse('customer_enquiry:funnel_analytics_api'), {'date_from': '2024-13-45'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date_from', response.json()['error'])
+
+    def test_staff_rename_shows_in_the_cached_funnel(self):
+        customer = make_customer(is_complete=True)
+        CustomerAssignment.objects.create(customer=customer, sourcing_manager=self.user)
+
+        def sourcing_managers():
+            return [row['key'] for row in analytics.funnel({})['breakdowns']['sourcing_manager']]
+
+        self.assertEqual(sourcing_managers(), ['Meera'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = 'Meera J'
+            self.user.save()
+        self.assertEqual(sourcing_managers(), ['Meera J'])
+
+    def test_staff_roles_are_turned_away(self):
+        UserProfile.objects.filter(user=self.user).update(role='closing_manager')
+        self.assertEqual(self.client.get(reverse('customer_enquiry:funnel_analytics_api')).status_code, 403)
+
+
+class LeadSummaryTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        make_project()
+
+    def test_changes_go_through_the_outbox(self):
+        customer = make_customer(middle_name='K')
+        self.assertTrue(LeadSummaryChange.objects.filter(customer_id=customer.id).exists())
+        self.assertGreater(lead_summary.sync(), 0)
+        summary = LeadSummary.objects.get(customer=customer)
+        self.assertEqual(summary.full_name, 'Asha K Rao')
+        self.assertEqual(summary.project_name, 'Altavista')
+        self.assertFalse(LeadSummaryChange.objects.exists())
+
+    def test_rolled_back_edit_records_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            make_customer()
+            raise RuntimeError
+        self.assertFalse(LeadSummaryChange.objects.exists())
+
+    @override_settings(QUERY_BUDGET_ENABLED=True, QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={})
+    def test_dashboard_sync_is_capped_and_outside_the_budget(self):
+        user = User.objects.create_user('admin')
+        UserProfile.objects.create(user=user, role='super_admin')
+        self.client.force_login(user)
+        for number in range(lead_summary.REQUEST_SYNC_BATCH + 20):
+            make_customer(f'ALT-{20000 + number}')
+
+        response = self.client.get(reverse('customer_enquiry:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(LeadSummaryChange.objects.count(), 20)
+
+    def test_rebuild_matches_the_live_rows(self):
+        for number in range(5):
+            make_customer(f'ALT-{20000 + number}', is_complete=True)
+        call_command('rebuild_lead_summary', stdout=io.StringIO())
+        self.assertEqual(LeadSummary.objects.count(), 5)
+        self.assertEqual(set(LeadSummary.objects.values_list('project_name', flat=True)), {'Altavista'})
+
+    def test_backfill_migration_matches_the_live_summaries(self):
+        migration = importlib.import_module('customer_enquiry.migrations.0028_backfill_lead_summaries')
+        closer = User.objects.create_user('closer')
+        first = make_customer(middle_name='K', is_complete=True)
+        CustomerSource.objects.create(customer=first, source_type='social_media')
+        CustomerSource.objects.create(customer=first, source_type='website')
+        InternalSalesAssessment.objects.create(customer=first, lead_classification='hot')
+        CustomerAssignment.objects.create(customer=first, closing_manager=closer)
+        CustomerRevisit.objects.create(customer=first, visit_date='2025-01-10', created_by=closer)
+        make_customer('ALT-10002')
+        LeadSummary.objects.all().delete()
+
+        migration.backfill_lead_summaries(django_apps, None)
+        for fresh in lead_summary.summaries_for(Customer.objects.all()):
+            stored = LeadSummary.objects.get(customer_id=fresh.customer_id)
+            for field in lead_summary.SUMMARY_FIELDS:
+                if field != 'refreshed_at':
+                    self.assertEqual(getattr(stored, field), getattr(fresh, field), field)
+
+
+class AttributionTests(TestCase):
+    def test_rera_wins_over_mobile(self):
+        by_rera = ChannelPartnerMaster.objects.create(company_name='A', partner_name='A',
+                                                      mobile_number='9000000001', rera_number='A51800000001')
+        ChannelPartnerMaster.objects.create(company_name='B', partner_name='B', mobile_number='9800000002')
+        customer = make_customer()
+        ChannelPartner.objects.create(customer=customer, company_name='A', partner_name='A',
+                                      mobile_number='+91 98000-00002', rera_number='a5 1800 000 001')
+        lead_summary.sync()
+
+        mention = PartnerAttribution.objects.get(kind='enquiry')
+        self.assertEqual((mention.partner_id, mention.matched_by), (by_rera.id, 'rera'))
+        self.assertEqual(PartnerStats.objects.get(partner=by_rera).enquiries, 1)
+
+    def test_backfill_migration_matches_a_rebuild(self):
+        migration = importlib.import_module('customer_enquiry.migrations.0029_backfill_partner_attribution')
+        partner = ChannelPartnerMaster.objects.create(company_name='A', partner_name='A',
+                                                      mobile_number='9000000001', rera_number='A51800000001')
+        first = make_customer()
+        ChannelPartner.objects.create(customer=first, company_name='A', partner_name='A',
+                                      mobile_number='9000000001')
+        InternalSalesAssessment.objects.create(customer=first, lead_classification='warm')
+        second = make_customer('ALT-10002')
+        AdditionalChannelPartner.objects.create(customer=second, company_name='A', partner_name='A',
+                                                mobile_number='9000000009', rera_number='A5-1800-000-001')
+        booking = BookingApplication.objects.create(customer=second, project_name='Altavista')
+        BookingChannelPartner.objects.create(booking_application=booking, name='Unknown', mobile='9111111111')
+
+        def snapshot_of_attribution():
+            mentions = sorted(PartnerAttribution.objects.values_list(
+                'kind', 'source_id', 'customer_id', 'mobile', 'rera', 'partner_id', 'matched_by'))
+            stats = list(PartnerStats.objects.values_list(
+                'partner_id', 'enquiries', 'assessed', 'booked', 'additional_claims', 'booking_forms'))
+            return mentions, stats
+
+        attribution.rebuild()
+        rebuilt = snapshot_of_attribution()
+        self.assertEqual(rebuilt[1], [(partner.id, 1, 1, 0, 1, 0)])
+        PartnerAttribution.objects.all().delete()
+        PartnerStats.objects.all().delete()
+
+        migration.backfill_partner_attribution(django_apps, None)
+        self.assertEqual(snapshot_of_attribution(), rebuilt)
+
+    def test_normalisation(self):
+        self.assertEqual(attribution.normalize_mobile('+91 98000-00001'), '9800000001')
+        self.assertEqual(attribution.normalize_mobile('12345'), '')
+        self.assertEqual(attribution.normalize_rera('a5 1800-000 152'), 'A51800000152')
+
+
+# ─── Bulk import ─────────────────────────────────────────────────────────────
+
+LEADS_CSV = (
+    'Name,Mobile,Email,Gender,Lead Source\n'
+    'Asha Rao,9800000001,asha@example.com,F,website\n'
+    'Asha Again,9800000001,,female,website\n'
+    'No Contact,,,male,website\n'
+    'Ravi Shah,9800000003,ravi@example.com,male,referral\n'
+    'Meera K Iyer,9800000004,,,\n'
+)
+
+
+class ImportTests(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        make_project()
+
+    def run_import(self, **kwargs):
+        return imports.import_leads(io.BytesIO(LEADS_CSV.encode()), 'leads.csv', 'alt', source='exhibition', **kwargs)
+
+    def test_valid_rows_are_imported_with_summaries(self):
+        report = self.run_import()
+        self.assertEqual((report['rows'], report['imported'], report['duplicates'], report['invalid']), (5, 2, 1, 2))
+        self.assertEqual(sorted(number for number, _ in report['errors']), [3, 4, 5])
+
+        customers = Customer.objects.order_by('first_name')
+        self.assertEqual([c.first_name for c in customers], ['Asha', 'Meera'])
+        self.assertTrue(all(c.is_complete and c.form_number.startswith('ALT-') for c in customers))
+        self.assertEqual(sorted(customers.values_list('sources__source_type', flat=True)), ['exhibition', 'website'])
+
+        # The summaries written with the import match a fresh computation
+        for fresh in lead_summary.summaries_for(Customer.objects.all()):
+            stored = LeadSummary.objects.get(customer_id=fresh.customer_id)
+            for field in lead_summary.SUMMARY_FIELDS:
+                if field != 'refreshed_at':
+                    self.assertEqual(getattr(stored, field), getattr(fresh, field), field)
+
+    def test_rerun_reports_duplicates(self):
+        self.run_import()
+        report = self.run_import()
+        self.assertEqual((report['imported'], report['duplicates']), (0, 3))
+        self.assertEqual(Customer.objects.count(), 2)
+
+    def test_dry_run_writes_nothing(self):
+        self.assertEqual(self.run_import(dry_run=True)['imported'], 2)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_web_row_cap(self):
+        with self.assertRaisesMessage(imports.ImportRejected, 'manage.py import_leads'):
+            self.run_import(max_rows=4)
+        self.assertFalse(Customer.objects.exists())
+
+    def test_import_moves_the_data_version(self):
+        before = exports.data_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import()
+        self.assertNotEqual(exports.data_version(), before)
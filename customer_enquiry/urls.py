@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from customer_enquiry import views
 
+# Under ASGI the Interakt-bound OTP views run async (see customer_enquiry/async_views.py)
+if settings.ASYNC_OTP_VIEWS:
+    from customer_enquiry import async_views as otp_views
+else:
+    otp_views = views
+
 app_name = 'customer_enquiry'
 
 urlpatterns = [
@@ -40,13 +47,15 @@ urlpatterns = [
     path('customer/<int:customer_id>/assessment/', views.internal_sales_assessment, name='internal_sales_assessment'),
     path('customer/<int:customer_id>/booking/', views.booking_form_view, name='booking_form'),
     path('export-leads/', views.export_leads, name='export_leads'),
+    path('export-leads/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export-leads/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     path('get-project-data/', views.get_project_data, name='get_project_data'),
-    path('send-otp/', views.send_otp_view, name='send_otp'),
-    path('verify-otp/', views.verify_otp_view, name='verify_otp'),
+    path('send-otp/', otp_views.send_otp_view, name='send_otp'),
+    path('verify-otp/', otp_views.verify_otp_view, name='verify_otp'),
     
     # Password Reset via WhatsApp OTP
-    path('password-reset/', views.password_reset_request, name='password_reset'),
-    path('password-reset-verify/', views.password_reset_verify, name='password_reset_verify'),
+    path('password-reset/', otp_views.password_reset_request, name='password_reset'),
+    path('password-reset-verify/', otp_views.password_reset_verify, name='password_reset_verify'),
     path('password-reset-new/', views.password_reset_new, name='password_reset_new'),
     path('password-reset-done/', views.password_reset_done, name='password_reset_done'),
     path('password-reset-complete/', views.password_reset_complete, name='password_reset_complete'),
@@ -64,6 +73,13 @@ urlpatterns = [
     # Audit trail
     path('audit-trail/', views.audit_trail, name='audit_trail'),
 
+    # Funnel analytics
+    path('analytics/funnel/', views.funnel_analytics, name='funnel_analytics'),
+    path('api/analytics/funnel/', views.funnel_analytics_api, name='funnel_analytics_api'),
+
+    # Bulk lead import (admin only)
+    path('import-leads/', views.import_leads, name='import_leads'),
+
     # Revisit
     path('customer/<int:customer_id>/revisit/', views.add_revisit, name='add_revisit'),
     path('customer/<int:customer_id>/revisit-history/', views.revisit_history, name='revisit_history'),
@@ -75,4 +91,8 @@ urlpatterns = [
     # Master Channel Partners directory
     path('manage-channel-partners/', views.manage_channel_partners, name='manage_channel_partners'),
     path('api/channel-partners/', views.channel_partners_api, name='channel_partners_api'),
+    path('channel-partners/leaderboard/', views.partner_leaderboard, name='partner_leaderboard'),
+
+    # Per-worker cache hit/miss stats (admin only)
+    path('api/cache-stats/', views.cache_stats_api, name='cache_stats_api'),
 ]
\ No newline at end of file
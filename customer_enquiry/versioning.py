@@ -0,0 +1,45 @@
+"""
+The lead data version: one value in the shared cache that moves whenever
+anything an export or the funnel reads changes.
+
+Export files and cached funnels are keyed by it (exports.data_version()),
+so reading it has to be cheap — a single cache get, not a scan of the
+tables it stands for. signals.py bumps it after any save or delete of a
+VERSIONED_MODELS row commits; writers that bypass signals (imports.py,
+archive.py, seed_leads) call bump() themselves. queryset.update() on these
+tables needs a bump() too.
+
+New values come from the clock rather than an increment, so a version lost
+with the cache (culled, flushed) can't come back as one that an older file
+was built under.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import (AdditionalChannelPartner, BookingApplicant, BookingApplication,
+                     BookingChannelPartner, ChannelPartner, Customer, CustomerAssignment,
+                     CustomerSource, InternalSalesAssessment, Project)
+
+VERSION_KEY = 'data-version'
+
+# Tables whose rows end up in an export or the funnel
+VERSIONED_MODELS = (Customer, CustomerSource, ChannelPartner, InternalSalesAssessment,
+                    BookingApplication, BookingApplicant, BookingChannelPartner,
+                    AdditionalChannelPartner, CustomerAssignment, Project)
+
+
+def current():
+    """The current data version (a fresh one if the cache has none)."""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump():
+    """Move to a new data version once the current transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time_ns(), None))
@@ -1,5 +1,5 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db import transaction
 from datetime import datetime
@@ -8,20 +8,16 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from .models import Customer, CustomerSource, ChannelPartner, Referral, InternalSalesAssessment, BookingApplication, BookingApplicant, BookingChannelPartner, Project, UserProfile, AdditionalChannelPartner, CustomerAssignment, CustomerRevisit, AuditLog, ChannelPartnerMaster
+from .models import Customer, CustomerSource, ChannelPartner, Referral, InternalSalesAssessment, BookingApplication, BookingApplicant, BookingChannelPartner, Project, UserProfile, AdditionalChannelPartner, CustomerAssignment, CustomerRevisit, AuditLog, ChannelPartnerMaster, ExportJob, LeadSummary, stale_draft_cutoff
 from django.shortcuts import get_object_or_404
 import json
 import logging
 import random
-import requests as http_client
-from django.core.cache import cache
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import user_passes_test
 from django.http import HttpResponse, HttpResponseRedirect
 import time     
-import pandas as pd
 from django.views.decorators.csrf import csrf_exempt
-import io
 from django.db import models
 from django.db.models import Q
 from django.contrib.auth.forms import PasswordResetForm, SetPasswordForm
@@ -35,6 +31,15 @@ from django.contrib.auth.views import PasswordResetView
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.conf import settings
+from .query_budget import query_budget
+from .idempotency import idempotent
+from . import archive
+from . import drafts
+from . import interakt
+from . import lead_summary
+from . import otp as otp_store
+from . import ratelimit
+from . import reference_data
 
 logger = logging.getLogger(__name__)
 
@@ -97,35 +102,29 @@ def log_action(user, action, model_name='', object_id=None, object_repr='', chan
 
 # Helper function to get project data from database
 def get_project_by_code(code):
-    """Get project data from database by form number or URL code"""
-    try:
-        # First try to get by exact form number
-        project = Project.objects.get(form_number=code, is_active=True)
-    except Project.DoesNotExist:
-        try:
-            # If not found, try to match by prefix (for URL codes like 'Alt', 'Med', etc.)
-            # Map URL codes to prefixes
-            url_code_mapping = {
-                'Alt': 'ALT',
-                'Med': 'MED',
-                'Orn': 'ORN',
-                'Star': 'STAR',
-                'Ant': 'ANT'
-            }
-
-            if code in url_code_mapping:
-                prefix = url_code_mapping[code]
-                # Get the first active project with matching prefix
-                project = Project.objects.filter(
-                    project_prefix__icontains=prefix,
-                    is_active=True
-                ).first()
+    """Get project data from the reference snapshot by form number or URL code"""
+    # First try to get by exact form number
+    project = reference_data.project_by_form_number(code)
+    if project is None:
+        # If not found, try to match by prefix (for URL codes like 'Alt', 'Med', etc.)
+        # Map URL codes to prefixes
+        url_code_mapping = {
+            'Alt': 'ALT',
+            'Med': 'MED',
+            'Orn': 'ORN',
+            'Star': 'STAR',
+            'Ant': 'ANT'
+        }
 
-                if not project:
-                    return None
-            else:
-                return None
-        except Project.DoesNotExist:
+        if code not in url_code_mapping:
+            return None
+        prefix = url_code_mapping[code].lower()
+        # Get the first active project with matching prefix
+        project = next(
+            (p for p in reference_data.active_projects() if prefix in p.project_prefix.lower()),
+            None
+        )
+        if not project:
             return None
 
     if project:
@@ -167,14 +166,10 @@ def index(request, property_code=None):
     verified_phone = request.session.get('user_phone')
 
     # Get all active projects for any dropdowns
-    active_projects = Project.objects.active_projects()
+    active_projects = reference_data.active_projects()
 
     # Channel partner master list for auto-fill
-    import json as _json
-    cp_master = list(ChannelPartnerMaster.objects.filter(is_active=True).values(
-        'id', 'company_name', 'partner_name', 'mobile_number', 'rera_number'
-    ))
-    cp_master_json = _json.dumps(cp_master)
+    cp_master_json = reference_data.partner_directory_json()
 
     context = {
         'selected_property': selected_property,
@@ -209,102 +204,136 @@ def thank_you(request):
 
 @require_http_methods(["POST"])
 @require_http_methods(["POST"])
+@idempotent('save_step')
 def save_step_view(request):
     """
     AJAX endpoint: save partial customer form data for a given step.
-    Creates or updates a Customer record. Returns form_number + customer_id.
+    Autosaves only update the cache-staged draft (drafts.py) and return its
+    draft_token. With promote=1 (the Save button) the draft is also written to
+    a Customer record, and form_number + customer_id are returned.
     """
     try:
         data = request.POST
         step = int(data.get('step', 1))
-        customer_id = data.get('customer_id', '').strip()
         property_code = data.get('property_code', '').strip()
-
-        # Resolve project prefix for form_number generation
-        project_prefix = property_code
+        # Pages loaded before drafts existed send no draft_token and only ever call this from Save
+        promote = data.get('promote') == '1' or drafts.legacy_page(data)
         try:
-            project = Project.objects.get(form_number=property_code, is_active=True)
-            project_prefix = project.project_prefix
-        except Project.DoesNotExist:
-            if '-' in property_code:
-                parts = property_code.split('-')
-                project_prefix = parts[0] if parts[1].isdigit() else f"{parts[0]}-{parts[1]}"
-
-        if customer_id:
-            try:
-                customer = Customer.objects.get(id=customer_id)
-            except Customer.DoesNotExist:
-                customer = None
-        else:
-            customer = None
-
-        # Build update dict based on step
-        update_fields = {}
-
-        if step >= 1:
-            update_fields.update({
-                'first_name': data.get('first_name', ''),
-                'middle_name': data.get('middle_name', ''),
-                'last_name': data.get('last_name', ''),
-                'email': data.get('email', ''),
-                'phone_number': data.get('phone_number') or None,
-                'sex': data.get('sex', ''),
-                'marital_status': data.get('marital_status', ''),
-                'date_of_birth': data.get('date_of_birth') or None,
-                'residential_address': data.get('residential_address', ''),
-                'city': data.get('city', ''),
-                'locality': data.get('locality', ''),
-                'pincode': data.get('pincode', ''),
-                'nationality': data.get('nationality', ''),
-            })
+            customer_id = drafts.posted_customer_id(data, request.session)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+        draft_token = data.get('draft_token', '').strip()
+        draft = drafts.get(draft_token)
+        if draft is None:
+            draft_token = drafts.new_token()
+            draft = drafts.new_draft()
+
+        draft['fields'].update(step_fields(data, step))
+        draft['step'] = max(step, draft['step'])
+        draft['property_code'] = property_code or draft['property_code']
+
+        # A row this session saved (from an older page, or an earlier Save) keeps being updated
+        if customer_id and not draft['customer_id']:
+            draft['customer_id'] = customer_id
+
+        response = {'success': True, 'draft_token': draft_token, 'step': step}
+        if promote:
+            customer = promote_draft(draft)
+            draft['customer_id'] = customer.id
+            drafts.bind_customer(request.session, customer.id)
+            response.update(customer_id=customer.id, form_number=customer.form_number)
+
+        drafts.save(draft_token, draft)
+        return JsonResponse(response)
 
-        if step >= 2:
-            update_fields.update({
-                'employment_type': data.get('employment_type', ''),
-                'company_name': data.get('company_name', ''),
-                'designation': data.get('designation', ''),
-                'industry': data.get('industry', ''),
-            })
+    except Exception as e:
+        logger.error(f"save_step error: {e}")
+        return JsonResponse({'success': False, 'error': str(e)}, status=500)
 
-        if step >= 3:
-            update_fields.update({
-                'configuration': data.get('configuration', ''),
-                'budget': data.get('budget', ''),
-                'construction_status': data.get('construction_status', ''),
-                'purpose_of_buying': data.get('purpose_of_buying', ''),
-            })
 
-        if step >= 4:
-            update_fields.update({
-                'source_details': data.get('source_details', ''),
-            })
+def step_fields(data, step):
+    """Customer fields posted by the enquiry form up to and including `step`."""
+    fields = {}
+
+    if step >= 1:
+        fields.update({
+            'first_name': data.get('first_name', ''),
+            'middle_name': data.get('middle_name', ''),
+            'last_name': data.get('last_name', ''),
+            'email': data.get('email', ''),
+            'phone_number': data.get('phone_number') or None,
+            'sex': data.get('sex', ''),
+            'marital_status': data.get('marital_status', ''),
+            'date_of_birth': data.get('date_of_birth') or None,
+            'residential_address': data.get('residential_address', ''),
+            'city': data.get('city', ''),
+            'locality': data.get('locality', ''),
+            'pincode': data.get('pincode', ''),
+            'nationality': data.get('nationality', ''),
+        })
 
-        if customer:
-            for k, v in update_fields.items():
-                setattr(customer, k, v)
-            customer.save()
-        else:
-            # Generate form number
-            while True:
-                form_number = f"{project_prefix}-{random.randint(10000, 99999)}"
-                if not Customer.objects.filter(form_number=form_number).exists():
-                    break
-            update_fields['form_number'] = form_number
-            update_fields.setdefault('form_date', timezone.now().date())
-            customer = Customer.objects.create(**update_fields)
-
-        return JsonResponse({
-            'success': True,
-            'customer_id': customer.id,
-            'form_number': customer.form_number,
-            'step': step,
+    if step >= 2:
+        fields.update({
+            'employment_type': data.get('employment_type', ''),
+            'company_name': data.get('company_name', ''),
+            'designation': data.get('designation', ''),
+            'industry': data.get('industry', ''),
         })
 
-    except Exception as e:
-        logger.error(f"save_step error: {e}")
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+    if step >= 3:
+        fields.update({
+            'configuration': data.get('configuration', ''),
+            'budget': data.get('budget', ''),
+            'construction_status': data.get('construction_status', ''),
+            'purpose_of_buying': data.get('purpose_of_buying', ''),
+        })
+
+    if step >= 4:
+        fields.update({
+            'source_details': data.get('source_details', ''),
+        })
+
+    return fields
+
+
+def promote_draft(draft):
+    """Write a draft to its (incomplete) Customer row, creating the row and form number on first promote."""
+    customer = None
+    if draft['customer_id']:
+        customer = Customer.objects.filter(id=draft['customer_id'], is_complete=False).first()
+
+    if customer:
+        for k, v in draft['fields'].items():
+            setattr(customer, k, v)
+        customer.current_step = draft['step']
+        customer.save()
+        return customer
+
+    property_code = draft['property_code']
+    # Resolve project prefix for form_number generation
+    project_prefix = property_code
+    project = reference_data.project_by_form_number(property_code)
+    if project:
+        project_prefix = project.project_prefix
+    elif '-' in property_code:
+        parts = property_code.split('-')
+        project_prefix = parts[0] if parts[1].isdigit() else f"{parts[0]}-{parts[1]}"
+
+    # Generate form number
+    while True:
+        form_number = f"{project_prefix}-{random.randint(10000, 99999)}"
+        if not archive.form_number_in_use(form_number):
+            break
+    return Customer.objects.create(
+        form_number=form_number,
+        form_date=timezone.now().date(),
+        current_step=draft['step'],
+        **draft['fields'],
+    )
 
 
+@idempotent('submit', session_keys=('customer_data',))
 def customer_submit_view(request):
     """Handle customer form submission with property support, phone number, sex, and marital status"""
     try:
@@ -405,14 +434,33 @@ def customer_submit_view(request):
                 else:
                     project_prefix = property_code
 
-            # Generate unique customer form number using full project prefix
-            while True:
-                random_number = random.randint(10000, 99999)
-                form_number = f"{project_prefix}-{random_number}"
-
-                # Check if this form number already exists
-                if not Customer.objects.filter(form_number=form_number).exists():
-                    break
+            # A draft the visitor already saved has a Customer row — complete that one
+            # (older pages post its id directly instead of a draft token)
+            draft_token = data.get('draft_token', '').strip()
+            draft = drafts.get(draft_token)
+            try:
+                posted_customer_id = drafts.posted_customer_id(data, request.session)
+            except ValueError as e:
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': False, 'error': str(e)}, status=400)
+                else:
+                    return HttpResponse('Invalid customer id', status=400)
+            draft_customer_id = draft['customer_id'] if draft else posted_customer_id
+            draft_customer = None
+            if draft_customer_id:
+                draft_customer = Customer.objects.filter(id=draft_customer_id, is_complete=False).first()
+
+            if draft_customer:
+                form_number = draft_customer.form_number
+            else:
+                # Generate unique customer form number using full project prefix
+                while True:
+                    random_number = random.randint(10000, 99999)
+                    form_number = f"{project_prefix}-{random_number}"
+
+                    # Check if this form number already exists
+                    if not archive.form_number_in_use(form_number):
+                        break
             
             # Handle optional date_of_birth field
             date_of_birth = data.get('date_of_birth', '').strip()
@@ -420,7 +468,7 @@ def customer_submit_view(request):
                 date_of_birth = None  # Allow null values as per model definition
                 
             # Create customer - UPDATED: Added sex and marital_status fields, made date_of_birth and residential_address optional
-            customer = Customer.objects.create(
+            customer_fields = dict(
                 form_number=form_number,
                 form_date=data.get('form_date', datetime.now().date()),
                 first_name=data.get('first_name'),
@@ -446,6 +494,13 @@ def customer_submit_view(request):
                 purpose_of_buying=data.get('purpose_of_buying'),
                 source_details=data.get('source_details', '')
             )
+            if draft_customer:
+                customer = draft_customer
+                for k, v in customer_fields.items():
+                    setattr(customer, k, v)
+                customer.save()
+            else:
+                customer = Customer.objects.create(**customer_fields)
             
             # Add single source (changed from multiple sources to single source)
             source = request.POST.get('source')
@@ -499,6 +554,7 @@ def customer_submit_view(request):
             customer.save()
 
             log_action(None, 'submit', 'Customer', customer.id, str(customer), request=request)
+            transaction.on_commit(lambda: drafts.discard(draft_token))
 
             # Store customer data in session for thank you page
             request.session['customer_data'] = {
@@ -565,22 +621,28 @@ def logout_view(request):
     logout(request)
     return redirect('customer_enquiry:login')
 
-@login_required
-def dashboard(request):
-    """Enhanced dashboard with filtering capabilities"""
-    # Get all customers with related data
-    customers = Customer.objects.select_related('sales_assessment').prefetch_related(
-        'sources', 'booking_applications', 'additional_channel_partners'
-    ).order_by('-created_at')
+def filter_leads(customers, params):
+    """
+    Apply the dashboard/export filter parameters (GET or POST) to a Customer queryset.
+    """
+    search = params.get('search', '')
+    property_filter = params.get('property', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    assessment_filter = params.get('assessment', '')
+    booking_filter = params.get('booking', '')
+    form_numbers_str = params.get('form_numbers', '')
+
+    # Abandoned drafts are hidden unless asked for (?drafts=all)
+    if params.get('drafts') != 'all':
+        customers = customers.exclude(is_complete=False, updated_at__lt=stale_draft_cutoff())
+
+    # If specific form numbers are provided (e.g. from closing manager), restrict to those
+    if form_numbers_str:
+        form_numbers_list = [fn.strip() for fn in form_numbers_str.split(',') if fn.strip()]
+        if form_numbers_list:
+            customers = customers.filter(form_number__in=form_numbers_list)
 
-    # Apply filters if provided (for AJAX requests)
-    search = request.GET.get('search', '')
-    property_filter = request.GET.get('property', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    assessment_filter = request.GET.get('assessment', '')
-    booking_filter = request.GET.get('booking', '')
-    
     if search:
         customers = customers.filter(
             Q(first_name__icontains=search) |
@@ -590,28 +652,41 @@ def dashboard(request):
             Q(city__icontains=search) |
             Q(phone_number__icontains=search)  # ADDED: Phone number search
         )
-    
+
     if property_filter:
         customers = customers.filter(form_number__startswith=property_filter)
-    
+
     if date_from:
         customers = customers.filter(created_at__date__gte=date_from)
-    
+
     if date_to:
         customers = customers.filter(created_at__date__lte=date_to)
-    
+
     if assessment_filter == 'completed':
         customers = customers.filter(sales_assessment__isnull=False)
     elif assessment_filter == 'pending':
         customers = customers.filter(sales_assessment__isnull=True)
-    
+
     if booking_filter == 'completed':
         customers = customers.filter(booking_applications__isnull=False)
     elif booking_filter == 'pending':
         customers = customers.filter(booking_applications__isnull=True)
-    
+
+    return customers
+
+@login_required
+@query_budget(15)
+def dashboard(request):
+    """Enhanced dashboard with filtering capabilities"""
+    # One row per lead from the LeadSummary read model, brought up to date first
+    lead_summary.sync_for_request()
+    customers = LeadSummary.objects.order_by('-created_at')
+
+    # Apply filters if provided (for AJAX requests)
+    customers = lead_summary.filter_summaries(customers, request.GET)
+
     # Get all active projects for JavaScript property mapping
-    projects = Project.objects.active_projects()
+    projects = reference_data.active_projects()
 
     # Create a dictionary for JavaScript consumption
     projects_data = {}
@@ -632,163 +707,50 @@ def dashboard(request):
 
 @login_required
 @csrf_exempt
+@query_budget(12)
 def export_leads(request):
-    """Export filtered leads to Excel - Updated with phone number, removed budget/config"""
+    """Queue an Excel export of the filtered leads; the dashboard polls export_job_status for it"""
     if request.method == 'POST':
-        # Get filter parameters
-        search = request.POST.get('search', '')
-        property_filter = request.POST.get('property', '')
-        date_from = request.POST.get('date_from', '')
-        date_to = request.POST.get('date_to', '')
-        assessment_filter = request.POST.get('assessment', '')
-        booking_filter = request.POST.get('booking', '')
-        form_numbers_str = request.POST.get('form_numbers', '')
-
-        # Get filtered customers
-        customers = Customer.objects.select_related('sales_assessment').prefetch_related(
-            'sources', 'booking_applications'
-        ).order_by('-created_at')
-
-        # If specific form numbers are provided (e.g. from closing manager), restrict to those
-        if form_numbers_str:
-            form_numbers_list = [fn.strip() for fn in form_numbers_str.split(',') if fn.strip()]
-            if form_numbers_list:
-                customers = customers.filter(form_number__in=form_numbers_list)
-
-        # Apply filters
-        if search:
-            customers = customers.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(form_number__icontains=search) |
-                Q(city__icontains=search) |
-                Q(phone_number__icontains=search)  # ADDED: Phone search
-            )
-        
-        if property_filter:
-            customers = customers.filter(form_number__startswith=property_filter)
-        
-        if date_from:
-            customers = customers.filter(created_at__date__gte=date_from)
-        
-        if date_to:
-            customers = customers.filter(created_at__date__lte=date_to)
-        
-        if assessment_filter == 'completed':
-            customers = customers.filter(sales_assessment__isnull=False)
-        elif assessment_filter == 'pending':
-            customers = customers.filter(sales_assessment__isnull=True)
-        
-        if booking_filter == 'completed':
-            customers = customers.filter(booking_applications__isnull=False)
-        elif booking_filter == 'pending':
-            customers = customers.filter(booking_applications__isnull=True)
-        
-        # Prepare data for Excel
-        data = []
-        for customer in customers:
-            # Get property name using database lookup
-            property_name = get_project_name_from_form_number(customer.form_number)
-            if not property_name:
-                property_name = 'Unknown Property'
-            
-            # Get sources
-            sources = ', '.join([source.get_source_type_display() for source in customer.sources.all()])
-            
-            # Get channel partner information
-            channel_partner_name = ''
-            try:
-                if hasattr(customer, 'channel_partner') and customer.channel_partner:
-                    channel_partner_name = customer.channel_partner.partner_name
-            except (ChannelPartner.DoesNotExist, AttributeError):
-                channel_partner_name = ''
-            
-            # Assessment status
-            assessment_status = 'Completed' if hasattr(customer, 'sales_assessment') and customer.sales_assessment else 'Pending'
-            
-            # Booking status
-            booking_status = 'Completed' if customer.booking_applications.exists() else 'Pending'
-            
-            data.append({
-                'Form Number': customer.form_number,
-                'Property': property_name,
-                'First Name': customer.first_name,
-                'Middle Name': customer.middle_name or '',
-                'Last Name': customer.last_name,
-                'Email': customer.email,
-                'Phone Number': customer.phone_number or 'Not Provided',  # ADDED
-                'Date of Birth': customer.date_of_birth.strftime('%Y-%m-%d') if customer.date_of_birth else '',
-                'City': customer.city,
-                'Locality': customer.locality,
-                'Pincode': customer.pincode,
-                'Residential Address': customer.residential_address,
-                'Nationality': customer.get_nationality_display(),
-                'Employment Type': customer.get_employment_type_display(),
-                'Company Name': customer.company_name or '',
-                'Designation': customer.designation or '',
-                'Industry': customer.industry or '',
-                'Configuration': customer.configuration,
-                'Budget': customer.budget,
-                'Construction Status': customer.get_construction_status_display(),
-                'Purpose of Buying': customer.get_purpose_of_buying_display(),
-                'Lead Sources': sources,
-                'Channel Partner Name': channel_partner_name or 'Not Applicable',
-                'Source Details': customer.source_details or '',
-                'Assessment Status': assessment_status,
-                'Booking Status': booking_status,
-                'Created Date': customer.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            })
-        
-        # Create DataFrame
-        df = pd.DataFrame(data)
-        
-        # Create Excel file in memory
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Leads Export', index=False)
-            
-            # Get workbook and worksheet
-            workbook = writer.book
-            worksheet = writer.sheets['Leads Export']
-            
-            # Auto-adjust column widths
-            for column in worksheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                worksheet.column_dimensions[column_letter].width = adjusted_width
-        
-        output.seek(0)
-        
-        # Create response
-        response = HttpResponse(
-            output.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        
-        # Generate filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        property_suffix = f'_{property_filter}' if property_filter else '_All'
-        filename = f'leads_export{property_suffix}_{timestamp}.xlsx'
-        
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        log_action(request.user, 'export', 'Customer', None,
-                   f'Exported {len(data)} leads — {filename}', request=request)
-        return response
+        # pandas/openpyxl are only imported once somebody actually exports
+        from . import exports
+        try:
+            job = exports.enqueue(request.user, request.POST)
+        except exports.ExportRejected as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+        log_action(request.user, 'export', 'ExportJob', job.id,
+                   f'Requested export — {job.filename}', request=request)
+        return JsonResponse(exports.job_status(job), status=200 if job.status == 'done' else 202)
 
     return HttpResponse('Method not allowed', status=405)
 
 
+@login_required
+@query_budget(5)
+def export_job_status(request, job_id):
+    """Progress of one of the user's export jobs (polled by the dashboards)"""
+    from . import exports
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user)
+    return JsonResponse(exports.job_status(job))
+
+
+@login_required
+@query_budget(5)
+def export_job_download(request, job_id):
+    """Download the file of a finished export job"""
+    from . import exports
+    job = get_object_or_404(ExportJob, pk=job_id, user=request.user, status='done')
+    try:
+        result = open(exports.result_path(job.result_key), 'rb')
+    except FileNotFoundError:
+        return HttpResponse('This export has expired. Please export again.', status=410)
+    return FileResponse(result, as_attachment=True, filename=job.filename,
+                        content_type=exports.content_type(job))
+
+
+@query_budget(20)
 def edit_customer(request, pk):
     """Edit or view customer information based on user role"""
-    customer = get_object_or_404(Customer, pk=pk)
+    customer = archive.get_customer_or_404(request, pk)
     user_role = get_user_role(request.user)
     can_edit = user_role in ('admin', 'super_admin', 'closing_manager')
 
@@ -925,10 +887,7 @@ def edit_customer(request, pk):
         except Exception:
             project_data = None
 
-    cp_master = ChannelPartnerMaster.objects.filter(is_active=True).values(
-        'id', 'company_name', 'partner_name', 'mobile_number', 'rera_number'
-    )
-    cp_master_json = json.dumps(list(cp_master))
+    cp_master_json = reference_data.partner_directory_json()
 
     context = {
         'customer': customer,
@@ -973,7 +932,7 @@ def add_additional_cp(request, customer_id):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'POST required.'}, status=405)
 
-    customer = get_object_or_404(Customer, pk=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
     company_name = request.POST.get('company_name', '').strip()
     partner_name = request.POST.get('partner_name', '').strip()
     mobile_number = request.POST.get('mobile_number', '').strip()
@@ -1149,7 +1108,7 @@ def add_additional_cp(request, customer_id):
 @login_required
 def internal_sales_assessment(request, customer_id):
     """Create or edit internal sales assessment for a customer"""
-    customer = get_object_or_404(Customer, pk=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
     
     # Try to get existing assessment or create new one
     try:
@@ -1345,8 +1304,8 @@ def internal_sales_assessment(request, customer_id):
                 project_data = None
 
     # Get managers for dropdown
-    sourcing_managers = User.objects.filter(profile__role='sourcing_manager').order_by('first_name')
-    closing_managers = User.objects.filter(profile__role='closing_manager').order_by('first_name')
+    sourcing_managers = reference_data.staff_directory('sourcing_manager')
+    closing_managers = reference_data.staff_directory('closing_manager')
 
     # Get existing assignment if any
     try:
@@ -1373,7 +1332,7 @@ def booking_form_view(request, customer_id):
     """
     Booking form view with pre-filled customer data and persistence support
     """
-    customer = get_object_or_404(Customer, pk=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
     
     if request.method == 'GET':
         # Check if customer already has a booking application (for editing)
@@ -1446,9 +1405,10 @@ def booking_form_view(request, customer_id):
         # Handle form submission
         return handle_booking_submission(request, customer)
 
-def get_project_name_from_form_number(form_number):
+def get_project_name_from_form_number(form_number, project_names=None):
     """
-    Get project name from form number using database lookup with exact prefix matching
+    Get project name from form number using database lookup with exact prefix matching.
+    If `project_names` (from reference_data.active_project_names()) is given, it is used instead of the database.
     """
     if not form_number:
         return ''
@@ -1470,6 +1430,9 @@ def get_project_name_from_form_number(form_number):
             # Handle old format or extract first 3 characters
             prefix = form_number[:3].upper()
 
+        if project_names is not None:
+            return project_names.get(prefix) or project_names.get(prefix.split('-')[0], '')
+
         # First try exact prefix match
         project = Project.objects.filter(
             project_prefix__iexact=prefix,
@@ -2030,10 +1993,6 @@ def user_login_view(request):
         entered_otp = request.POST.get('otp')
         property_code = request.POST.get('property_code')
         
-        # Get stored OTP from session
-        stored_otp = request.session.get('otp')
-        stored_phone = request.session.get('otp_phone')
-        
         # Validate inputs
         if not all([phone_number, entered_otp, property_code]):
             messages.error(request, 'All fields are required.')
@@ -2045,12 +2004,9 @@ def user_login_view(request):
             return render(request, 'customer-verification.html')
         
         # Validate OTP
-        if not stored_otp or stored_phone != phone_number:
-            messages.error(request, 'Please send OTP first.')
-            return render(request, 'customer-verification.html')
-        
-        if entered_otp != stored_otp:
-            messages.error(request, 'Invalid OTP. Please try again.')
+        otp_result = otp_store.verify('enquiry', phone_number, entered_otp)
+        if otp_result != otp_store.VERIFIED:
+            messages.error(request, ENQUIRY_OTP_ERRORS[otp_result])
             return render(request, 'customer-verification.html')
         
         # Validate property code - Updated with new properties
@@ -2059,10 +2015,6 @@ def user_login_view(request):
             messages.error(request, 'Please select a valid property.')
             return render(request, 'customer-verification.html')
         
-        # Clear OTP from session
-        request.session.pop('otp', None)
-        request.session.pop('otp_phone', None)
-        
         # Store user data in session
         request.session['user_authenticated'] = True
         request.session['user_phone'] = phone_number
@@ -2080,6 +2032,24 @@ def get_client_ip(request):
     return request.META.get('REMOTE_ADDR')
 
 
+# What the visitor is told for each failed otp_store.verify() result
+ENQUIRY_OTP_ERRORS = {
+    otp_store.MISSING: 'Please send OTP first.',
+    otp_store.EXPIRED: 'OTP has expired. Please request a new one.',
+    otp_store.INVALID: 'Invalid OTP. Please try again.',
+    otp_store.LOCKED: 'Too many incorrect attempts. Please request a new OTP.',
+}
+
+# Where a verified visitor lands, by the property code they verified for
+PROPERTY_FORM_URLS = {
+    'Alt': '/altavista/customer-form/',
+    'Orn': '/ornata/customer-form/',
+    'Med': '/medius/customer-form/',
+    'Star': '/spenta-stardeous/customer-form/',
+    'Ant': '/spenta-anthea/customer-form/',
+}
+
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def send_otp_view(request):
@@ -2097,7 +2067,7 @@ def send_otp_view(request):
 
         # --- Rate limit by phone number ---
         phone_cache_key = f'otp_count_phone_{phone_number}'
-        phone_count = cache.get(phone_cache_key, 0)
+        phone_count = ratelimit.count(phone_cache_key)
 
         if phone_count >= settings.OTP_MAX_PER_PHONE:
             logger.warning(f"OTP rate limit hit for phone {phone_number}")
@@ -2108,7 +2078,7 @@ def send_otp_view(request):
 
         # --- Rate limit by IP address ---
         ip_cache_key = f'otp_count_ip_{client_ip}'
-        ip_count = cache.get(ip_cache_key, 0)
+        ip_count = ratelimit.count(ip_cache_key)
 
         if ip_count >= settings.OTP_MAX_PER_IP:
             logger.warning(f"OTP rate limit hit for IP {client_ip}")
@@ -2117,42 +2087,23 @@ def send_otp_view(request):
                 'message': 'Too many requests from your network. Please try again after 1 hour.'
             })
 
-        # Generate OTP on backend (secure)
-        otp = str(random.randint(100000, 999999))
+        # Generate OTP on backend (secure) — only its hash is stored
+        otp = otp_store.issue('enquiry', phone_number)
 
         # Send via Interakt WhatsApp API
-        response = http_client.post(
-            'https://api.interakt.ai/v1/public/message/',
-            headers={
-                'Authorization': f'Basic {settings.INTERAKT_API_KEY}',
-                'Content-Type': 'application/json'
-            },
-            json={
-                'countryCode': '+91',
-                'phoneNumber': phone_number,
-                'callbackData': 'otp_verification',
-                'type': 'Template',
-                'template': {
-                    'name': 'otp_verification',
-                    'languageCode': 'en',
-                    'bodyValues': [otp],
-                    'buttonValues': {'0': [otp]}
-                }
-            },
-            timeout=10
+        response = interakt.send_template(
+            interakt.otp_template_payload(phone_number, otp, 'otp_verification')
         )
 
         if response.status_code in (200, 201):
             # Increment counters only on successful send
-            cache.set(phone_cache_key, phone_count + 1, settings.OTP_BLOCK_DURATION)
-            cache.set(ip_cache_key, ip_count + 1, settings.OTP_BLOCK_DURATION)
+            ratelimit.hit(phone_cache_key, settings.OTP_BLOCK_DURATION)
+            ratelimit.hit(ip_cache_key, settings.OTP_BLOCK_DURATION)
 
-            request.session['otp'] = otp
-            request.session['otp_phone'] = phone_number
-            request.session['otp_timestamp'] = int(timezone.now().timestamp())
             logger.info(f"OTP sent via WhatsApp for phone {phone_number} (attempt {phone_count + 1})")
             return JsonResponse({'success': True, 'message': 'OTP sent to your WhatsApp number'})
         else:
+            otp_store.discard('enquiry', phone_number)
             logger.error(f"Interakt API error: {response.status_code} - {response.text}")
             return JsonResponse({'success': False, 'message': 'Failed to send OTP. Please try again.'})
 
@@ -2165,7 +2116,7 @@ def send_otp_view(request):
 @require_http_methods(["POST"])
 def verify_otp_view(request):
     """
-    Verify OTP entered by user against session-stored OTP
+    Verify OTP entered by user against the OTP store
     """
     try:
         data = json.loads(request.body)
@@ -2176,40 +2127,17 @@ def verify_otp_view(request):
         if not all([phone_number, entered_otp, property_code]):
             return JsonResponse({'success': False, 'message': 'All fields are required.'})
 
-        stored_otp = request.session.get('otp')
-        stored_phone = request.session.get('otp_phone')
-        otp_timestamp = request.session.get('otp_timestamp')
-
-        if not stored_otp or stored_phone != phone_number:
-            return JsonResponse({'success': False, 'message': 'Please send OTP first.'})
-
-        # Check OTP expiry (10 minutes)
-        if otp_timestamp:
-            elapsed = int(timezone.now().timestamp()) - otp_timestamp
-            if elapsed > 600:
-                return JsonResponse({'success': False, 'message': 'OTP has expired. Please request a new one.'})
-
-        if entered_otp != stored_otp:
-            return JsonResponse({'success': False, 'message': 'Invalid OTP. Please try again.'})
-
-        # Clear OTP from session
-        request.session.pop('otp', None)
-        request.session.pop('otp_phone', None)
-        request.session.pop('otp_timestamp', None)
+        # One keyed lookup; expiry, attempt limit and single use are handled by the store
+        otp_result = otp_store.verify('enquiry', phone_number, entered_otp)
+        if otp_result != otp_store.VERIFIED:
+            return JsonResponse({'success': False, 'message': ENQUIRY_OTP_ERRORS[otp_result]})
 
         # Mark user as authenticated
         request.session['user_authenticated'] = True
         request.session['user_phone'] = phone_number
 
         # Determine redirect URL based on property_code
-        property_url_map = {
-            'Alt': '/altavista/customer-form/',
-            'Orn': '/ornata/customer-form/',
-            'Med': '/medius/customer-form/',
-            'Star': '/spenta-stardeous/customer-form/',
-            'Ant': '/spenta-anthea/customer-form/',
-        }
-        redirect_url = property_url_map.get(property_code, '/customer-form/')
+        redirect_url = PROPERTY_FORM_URLS.get(property_code, '/customer-form/')
 
         return JsonResponse({'success': True, 'redirect_url': redirect_url})
 
@@ -2250,13 +2178,9 @@ def property_customer_form(request, property_code):
     verified_phone = request.session.get('user_phone')
 
     # Get all active projects for any dropdowns
-    active_projects = Project.objects.active_projects()
+    active_projects = reference_data.active_projects()
 
-    import json as _json
-    cp_master = list(ChannelPartnerMaster.objects.filter(is_active=True).values(
-        'id', 'company_name', 'partner_name', 'mobile_number', 'rera_number'
-    ))
-    cp_master_json = _json.dumps(cp_master)
+    cp_master_json = reference_data.partner_directory_json()
 
     context = {
         'selected_property': selected_property,
@@ -2274,7 +2198,7 @@ def customer_verification_view(request):
     Customer verification page with dynamic project list
     """
     # Get all active projects for dropdown
-    active_projects = Project.objects.active_projects()
+    active_projects = reference_data.active_projects()
 
     context = {
         'active_projects': active_projects,
@@ -2315,6 +2239,13 @@ def login_required_custom(view_func):
 
 # PASSWORD RESET VIA WHATSAPP OTP
 
+# Failed otp_store.verify() results that send the user back to request a new code
+RESET_OTP_ERRORS = {
+    otp_store.MISSING: 'Session expired. Please start again.',
+    otp_store.EXPIRED: 'OTP has expired. Please request a new one.',
+    otp_store.LOCKED: 'Too many incorrect attempts. Please request a new OTP.',
+}
+
 def password_reset_request(request):
     """
     Step 1: User enters username — OTP is sent to their registered WhatsApp number
@@ -2328,7 +2259,7 @@ def password_reset_request(request):
 
         # --- Rate limit by username ---
         username_cache_key = f'pwd_reset_count_user_{username}'
-        username_count = cache.get(username_cache_key, 0)
+        username_count = ratelimit.count(username_cache_key)
         if username_count >= settings.OTP_MAX_PER_PHONE:
             messages.error(request, 'Too many password reset attempts for this account. Please try again after 1 hour.')
             return render(request, 'password_reset_form.html')
@@ -2336,7 +2267,7 @@ def password_reset_request(request):
         # --- Rate limit by IP ---
         client_ip = get_client_ip(request)
         ip_cache_key = f'pwd_reset_count_ip_{client_ip}'
-        ip_count = cache.get(ip_cache_key, 0)
+        ip_count = ratelimit.count(ip_cache_key)
         if ip_count >= settings.OTP_MAX_PER_IP:
             messages.error(request, 'Too many password reset attempts from your network. Please try again after 1 hour.')
             return render(request, 'password_reset_form.html')
@@ -2345,8 +2276,8 @@ def password_reset_request(request):
             user = User.objects.get(username=username)
         except User.DoesNotExist:
             # Still increment counters to prevent username enumeration
-            cache.set(username_cache_key, username_count + 1, settings.OTP_BLOCK_DURATION)
-            cache.set(ip_cache_key, ip_count + 1, settings.OTP_BLOCK_DURATION)
+            ratelimit.hit(username_cache_key, settings.OTP_BLOCK_DURATION)
+            ratelimit.hit(ip_cache_key, settings.OTP_BLOCK_DURATION)
             messages.error(request, 'No account found with this username.')
             return render(request, 'password_reset_form.html')
 
@@ -2356,44 +2287,26 @@ def password_reset_request(request):
             messages.error(request, 'No WhatsApp number registered for this account. Please contact your administrator.')
             return render(request, 'password_reset_form.html')
 
-        # Generate OTP
-        otp = str(random.randint(100000, 999999))
+        # Generate OTP — only its hash is stored
+        otp = otp_store.issue('password_reset', username)
 
         # Send via Interakt WhatsApp API
         try:
-            response = http_client.post(
-                'https://api.interakt.ai/v1/public/message/',
-                headers={
-                    'Authorization': f'Basic {settings.INTERAKT_API_KEY}',
-                    'Content-Type': 'application/json'
-                },
-                json={
-                    'countryCode': '+91',
-                    'phoneNumber': profile.whatsapp_number,
-                    'callbackData': 'password_reset_otp',
-                    'type': 'Template',
-                    'template': {
-                        'name': 'otp_verification',
-                        'languageCode': 'en',
-                        'bodyValues': [otp],
-                        'buttonValues': {'0': [otp]}
-                    }
-                },
-                timeout=10
+            response = interakt.send_template(
+                interakt.otp_template_payload(profile.whatsapp_number, otp, 'password_reset_otp')
             )
 
             if response.status_code in (200, 201):
                 # Increment rate limit counters on successful send
-                cache.set(username_cache_key, username_count + 1, settings.OTP_BLOCK_DURATION)
-                cache.set(ip_cache_key, ip_count + 1, settings.OTP_BLOCK_DURATION)
-                request.session['reset_otp'] = otp
+                ratelimit.hit(username_cache_key, settings.OTP_BLOCK_DURATION)
+                ratelimit.hit(ip_cache_key, settings.OTP_BLOCK_DURATION)
                 request.session['reset_username'] = username
-                request.session['reset_otp_timestamp'] = int(timezone.now().timestamp())
                 messages.success(request, f'OTP sent to your registered WhatsApp number.')
                 log_action(user, 'password_reset', 'User', user.id,
                            f'Password reset OTP sent for {username}', request=request)
                 return redirect('customer_enquiry:password_reset_verify')
             else:
+                otp_store.discard('password_reset', username)
                 logger.error(f"Interakt error: {response.status_code} - {response.text}")
                 messages.error(request, 'Failed to send OTP. Please try again.')
 
@@ -2410,25 +2323,19 @@ def password_reset_verify(request):
     """
     if request.method == 'POST':
         entered_otp = request.POST.get('otp', '').strip()
-        stored_otp = request.session.get('reset_otp')
-        otp_timestamp = request.session.get('reset_otp_timestamp')
-
-        if not stored_otp:
-            messages.error(request, 'Session expired. Please start again.')
-            return redirect('customer_enquiry:password_reset')
-
-        # Check expiry (10 minutes)
-        if otp_timestamp and (int(timezone.now().timestamp()) - otp_timestamp) > 600:
-            messages.error(request, 'OTP has expired. Please request a new one.')
-            return redirect('customer_enquiry:password_reset')
+        username = request.session.get('reset_username')
+        otp_result = otp_store.verify('password_reset', username, entered_otp) if username else otp_store.MISSING
 
-        if entered_otp != stored_otp:
+        if otp_result == otp_store.INVALID:
             messages.error(request, 'Invalid OTP. Please try again.')
             return render(request, 'password_reset_verify.html')
 
+        if otp_result != otp_store.VERIFIED:
+            messages.error(request, RESET_OTP_ERRORS[otp_result])
+            return redirect('customer_enquiry:password_reset')
+
         # OTP correct — mark as verified
         request.session['reset_otp_verified'] = True
-        request.session.pop('reset_otp', None)
         return redirect('customer_enquiry:password_reset_new')
 
     return render(request, 'password_reset_verify.html')
@@ -2456,7 +2363,6 @@ def password_reset_new(request):
             # Clear all reset session data
             request.session.pop('reset_otp_verified', None)
             request.session.pop('reset_username', None)
-            request.session.pop('reset_otp_timestamp', None)
             messages.success(request, 'Your password has been reset successfully!')
             return redirect('customer_enquiry:password_reset_done')
         else:
@@ -2480,6 +2386,7 @@ def password_reset_complete(request):
 # ─── Sourcing Manager Dashboard ───────────────────────────────────────────────
 
 @login_required
+@query_budget(15)
 def sourcing_manager_dashboard(request):
     """Dashboard for Sourcing Manager — view only, shows assigned leads."""
     role = get_user_role(request.user)
@@ -2487,19 +2394,13 @@ def sourcing_manager_dashboard(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access denied.")
 
+    lead_summary.sync_for_request()
+    customers = LeadSummary.objects.order_by('-created_at')
     if role == 'sourcing_manager':
-        customers = Customer.objects.filter(
-            assignment__sourcing_manager=request.user
-        ).select_related('sales_assessment').prefetch_related(
-            'sources', 'booking_applications', 'additional_channel_partners'
-        ).order_by('-created_at')
-    else:
-        customers = Customer.objects.select_related('sales_assessment').prefetch_related(
-            'sources', 'booking_applications', 'additional_channel_partners'
-        ).order_by('-created_at')
+        customers = customers.filter(sourcing_manager=request.user)
 
     # Get all active projects for JavaScript property mapping
-    projects = Project.objects.active_projects()
+    projects = reference_data.active_projects()
     projects_data = {}
     for project in projects:
         projects_data[project.project_prefix.upper()] = {
@@ -2521,6 +2422,7 @@ def sourcing_manager_dashboard(request):
 # ─── Closing Manager Dashboard ────────────────────────────────────────────────
 
 @login_required
+@query_budget(15)
 def closing_manager_dashboard(request):
     """Dashboard for Closing Manager — view + edit, shows assigned leads."""
     role = get_user_role(request.user)
@@ -2528,19 +2430,13 @@ def closing_manager_dashboard(request):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access denied.")
 
+    lead_summary.sync_for_request()
+    customers = LeadSummary.objects.order_by('-created_at')
     if role == 'closing_manager':
-        customers = Customer.objects.filter(
-            assignment__closing_manager=request.user
-        ).select_related('sales_assessment').prefetch_related(
-            'sources', 'booking_applications', 'revisits', 'additional_channel_partners'
-        ).order_by('-created_at')
-    else:
-        customers = Customer.objects.select_related('sales_assessment').prefetch_related(
-            'sources', 'booking_applications', 'revisits', 'additional_channel_partners'
-        ).order_by('-created_at')
+        customers = customers.filter(closing_manager=request.user)
 
     # Get all active projects for JavaScript property mapping
-    projects = Project.objects.active_projects()
+    projects = reference_data.active_projects()
     projects_data = {}
     for project in projects:
         projects_data[project.project_prefix.upper()] = {
@@ -2645,10 +2541,10 @@ def assign_customer(request, customer_id):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden("Access denied.")
 
-    customer = get_object_or_404(Customer, id=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
 
-    sourcing_managers = User.objects.filter(profile__role='sourcing_manager')
-    closing_managers = User.objects.filter(profile__role='closing_manager')
+    sourcing_managers = reference_data.staff_directory('sourcing_manager')
+    closing_managers = reference_data.staff_directory('closing_manager')
 
     try:
         assignment = customer.assignment
@@ -2767,19 +2663,60 @@ def manage_channel_partners(request):
     })
 
 
+@login_required
+@query_budget(10)
+def partner_leaderboard(request):
+    """Channel partners ranked by leads, assessments and bookings, from the precomputed PartnerStats. Admin only."""
+    role = get_user_role(request.user)
+    if role not in ('admin', 'super_admin'):
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("Access denied.")
+
+    from . import attribution
+    lead_summary.sync_for_request()  # also brings the partner counters up to date
+    sort = request.GET.get('sort', 'enquiries')
+    if sort not in attribution.LEADERBOARD_SORTS:
+        sort = 'enquiries'
+
+    return render(request, 'partner_leaderboard.html', {
+        'stats': attribution.leaderboard(sort)[:200],
+        'sort': sort,
+        'unmatched': attribution.unmatched(),
+        'user_role': role,
+    })
+
+
 @login_required
 def channel_partners_api(request):
     """Return active channel partners as JSON for auto-fill in forms."""
     from django.http import JsonResponse
-    partners = ChannelPartnerMaster.objects.filter(is_active=True).values(
-        'id', 'company_name', 'partner_name', 'mobile_number', 'rera_number'
-    )
-    return JsonResponse({'partners': list(partners)})
+    return JsonResponse({'partners': reference_data.partner_directory()})
+
+
+# ─── Cache monitoring ────────────────────────────────────────────────────────
+
+@login_required
+def cache_stats_api(request):
+    """Hit/miss/eviction counters of this worker's tiered caches, for monitoring. Admin only."""
+    role = get_user_role(request.user)
+    if role not in ('admin', 'super_admin'):
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("Access denied.")
+
+    import os
+    from django.core.cache import caches
+    stats = {}
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        if hasattr(backend, 'stats'):
+            stats[alias] = backend.stats()
+    return JsonResponse({'pid': os.getpid(), 'caches': stats})
 
 
 # ─── Audit Trail ─────────────────────────────────────────────────────────────
 
 @login_required
+@query_budget(12)
 def audit_trail(request):
     """View audit logs. Only admin and super admin can access."""
     role = get_user_role(request.user)
@@ -2829,12 +2766,109 @@ def audit_trail(request):
     })
 
 
+# ─── Funnel Analytics ────────────────────────────────────────────────────────
+
+@login_required
+@query_budget(15)
+def funnel_analytics(request):
+    """Enquiry → assessment → booking funnel, overall and per breakdown. Admin and super admin only."""
+    role = get_user_role(request.user)
+    if role not in ('admin', 'super_admin'):
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("Access denied.")
+
+    from . import analytics
+    error = ''
+    try:
+        result = analytics.funnel(request.GET)
+    except analytics.FilterRejected as e:
+        error = str(e)
+        result = {'generated_at': '', 'filters': {}, 'totals': None, 'breakdowns': {}}
+    breakdowns = [
+        {'key': key, 'heading': heading, 'rows': result['breakdowns'].get(key, [])}
+        for key, heading in analytics.DIMENSIONS
+    ]
+    return render(request, 'funnel_analytics.html', {
+        'result': result,
+        'error': error,
+        'totals': result['totals'],
+        'breakdowns': breakdowns,
+        'project_names': sorted(reference_data.active_project_names().items()),
+        'filter_date_from': request.GET.get('date_from', ''),
+        'filter_date_to': request.GET.get('date_to', ''),
+        'filter_property': request.GET.get('property', ''),
+        'user_role': role,
+    })
+
+
+@login_required
+@query_budget(15)
+def funnel_analytics_api(request):
+    """The funnel as JSON (same filters as the page) for reports and BI tools."""
+    role = get_user_role(request.user)
+    if role not in ('admin', 'super_admin'):
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+
+    from . import analytics
+    try:
+        return JsonResponse(analytics.funnel(request.GET))
+    except analytics.FilterRejected as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+# ─── Lead Import ─────────────────────────────────────────────────────────────
+
+@login_required
+def import_leads(request):
+    """Upload an .xlsx/.csv of leads (exhibitions, portals, campaigns) and import them. Admin only."""
+    role = get_user_role(request.user)
+    if role not in ('admin', 'super_admin'):
+        from django.http import HttpResponseForbidden
+        return HttpResponseForbidden("Access denied.")
+
+    from . import imports
+    report = None
+    error = ''
+    form = {'property': '', 'source': '', 'source_details': '', 'dry_run': False}
+
+    if request.method == 'POST':
+        form = {
+            'property': request.POST.get('property', ''),
+            'source': request.POST.get('source', ''),
+            'source_details': request.POST.get('source_details', '').strip(),
+            'dry_run': bool(request.POST.get('dry_run')),
+        }
+        upload = request.FILES.get('file')
+        if not upload:
+            error = 'Choose a file to import.'
+        else:
+            try:
+                report = imports.import_leads(
+                    upload, upload.name, form['property'], source=form['source'],
+                    source_details=form['source_details'], user=request.user, request=request,
+                    dry_run=form['dry_run'], max_rows=settings.IMPORT_WEB_MAX_ROWS,
+                )
+            except imports.ImportRejected as e:
+                error = str(e)
+
+    return render(request, 'import_leads.html', {
+        'report': report,
+        'error': error,
+        'form': form,
+        'project_names': sorted(reference_data.active_project_names().items()),
+        'source_choices': imports.IMPORTABLE_SOURCES,
+        'max_reported_errors': imports.MAX_REPORTED_ERRORS,
+        'max_rows': settings.IMPORT_WEB_MAX_ROWS,
+        'user_role': role,
+    })
+
+
 # ─── Revisit ─────────────────────────────────────────────────────────────────
 
 @login_required
 def add_revisit(request, customer_id):
     """Record a revisit for a customer."""
-    customer = get_object_or_404(Customer, id=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
 
     if request.method == 'POST':
         visit_date = request.POST.get('visit_date', str(timezone.now().date()))
@@ -2859,7 +2893,7 @@ def add_revisit(request, customer_id):
 @login_required
 def revisit_history(request, customer_id):
     """Return revisit history for a customer as JSON."""
-    customer = get_object_or_404(Customer, id=customer_id)
+    customer = archive.get_customer_or_404(request, customer_id)
     revisits = customer.revisits.select_related('created_by').order_by('-visit_date')
     data = [
         {